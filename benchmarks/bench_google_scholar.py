@@ -0,0 +1,192 @@
+# mypy: ignore-errors
+# The previous parser below is a frozen copy kept as the reference to measure against, so it is not type checked.
+"""
+Benchmark `parse_google_scholar_html` against the BeautifulSoup based parser it replaced.
+
+Usage: python benchmarks/bench_google_scholar.py [--repeat 200]
+
+The pages are the saved result pages in tests/fixtures/google_scholar. The previous parser cannot handle
+the detailed (gs_fmaa) layout, so the comparison only uses the pages both parsers accept.
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from pathlib import Path
+from typing import Callable
+
+from bs4 import BeautifulSoup, Tag
+from lxml import etree, html
+
+from agent_starter_kit.tools.search import Author, PaperSearchResult
+from agent_starter_kit.tools.search.google_scholar import parse_google_scholar_html
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures" / "google_scholar"
+
+
+def pages_per_second(parse: Callable[[str], list[PaperSearchResult]], pages: list[str], repeat: int) -> float:
+    with contextlib.redirect_stdout(io.StringIO()):  # the previous parser prints every result
+        begin = time.perf_counter()
+        for _ in range(repeat):
+            for page in pages:
+                parse(page)
+        elapsed = time.perf_counter() - begin
+    return len(pages) * repeat / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Google Scholar result page parser")
+    parser.add_argument("--repeat", type=int, help="How many times every page is parsed", default=200)
+    args = parser.parse_args()
+
+    pages = {path.name: path.read_text() for path in sorted(FIXTURES.glob("gs_*.html"))}
+    comparable = {}
+    for name, page in pages.items():
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                legacy_parse_google_scholar_html(page)
+            comparable[name] = page
+        except Exception as e:
+            print(f"{name}: skipped for the previous parser ({e!r})")
+
+    current = pages_per_second(parse_google_scholar_html, list(comparable.values()), args.repeat)
+    legacy = pages_per_second(legacy_parse_google_scholar_html, list(comparable.values()), args.repeat)
+    print(f"{len(comparable)} pages both parsers accept:")
+    print(f"  previous parser: {legacy:10.1f} pages/s")
+    print(f"  current parser:  {current:10.1f} pages/s ({current / legacy:.1f}x)")
+    print(f"All {len(pages)} pages, current parser: {pages_per_second(parse_google_scholar_html, list(pages.values()), args.repeat):10.1f} pages/s")
+
+
+# The parser as it was before the lxml rewrite, kept verbatim as the benchmark baseline.
+def legacy_parse_google_scholar_html(html_content: str) -> list[PaperSearchResult]:
+    result = []
+    soup = BeautifulSoup(html_content, "html.parser")
+
+    body = soup.find(id="gs_res_ccl_mid")
+    if body is None or not isinstance(body, Tag):
+        if "not a robot" in html_content:
+            raise ValueError("Google Scholar is blocking the request")
+        else:
+            raise ValueError("Cannot find the body tag of the google scholar search result")
+
+    # Get all children of the body
+    children = body.find_all("div", recursive=False)
+    # print(f"The body has {len(children)} children")
+
+    for child in children:
+        # Get the title of the paper
+        tree = html.fromstring(str(child))
+        title = tree.xpath("//div[@class='gs_ri']/h3/a")
+
+        if len(title) > 0:  # type: ignore
+            title = title[0].text_content()  # type: ignore
+            title = " ".join(title.split())  # type: ignore
+        else:
+            continue
+
+        citedby = tree.xpath("//a[starts-with(text(), 'Cited by')]")
+        if len(citedby) > 0:  # type: ignore
+            citedby = citedby[0].text_content()  # type: ignore
+            citedby = citedby.split()[-1]  # type: ignore
+            citedby = int(citedby)  # type: ignore
+        else:
+            citedby = 0
+
+        # Determine the detailed result or general result
+        detailed = False
+        if len(tree.xpath("//div[@class='gs_a']")) > 0:  # type: ignore
+            detailed = False
+        elif len(tree.xpath("//div[@class='gs_fmaa']")) > 0:  # type: ignore
+            detailed = True
+        else:
+            raise ValueError("Cannot determine the type of the result")
+
+        if detailed:
+            venue = tree.xpath("//div[@class='gs_a gs_fma_p']/text()")
+            venue_name = venue[0] if len(venue) > 0 else None  # type: ignore
+            venue_url = venue[1] if len(venue) > 1 else None  # type: ignore
+
+            venue_name, year = venue_name.split(",") if venue_name is not None else (None, None)  # type: ignore
+            venue_name = " ".join(venue_name.split()) if venue_name is not None else None  # type: ignore # remove the \xa0 in the string
+            year = int(year) if year is not None else None
+
+            authors = tree.xpath("//div[@class='gs_fmaa']")
+            if len(authors) > 0:  # type: ignore
+                authors_source = etree.tostring(authors[0]).decode("utf-8")  # type: ignore
+
+                authors = authors_source.split(",")  # split the html string by comma
+
+                for author in authors:
+                    author_html = html.fromstring(author)  # type: ignore
+                    author_name = author_html.xpath("//text()")[0]  # type: ignore
+                    author_id = author_html.xpath("//a/@href")[0]  # type: ignore
+                    if author_id is not None:
+                        author_id = author_id.split("user=")[1]  # type: ignore
+                        author_id = author_id.split("&")[0]  # type: ignore
+
+                    authors = [Author(full_name=str(author_name), google_scholar_id=str(author_id)) for author in authors]
+
+                authors = authors[0].text_content()  # type: ignore
+                authors = " ".join(authors.split())  # type: ignore
+                authors = authors.split(",")  # type: ignore
+                authors = [Author(full_name=author.strip()) for author in authors]  # type: ignore
+            else:
+                authors = None  # type: ignore
+
+            abstract = tree.xpath("//div[@class='gs_fma_abs']/div[@class='gs_fma_snp']")
+            if len(abstract) > 0:  # type: ignore
+                abstract = abstract[0].text_content()  # type: ignore
+            else:
+                abstract = None  # type: ignore
+        else:
+            authors = tree.xpath("//div[@class='gs_a']")
+            print(authors[0].text_content().split("-"))
+
+            temp = authors[0].text_content().split("-") if len(authors) > 0 else (None, None, None)
+            if len(temp) >= 3:
+                authors, venue_name, venue_url = temp[0], temp[-2], temp[-1]
+            else:
+                authors = authors[0].text_content()  # type: ignore
+                venue_name = None
+                venue_url = None
+
+            authors = authors.split(",")  # type: ignore
+            authors = [Author(full_name=author.strip()) for author in authors]  # type: ignore
+            venue_url = venue_url.strip() if venue_url is not None else None  # type: ignore
+
+            temp = venue_name.split(",") if venue_name is not None else (None, None)
+            if len(temp) > 1:
+                venue_name, year = temp[0], temp[-1]
+            else:
+                venue_name = temp[0]
+                year = None
+            venue_name = " ".join(venue_name.split()) if venue_name is not None else None  # remove the \xa0 in the string
+            year = int(year) if year is not None else None
+
+            abstract = tree.xpath("//div[@class='gs_rs']")
+            if len(abstract) > 0:  # type: ignore
+                abstract = abstract[0].text_content()  # type: ignore
+            else:
+                abstract = None  # type: ignore
+
+        assert type(authors) is list
+        assert type(year) is int if year is not None else True, f"year: {year} have type {type(year)}"
+        assert type(authors[0]) is Author if authors is not None else True
+
+        result.append(
+            PaperSearchResult(
+                title=title,
+                authors=authors,  # type: ignore
+                year=year,
+                abstract=abstract,  # type: ignore
+                citation_count=citedby,
+                venue_name=venue_name,
+                venue_url=venue_url,  # type: ignore
+            )
+        )
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Benchmark `get_all_refs` against the implementation it replaced.
+
+Usage: python benchmarks/bench_reference.py [--repeat 5]
+
+The documents are the sample papers in tests/fixtures/pdf. Throughput is counted in document pages per second,
+whether or not a page was read. The previous implementation is kept below verbatim, prefixed with `legacy_`.
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable
+
+import pymupdf
+
+from agent_starter_kit.tools.extract.reference import ReferenceType, classify_reference_type, get_all_refs
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures" / "pdf"
+
+
+def pages_per_second(extract: Callable[[str], list[str] | None], paths: list[str], repeat: int) -> float:
+    pages = sum(len(pymupdf.open(path)) for path in paths)
+    with contextlib.redirect_stdout(io.StringIO()):  # the previous implementation prints its progress
+        begin = time.perf_counter()
+        for _ in range(repeat):
+            for path in paths:
+                extract(path)
+        elapsed = time.perf_counter() - begin
+    return pages * repeat / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the PDF reference extractor")
+    parser.add_argument("--repeat", type=int, help="How many times every document is processed", default=5)
+    args = parser.parse_args()
+
+    paths = sorted(str(path) for path in FIXTURES.glob("*.pdf"))
+    for path in paths:
+        with contextlib.redirect_stdout(io.StringIO()):
+            same = legacy_get_all_refs(path) == get_all_refs(path)
+        print(f"{Path(path).name}: {len(pymupdf.open(path))} pages, {'same' if same else 'DIFFERENT'} references")
+
+    legacy = pages_per_second(legacy_get_all_refs, paths, args.repeat)
+    current = pages_per_second(get_all_refs, paths, args.repeat)
+    print(f"{len(paths)} documents:")
+    print(f"  previous implementation: {legacy:10.1f} pages/s")
+    print(f"  current implementation:  {current:10.1f} pages/s ({current / legacy:.1f}x)")
+
+
+def legacy_is_ref_block(block_text: str):
+    """
+    Check if a block of text is a reference block (e.g. "参考文献", "Reference", "Bibliography")
+
+    Args:
+        block_text: str. The text to analyze
+
+    Returns:
+        bool. True if the block is a reference block, False otherwise
+    """
+    block_text = re.sub(r"\s+", "", block_text.lower())
+    refbreak = re.compile(r"(\u53c2\u8003\u6587\u732e|reference|bibliography)")
+    if len(block_text) > 20:
+        return False
+    ret = re.match(refbreak, block_text)
+    return ret is not None
+
+
+def legacy_get_ref_page(doc: pymupdf.Document):
+
+    reference_page = -1
+
+    for page in doc:
+
+        blist = page.get_text("blocks")
+
+        for block in blist:
+            block_text = block[4]
+            color = (1, 0, 0)
+            rect = pymupdf.Rect(block[:4])
+
+            page.draw_rect(rect, color=color)
+            page.insert_textbox(rect=rect, buffer="Block", color=color, fontsize=5)
+
+            if legacy_is_ref_block(block_text):
+                reference_page = max(reference_page, page.number)
+
+    return reference_page
+
+
+def legacy_mark_and_collect_references(page: pymupdf.Page, hit_ref_block=False):
+    blist = page.get_text("blocks", delimiters=None)  # make the word list
+    refs = []
+    for b in blist:  # scan through all words on page
+        block_text = b[4].replace("\n", " ").replace("- ", "").strip()
+        rect = pymupdf.Rect(b[:4])
+
+        if not hit_ref_block:
+            if legacy_is_ref_block(block_text):
+                hit_ref_block = True
+            page.draw_rect(rect, color=(0, 0, 1))
+            continue
+
+        if classify_reference_type(block_text) is None:  # Non reference
+            page.draw_rect(rect, color=(0, 0, 1))
+        else:  # Reference
+            page.draw_rect(rect, color=(1, 0, 1))
+            refs.append(block_text.strip().replace("\n", " ").replace("- ", "").replace("/ ", "/"))
+
+    return hit_ref_block, refs
+
+
+def legacy_count_references_on_page(page: pymupdf.Page, type: ReferenceType):
+    """ """
+    counter = 0
+    for block in page.get_text("blocks"):
+        block_text = block[4].replace("\n", " ").replace("- ", "")  # Block: (x,y,w,h,text,...,...)
+        if type.pattern.match(block_text):
+            counter += 1
+    return counter
+
+
+def legacy_get_all_refs(pdf_filepath: str, save_marked_pdf: bool = False) -> list[str] | None:
+    """
+    Extracts all references from a PDF file.
+    This function processes a PDF file to identify and extract references from it. It identifies the reference section,
+    determines the major reference type, and collects all references. Optionally, it can save a marked version of the PDF.
+    Args:
+        pdf_filepath (str): The path to the PDF file.
+        save_marked_pdf (bool, optional): If True, saves a marked version of the PDF with references highlighted. Defaults to False.
+    Returns:
+        list[str] | None: A list of extracted references if found, otherwise None.
+    """
+
+    doc = pymupdf.open(pdf_filepath)
+
+    ref_page_begin = legacy_get_ref_page(doc)
+    if ref_page_begin == -1:
+        print("No reference page found")
+        return None
+
+    hit_ref_block = False
+    ref_counter: Counter = Counter()
+    for page in doc[ref_page_begin : ref_page_begin + 2]:  # noqa: E203
+        blist = page.get_text("blocks")
+        for block in blist:
+            if not hit_ref_block:
+                if not legacy_is_ref_block(block[4]):
+                    continue
+                hit_ref_block = True
+
+            block_text = block[4].replace("\n", " ").replace("- ", "")
+            matches = [ref_type for ref_type in ReferenceType if ref_type.pattern.match(block_text)]
+            ref_counter = ref_counter + Counter(matches)
+
+    major_ref_type, _ = ref_counter.most_common(1)[0]
+
+    hit_ref_block = False
+    ref_page_end = -1
+    all_refs = []
+    for page in doc[ref_page_begin:]:
+        refcnt = legacy_count_references_on_page(page, major_ref_type)
+        logging.debug(f"Page {page.number+1} with refcnt {refcnt}")
+        if refcnt == 0 and ref_page_end != -1:
+            ref_page_end = max(ref_page_begin, page.number - 1)
+            break
+        if refcnt != 0:
+            ref_page_end = page.number
+
+        hit_ref_block, refs = legacy_mark_and_collect_references(page, hit_ref_block)  # mark the page's words
+
+        blockcnt = len(page.get_text("blocks"))
+        if refcnt / blockcnt < 0.05:
+            continue
+
+        all_refs.extend(refs)
+
+    print(f"Major Reference type: {major_ref_type}")
+    print(f"Reference page range: {ref_page_begin+1} - {ref_page_end+1}")
+
+    if save_marked_pdf:
+        doc.save("marked-" + doc.name)
+
+    all_refs_finegrained = []  # Sometimes [] references stick together and need further splitting
+    if major_ref_type == ReferenceType.NUMBERED:
+        for ref in all_refs:
+            refs = ref.split("[")  # split by [ and add back the [
+            for r in refs:
+                if r.strip():
+                    all_refs_finegrained.append("[" + r.strip())
+    else:
+        all_refs_finegrained = all_refs
+
+    return all_refs_finegrained
+
+
+if __name__ == "__main__":
+    main()
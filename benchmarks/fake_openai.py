@@ -0,0 +1,91 @@
+"""
+A local stand-in for the OpenAI chat completions API, so that `Agent.run` can be benchmarked offline.
+
+```
+with FakeOpenAIServer(tokens=64, token_delay=0.001) as server:
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    Agent("Bench", tracing=False).run(prompt="Hi")
+```
+
+Every request is answered with a stream of `tokens` chunks, the first one after `first_token_delay` seconds and
+each following one `token_delay` seconds later. The server runs its own event loop in a daemon thread, the
+synchronous OpenAI client can be used from any number of threads.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+from aiohttp import web
+
+
+def _chunk(content: str | None, finish_reason: str | None = None) -> bytes:
+    chunk = {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [{"index": 0, "delta": {} if content is None else {"content": content}, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+class FakeOpenAIServer:
+    def __init__(self, tokens: int = 64, token_delay: float = 0.0, first_token_delay: float = 0.0):
+        """
+        Args:
+            tokens: Content chunks per response. default: 64
+            token_delay: Seconds between two chunks. default: 0.0
+            first_token_delay: Seconds before the first chunk. default: 0.0
+        """
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.requests = 0
+        self.base_url = ""
+        self._loop = asyncio.new_event_loop()
+        self._thread: threading.Thread | None = None
+
+    async def _completions(self, request: web.Request) -> web.StreamResponse:
+        await request.read()
+        self.requests += 1
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        if self.first_token_delay:
+            await asyncio.sleep(self.first_token_delay)
+        for i in range(self.tokens):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            await response.write(_chunk(f"tok{i} "))
+        await response.write(_chunk(None, "stop"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    def _serve(self, started: threading.Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._completions)
+        runner = web.AppRunner(app)
+        self._loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        host, port = runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}/v1"
+        started.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(runner.cleanup())
+        self._loop.close()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, args=(started,), daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,358 @@
+"""
+Offline benchmark suite of the hot paths, with a regression check against saved baselines.
+
+Usage:
+    python benchmarks/suite.py                                   # run everything and print the results
+    python benchmarks/suite.py --save benchmarks/baseline.json   # record a new baseline
+    python benchmarks/suite.py --check benchmarks/baseline.json  # exit with status 1 on a regression
+    python benchmarks/suite.py --only cache --cache-sizes 100000 1000000
+
+Nothing leaves the machine: `Agent.run` talks to the streaming server in fake_openai.py, Semantic Scholar is
+a local stub, and the parsers read the fixtures in tests/fixtures. Within a run every measurement is repeated
+and the best round is kept. A single run still varies by 20-170% from one run to the next on a shared machine,
+so every benchmark is run `--runs` times (5 by default) and the median of each metric is reported.
+
+A metric regresses if it is worse than its baseline by more than its threshold. The thresholds sit above the
+spread of the 5-run medians measured on a 1-CPU machine: 25% by default (parsers, reference extraction and
+task manager costs varied by up to 8%), 50% for the file system bound cache, the Semantic Scholar client and
+the task manager overhead ratio (up to 25%), and 50% for the agent throughput and 100% for its time to first
+token, whose thread scheduling varied by up to 73%. A metric's own "threshold" in the baseline takes precedence over `--threshold`.
+Baselines are only comparable on the machine they were recorded on.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import pymupdf
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fake_openai import FakeOpenAIServer
+from loguru import logger
+
+from agent_starter_kit.agent import Agent
+from agent_starter_kit.context import CacheManager, ConcurrentTaskManager
+from agent_starter_kit.tools.extract.reference import get_all_refs
+from agent_starter_kit.tools.search import SemanticScholarSearchEngine
+from agent_starter_kit.tools.search.google_scholar import parse_google_scholar_html
+from agent_starter_kit.tools.search.scheduler import RequestScheduler
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures"
+BENCHMARKS = ["agent", "cache", "google_scholar", "reference", "taskmgr", "semantic_scholar"]
+
+
+@dataclass
+class Metric:
+    value: float
+    unit: str
+    higher_is_better: bool
+    threshold: float | None = None  # Allowed relative slowdown, None uses the suite's threshold
+
+
+def _rate(run: Callable[[], int], repeat: int) -> float:
+    """Best items per second of `repeat` rounds, `run` returns how many items it processed."""
+    rates = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        items = run()
+        rates.append(items / (time.perf_counter() - begin))
+    return max(rates)
+
+
+def bench_agent(concurrency: list[int], runs: int, tokens: int, token_delay: float) -> dict[str, Metric]:
+    """`Agent.run` throughput and time to first token with `concurrency` runs in flight at once."""
+    metrics = {}
+    saved = {key: os.environ.get(key) for key in ("OPENAI_BASE_URL", "OPENAI_API_KEY")}
+    with FakeOpenAIServer(tokens=tokens, token_delay=token_delay) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        os.environ["OPENAI_API_KEY"] = "sk-fake"
+        try:
+            for workers in concurrency:
+                agents = [Agent("Benchmark", tracing=False) for _ in range(workers)]
+
+                def run(agent: Agent) -> float:
+                    started = time.perf_counter()
+                    first: list[float] = []
+
+                    def on_token(_: str) -> None:
+                        if not first:
+                            first.append(time.perf_counter() - started)
+
+                    agent.run(prompt="Benchmark", stream_callback=on_token)
+                    return first[0]
+
+                begin = time.perf_counter()
+                with ConcurrentTaskManager[float](max_workers=workers) as manager:
+                    for i in range(runs):
+                        manager.submit_task(run, agents[i % workers])
+                    ttft = sorted(manager.get_results())
+                elapsed = time.perf_counter() - begin
+                metrics[f"agent.c{workers}.runs_per_s"] = Metric(runs / elapsed, "runs/s", True, 0.5)
+                metrics[f"agent.c{workers}.tokens_per_s"] = Metric(runs * tokens / elapsed, "tokens/s", True, 0.5)
+                metrics[f"agent.c{workers}.ttft_p50_ms"] = Metric(statistics.median(ttft) * 1000, "ms", False, 1.0)
+                metrics[f"agent.c{workers}.ttft_p95_ms"] = Metric(ttft[int(0.95 * (len(ttft) - 1))] * 1000, "ms", False, 1.0)
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return metrics
+
+
+def bench_cache(sizes: list[int], samples: int, repeat: int) -> dict[str, Metric]:
+    """
+    `CacheManager` latency once the cache holds each number of entries: `set` of new entries, `get` of hits and misses.
+
+    Every operation writes or reads a file, so the numbers follow the file system, and filling the cache is left
+    out of the measurement. The best of `repeat` rounds of `samples` operations is kept.
+    """
+    metrics = {}
+
+    def per_operation(operation: Callable[[CacheManager, int], object], cache: CacheManager, keys: list[int]) -> float:
+        begin = time.perf_counter()
+        for key in keys:
+            operation(cache, key)
+        return (time.perf_counter() - begin) / len(keys) * 1e6
+
+    def set_new(cache: CacheManager, key: int) -> None:
+        cache.set("bench", (key,), {}, {"title": "New", "score": key})
+
+    def get_hit(cache: CacheManager, key: int) -> object:
+        return cache.get("bench", (key,), {})
+
+    def get_miss(cache: CacheManager, key: int) -> object:
+        return cache.get("bench", ("missing", key), {})
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = CacheManager(cache_dir)
+            for i in range(size):
+                cache.set("bench", (i,), {}, {"title": f"Paper {i}", "score": i})
+
+            hits = random.Random(0).sample(range(size), min(samples, size))
+            fresh = itertools.count(size)
+            sets, gets, misses = [], [], []
+            for _ in range(repeat):
+                new_keys = [next(fresh) for _ in range(samples)]
+                sets.append(per_operation(set_new, cache, new_keys))
+                gets.append(per_operation(get_hit, cache, hits))
+                misses.append(per_operation(get_miss, cache, hits))
+            metrics[f"cache.{size}.set_us"] = Metric(min(sets), "us", False, 0.5)
+            metrics[f"cache.{size}.get_hit_us"] = Metric(min(gets), "us", False, 0.5)
+            metrics[f"cache.{size}.get_miss_us"] = Metric(min(misses), "us", False, 0.5)
+    return metrics
+
+
+def bench_google_scholar(repeat: int, rounds: int) -> dict[str, Metric]:
+    """`parse_google_scholar_html` over the saved result pages."""
+    pages = [path.read_text() for path in sorted((FIXTURES / "google_scholar").glob("gs_*.html"))]
+
+    def run() -> int:
+        for _ in range(rounds):
+            for page in pages:
+                parse_google_scholar_html(page)
+        return len(pages) * rounds
+
+    return {"google_scholar.parse_pages_per_s": Metric(_rate(run, repeat), "pages/s", True)}
+
+
+def bench_reference(repeat: int, rounds: int) -> dict[str, Metric]:
+    """`get_all_refs` over the sample papers, counting every page of a document whether it was read or not."""
+    paths = sorted(str(path) for path in (FIXTURES / "pdf").glob("*.pdf"))
+    pages = sum(len(pymupdf.open(path)) for path in paths)
+
+    def run() -> int:
+        for _ in range(rounds):  # One pass takes a few milliseconds, too short to time reliably
+            for path in paths:
+                get_all_refs(path)
+        return pages * rounds
+
+    return {"reference.get_all_refs_pages_per_s": Metric(_rate(run, repeat), "pages/s", True)}
+
+
+def bench_taskmgr(tasks: int, workers: int, repeat: int) -> dict[str, Metric]:
+    """What `ConcurrentTaskManager` costs per task on top of a bare `ThreadPoolExecutor`, for tasks that do nothing."""
+
+    def noop() -> None:
+        return None
+
+    def managed() -> float:
+        begin = time.perf_counter()
+        with ConcurrentTaskManager[None](max_workers=workers) as manager:
+            for _ in range(tasks):
+                manager.submit_task(noop)
+            manager.get_results()
+        return time.perf_counter() - begin
+
+    def bare() -> float:
+        begin = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(noop) for _ in range(tasks)]:
+                future.result()
+        return time.perf_counter() - begin
+
+    managed_time = min(managed() for _ in range(repeat))
+    bare_time = min(bare() for _ in range(repeat))
+
+    with ConcurrentTaskManager[None](max_workers=workers) as manager:
+        for _ in range(tasks):
+            manager.submit_task(noop)
+        manager.get_results()
+        polls = []
+        for _ in range(20):  # Cheap, and far noisier than the rest
+            begin = time.perf_counter()
+            manager.get_new_results()
+            polls.append(time.perf_counter() - begin)
+
+    return {
+        "taskmgr.task_us": Metric(managed_time / tasks * 1e6, "us", False),
+        "taskmgr.overhead_ratio": Metric(managed_time / bare_time, "x", False, 0.5),
+        f"taskmgr.poll_{tasks}_us": Metric(min(polls) * 1e6, "us", False),
+    }
+
+
+def bench_semantic_scholar(requests: int, concurrency: int, repeat: int) -> dict[str, Metric]:
+    """Client side cost of `SemanticScholarSearchEngine.search` against a stub that answers instantly, without pacing."""
+    papers = [{"paperId": f"p{i}", "title": f"Paper {i}", "authors": [{"name": f"Author {i}"}], "year": 2020, "citationCount": i} for i in range(10)]
+
+    async def handler(request: web.Request) -> web.Response:
+        return web.json_response({"total": len(papers), "offset": 0, "data": papers})
+
+    async def main() -> float:
+        app = web.Application()
+        app.router.add_get("/paper/search", handler)
+        server = TestServer(app)
+        await server.start_server()
+        semaphore = asyncio.Semaphore(concurrency)
+        try:
+            async with SemanticScholarSearchEngine(api_key=None, base_url=str(server.make_url("")), scheduler=RequestScheduler(rate=None)) as engine:
+
+                async def search(i: int) -> None:
+                    async with semaphore:
+                        await engine.search(f"query {i}", limit=10)
+
+                await search(-1)  # Open the connection pool outside the measurement
+                rates = []
+                for _ in range(repeat):
+                    begin = time.perf_counter()
+                    await asyncio.gather(*(search(i) for i in range(requests)))
+                    rates.append(requests / (time.perf_counter() - begin))
+                return max(rates)
+        finally:
+            await server.close()
+
+    return {"semantic_scholar.search_per_s": Metric(asyncio.run(main()), "requests/s", True, 0.5)}
+
+
+def run_benchmarks(selected: list[str], quick: bool = False, cache_sizes: list[int] | None = None, runs: int = 1) -> dict[str, Metric]:
+    """
+    Run the selected benchmarks.
+
+    Args:
+        selected: Names from `BENCHMARKS`.
+        quick: Smaller workloads, to check that the suite works rather than to measure. default: False
+        cache_sizes: Entries to fill the cache with. default: [100000], [1000] if quick
+        runs: Run every benchmark this many times and report the median of each metric. default: 1
+    """
+    repeat = 1 if quick else 3
+    jobs: dict[str, Callable[[], dict[str, Metric]]] = {
+        "agent": lambda: bench_agent([1, 8], runs=8 if quick else 64, tokens=64, token_delay=0.0),
+        "cache": lambda: bench_cache(cache_sizes or ([1000] if quick else [100_000]), samples=1000, repeat=repeat),
+        "google_scholar": lambda: bench_google_scholar(repeat, rounds=1 if quick else 50),
+        "reference": lambda: bench_reference(repeat, rounds=1 if quick else 20),
+        "taskmgr": lambda: bench_taskmgr(tasks=1000 if quick else 10_000, workers=4, repeat=repeat),
+        "semantic_scholar": lambda: bench_semantic_scholar(requests=50 if quick else 500, concurrency=16, repeat=repeat),
+    }
+    samples: dict[str, list[Metric]] = {}
+    for name in selected:
+        begin = time.perf_counter()
+        for _ in range(runs):
+            for metric_name, metric in jobs[name]().items():
+                samples.setdefault(metric_name, []).append(metric)
+        print(f"{name}: done in {time.perf_counter() - begin:.1f}s", file=sys.stderr)
+    return {name: replace(measured[0], value=statistics.median(m.value for m in measured)) for name, measured in samples.items()}
+
+
+def load_baseline(path: str) -> dict[str, dict]:
+    with open(path, "r") as f:
+        return json.load(f)["metrics"]
+
+
+def save_baseline(path: str, metrics: dict[str, Metric]) -> None:
+    baseline = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "metrics": {name: asdict(metric) for name, metric in sorted(metrics.items())},
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=4)
+        f.write("\n")
+
+
+def compare(baseline: dict[str, dict], metrics: dict[str, Metric], threshold: float) -> list[str]:
+    """
+    Print every metric next to its baseline.
+
+    Args:
+        baseline: The "metrics" of a saved baseline.
+        metrics: The current results.
+        threshold: Relative slowdown counted as a regression, unless the baseline metric has its own.
+
+    Returns:
+        list[str]. The metrics that are worse than their baseline by more than their threshold.
+    """
+    regressions = []
+    print(f"{'metric':<42} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, metric in sorted(metrics.items()):
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            print(f"{name:<42} {'-':>12} {metric.value:>12.2f} {'new':>8}  {metric.unit}")
+            continue
+        change = metric.value / base["value"] - 1
+        worse = -change if metric.higher_is_better else change
+        regressed = worse > (base.get("threshold") or threshold)
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<42} {base['value']:>12.2f} {metric.value:>12.2f} {change:>+8.1%}  {metric.unit}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Benchmarks to run, all by default", default=BENCHMARKS)
+    parser.add_argument("--quick", action="store_true", help="Small workloads, a smoke test of the suite")
+    parser.add_argument("--cache-sizes", nargs="+", type=int, help="Cache sizes to measure, 100000 by default", default=None)
+    parser.add_argument("--runs", type=int, help="Runs per benchmark, the median of each metric is reported. 5 by default, 1 if quick", default=None)
+    parser.add_argument("--save", help="Write the results as a baseline to this file")
+    parser.add_argument("--check", help="Compare the results with this baseline and fail on a regression")
+    parser.add_argument("--threshold", type=float, help="Relative slowdown counted as a regression", default=0.25)
+    args = parser.parse_args(argv)
+
+    logger.remove()  # Per-request debug logs would dominate the measurements
+    logger.add(sys.stderr, level="WARNING")
+    metrics = run_benchmarks(args.only, quick=args.quick, cache_sizes=args.cache_sizes, runs=args.runs or (1 if args.quick else 5))
+    regressions = compare(load_baseline(args.check) if args.check else {}, metrics, args.threshold)
+    if args.save:
+        save_baseline(args.save, metrics)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+from .citation_graph import CitationGraphCrawler as CitationGraphCrawler  # noqa: F401
+from .citation_graph import CrawlStats as CrawlStats  # noqa: F401
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+import sqlite3
+from array import array
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Callable, Iterable, Iterator, Literal
+
+from loguru import logger
+
+from ..search.semantic_scholar import SemanticScholarSearchEngine
+
+PENDING, RUNNING, DONE, FAILED = 0, 1, 2, 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    id TEXT PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    priority REAL NOT NULL,
+    status INTEGER NOT NULL,
+    failures INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS nodes_frontier ON nodes (status, priority DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+_INSERT_NODE = "INSERT OR IGNORE INTO nodes (id, depth, priority, status) VALUES (?, ?, ?, ?)"
+
+
+class SeenSet:
+    """
+    Set of paper IDs stored as 64-bit hashes instead of strings, a fraction of the memory for millions of IDs.
+
+    A hash collision (about 1 in 10^8 at a million IDs) makes the crawler skip one paper.
+    """
+
+    def __init__(self, ids: Iterable[str] = ()):
+        self._hashes: set[int] = set()
+        for paper_id in ids:
+            self.add(paper_id)
+
+    @staticmethod
+    def _hash(paper_id: str) -> int:
+        return int.from_bytes(blake2b(paper_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def add(self, paper_id: str) -> None:
+        self._hashes.add(self._hash(paper_id))
+
+    def __contains__(self, paper_id: object) -> bool:
+        return isinstance(paper_id, str) and self._hash(paper_id) in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+@dataclass
+class CrawlStats:
+    expanded: int = 0  # Nodes whose neighbours were fetched in this run
+    failed: int = 0  # Nodes that could not be fetched in this run
+    edges: int = 0  # Edges written in this run
+    frontier: int = 0  # Nodes still waiting when the run ended
+
+
+class CitationGraphCrawler:
+    """
+    Crawl the citation neighbourhood of seed papers on Semantic Scholar.
+
+    Nodes are expanded best-first (by default breadth-first) by `concurrency` concurrent workers, whose requests
+    are paced by the scheduler of the engine (see `RequestScheduler`). All state lives in `state_dir`: the node
+    table with the frontier in `state.db`, and one JSON line per edge in `edges.jsonl`. Interrupting the crawl at
+    any point and calling `crawl` again resumes it:
+
+    ```
+    async with SemanticScholarSearchEngine() as engine:
+        crawler = CitationGraphCrawler(engine, "crawl/transformer", max_depth=2)
+        await crawler.crawl(["204e3073870fae3d05bcbc2f6a8e263d9b72e776"])
+
+    for source, target in crawler.iter_edges():  # source cites target
+        ...
+    ```
+    """
+
+    def __init__(
+        self,
+        engine: SemanticScholarSearchEngine,
+        state_dir: str,
+        direction: Literal["citations", "references", "both"] = "citations",
+        max_depth: int = 2,
+        concurrency: int = 8,
+        page_size: int = 1000,
+        max_neighbours: int | None = None,
+        priority: Callable[[dict, int], float] | None = None,
+        max_retries: int = 2,
+    ):
+        """
+        Args:
+            engine: The Semantic Scholar engine used for the requests.
+            state_dir: Directory of the crawl state, created if missing.
+            direction: Follow the papers citing a node, the papers it references, or both. default: "citations"
+            max_depth: Seeds have depth 0, nodes deeper than this are recorded as edges but not expanded. default: 2
+            concurrency: Nodes expanded at the same time. default: 8
+            page_size: Neighbours per request, at most 1000. default: 1000
+            max_neighbours: Fetch at most this many neighbours per node and direction, None fetches all. default: None
+            priority: `priority(paper, depth)` of a discovered paper, higher is expanded first. `paper` holds the fields
+                paperId, title, year and citationCount. default: breadth-first, i.e. `-depth`
+            max_retries: A node that failed is tried again by up to this many later `crawl` calls. default: 2
+        """
+        self._engine = engine
+        self._directions = ["citations", "references"] if direction == "both" else [direction]
+        self._max_depth = max_depth
+        self._concurrency = concurrency
+        self._page_size = page_size
+        self._max_neighbours = max_neighbours
+        self._priority = priority or (lambda paper, depth: -depth)
+        self._max_retries = max_retries
+
+        os.makedirs(state_dir, exist_ok=True)
+        self._edges_path = os.path.join(state_dir, "edges.jsonl")
+        self._db = sqlite3.connect(os.path.join(state_dir, "state.db"))
+        self._db.executescript(_SCHEMA)
+        self._seen = SeenSet(row[0] for row in self._db.execute("SELECT id FROM nodes"))
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _recover(self) -> None:
+        """Undo whatever an interrupted run left half-done, and queue the failed nodes that have retries left."""
+        with self._db:
+            self._db.execute("UPDATE nodes SET status = ? WHERE status = ?", (PENDING, RUNNING))
+            self._db.execute("UPDATE nodes SET status = ? WHERE status = ? AND failures <= ?", (PENDING, FAILED, self._max_retries))
+        # Edges are only committed together with their node, drop the tail written after the last commit.
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'edges_size'").fetchone()
+        committed = int(row[0]) if row is not None else 0
+        if os.path.exists(self._edges_path) and os.path.getsize(self._edges_path) > committed:
+            with open(self._edges_path, "r+b") as f:
+                f.truncate(committed)
+
+    def add_seeds(self, paper_ids: Iterable[str]) -> None:
+        with self._db:
+            for paper_id in paper_ids:
+                if paper_id not in self._seen:
+                    self._seen.add(paper_id)
+                    self._db.execute(_INSERT_NODE, (paper_id, 0, float("inf"), PENDING))
+
+    def _next_nodes(self, n: int) -> list[tuple[str, int]]:
+        rows = self._db.execute("SELECT id, depth FROM nodes WHERE status = ? ORDER BY priority DESC LIMIT ?", (PENDING, n)).fetchall()
+        with self._db:
+            self._db.executemany("UPDATE nodes SET status = ? WHERE id = ?", [(RUNNING, row[0]) for row in rows])
+        return rows
+
+    async def _fetch(self, direction: str, paper_id: str) -> list[dict]:
+        fetch = self._engine.paper_citations if direction == "citations" else self._engine.paper_references
+        key = "citingPaper" if direction == "citations" else "citedPaper"
+        # The engine follows the `next` offset of the API, papers without an ID (not in the graph) still count as consumed.
+        items = fetch(paper_id, fields="paperId,title,year,citationCount", limit=self._max_neighbours, page_size=self._page_size)
+        return [item[key] async for item in items if (item.get(key) or {}).get("paperId")]
+
+    async def _expand(self, paper_id: str) -> list[tuple[str, str, dict]]:
+        """
+        Fetch the neighbours of `paper_id` as distinct (source, target, neighbour) edges, source citing target.
+
+        Every page of every direction is fetched before anything is written, so a node failing part-way leaves
+        no edges behind and is fetched again from its first page when retried.
+        """
+        edges: dict[tuple[str, str], dict] = {}
+        for direction in self._directions:
+            for paper in await self._fetch(direction, paper_id):
+                edge = (paper["paperId"], paper_id) if direction == "citations" else (paper_id, paper["paperId"])
+                edges.setdefault(edge, paper)
+        return [(source, target, paper) for (source, target), paper in edges.items()]
+
+    def _is_done(self, paper_id: str) -> bool:
+        if paper_id not in self._seen:
+            return False
+        return self._db.execute("SELECT 1 FROM nodes WHERE id = ? AND status = ?", (paper_id, DONE)).fetchone() is not None
+
+    def _commit(self, paper_id: str, depth: int, edges: list[tuple[str, str, dict]], edges_file) -> int:
+        """Write the edges of an expanded node and queue its new neighbours. Returns the number of edges written."""
+        if self._is_done(paper_id):  # Its edges are already committed
+            return 0
+        if len(self._directions) > 1:  # Following both directions, expanding a neighbour already wrote the edges between the two
+            edges = [edge for edge in edges if not self._is_done(edge[2]["paperId"])]
+        edges_file.writelines(json.dumps({"source": source, "target": target}) + "\n" for source, target, _ in edges)
+        edges_file.flush()
+        with self._db:
+            if depth < self._max_depth:
+                for _, _, paper in edges:
+                    neighbour = paper["paperId"]
+                    if neighbour not in self._seen:
+                        self._seen.add(neighbour)
+                        priority = self._priority(paper, depth + 1)
+                        self._db.execute(_INSERT_NODE, (neighbour, depth + 1, priority, PENDING))
+            self._db.execute("UPDATE nodes SET status = ? WHERE id = ?", (DONE, paper_id))
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('edges_size', ?)", (str(edges_file.tell()),))
+        return len(edges)
+
+    async def crawl(self, seeds: Iterable[str] = (), max_nodes: int | None = None) -> CrawlStats:
+        """
+        Crawl until the frontier is empty or `max_nodes` nodes were expanded in this call.
+
+        Args:
+            seeds: Paper IDs to start from. They are added to the frontier of a resumed crawl.
+            max_nodes: Stop after expanding this many nodes, None crawls everything up to `max_depth`. default: None
+
+        Returns:
+            CrawlStats. What this call did.
+        """
+        self._recover()
+        self.add_seeds(seeds)
+        stats = CrawlStats()
+        running: dict[asyncio.Task, tuple[str, int]] = {}
+
+        with open(self._edges_path, "a") as edges_file:
+            try:
+                while True:
+                    budget = self._concurrency - len(running)
+                    if max_nodes is not None:
+                        budget = min(budget, max_nodes - stats.expanded - stats.failed - len(running))
+                    if budget > 0:
+                        for paper_id, depth in self._next_nodes(budget):
+                            running[asyncio.create_task(self._expand(paper_id))] = (paper_id, depth)
+                    if not running:
+                        break
+
+                    done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        paper_id, depth = running.pop(task)
+                        if task.exception() is not None:
+                            logger.warning(f"Failed to expand {paper_id}: {task.exception()!r}")
+                            with self._db:
+                                self._db.execute("UPDATE nodes SET status = ?, failures = failures + 1 WHERE id = ?", (FAILED, paper_id))
+                            stats.failed += 1
+                            continue
+                        stats.edges += self._commit(paper_id, depth, task.result(), edges_file)
+                        stats.expanded += 1
+            finally:
+                for task in running:
+                    task.cancel()
+                await asyncio.gather(*running, return_exceptions=True)
+
+        stats.frontier = self._db.execute("SELECT COUNT(*) FROM nodes WHERE status IN (?, ?)", (PENDING, RUNNING)).fetchone()[0]
+        logger.info(f"Crawl finished: {stats}")
+        return stats
+
+    def iter_edges(self) -> Iterator[tuple[str, str]]:
+        """Stream the committed edges as (source, target) pairs, source citing target."""
+        if not os.path.exists(self._edges_path):
+            return
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'edges_size'").fetchone()
+        committed = int(row[0]) if row is not None else 0
+        with open(self._edges_path, "rb") as f:
+            while f.tell() < committed and (line := f.readline()):
+                edge = json.loads(line)
+                yield edge["source"], edge["target"]
+
+    def adjacency(self) -> tuple[list[str], array, array]:
+        """
+        The graph in compressed sparse row form.
+
+        Returns:
+            (ids, offsets, targets): node `i` is `ids[i]` and cites the nodes `targets[offsets[i]:offsets[i + 1]]`.
+        """
+        index: dict[str, int] = {}
+        out: list[list[int]] = []
+        for source, target in self.iter_edges():
+            for paper_id in (source, target):
+                if paper_id not in index:
+                    index[paper_id] = len(index)
+                    out.append([])
+            out[index[source]].append(index[target])
+        offsets, targets = array("Q", [0]), array("I")
+        for neighbours in out:
+            targets.extend(neighbours)
+            offsets.append(len(targets))
+        return list(index), offsets, targets
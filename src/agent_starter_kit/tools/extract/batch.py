@@ -0,0 +1,291 @@
+"""
+Extract the references of many PDF files on all cores.
+
+Usage: python -m agent_starter_kit.tools.extract.batch papers/ "more/**/*.pdf" -o references.jsonl [--workers 8] [--timeout 60]
+
+One JSON record per file is appended to the output as soon as the file is done:
+
+```
+{"path": "papers/a.pdf", "sha256": "...", "pages": 12, "type": "NUMBERED", "ref_pages": [10, 12], "count": 41,
+ "refs": ["[1] ...", ...], "timings": {"hash": 0.001, "extract": 0.03}, "error": null}
+```
+
+`type` is the name of the detected `ReferenceType`, `ref_pages` the first and last reference page counting
+from 1. Files whose content hash already has an error-free record in the output are skipped, so an
+interrupted run can simply be started again.
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO, Iterable, Iterator
+
+from loguru import logger
+
+from .reference import extract_references, open_pdf
+
+
+class ExtractionTimeout(Exception):
+    """A file took longer than the per-file timeout."""
+
+
+def iter_pdf_paths(inputs: Iterable[str]) -> Iterator[str]:
+    """
+    Expand files, directories (searched recursively) and glob patterns into PDF paths, each path once.
+    """
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            paths = sorted(glob.glob(os.path.join(glob.escape(item), "**", "*.pdf"), recursive=True))
+        elif os.path.isfile(item):
+            paths = [item]
+        else:
+            paths = sorted(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        for path in paths:
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+
+def load_done(output: str) -> set[str]:
+    """Content hashes that have an error-free record in `output`."""
+    done: set[str] = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:  # a line cut short by an interrupted run
+                continue
+            if record.get("error") is None and record.get("sha256"):
+                done.add(record["sha256"])
+    return done
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+_done: frozenset[str] = frozenset()
+
+
+def _init_worker(done: frozenset[str]) -> None:
+    global _done
+    _done = done
+
+
+def _on_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+
+def process_file(path: str, begin: int = 0, end: int = -1, timeout: float | None = None) -> dict | None:
+    """
+    Extract the references of one file into a record. Runs in a worker process.
+
+    Returns:
+        dict | None. The record, None if the file was processed by an earlier run.
+    """
+    record: dict = {
+        "path": path,
+        "sha256": None,
+        "pages": None,
+        "type": None,
+        "ref_pages": None,
+        "count": 0,
+        "refs": [],
+        "timings": {},
+        "error": None,
+    }
+    started = time.perf_counter()
+    # Best effort: the alarm interrupts extraction between two calls into MuPDF and only exists on Unix.
+    # A file stuck inside MuPDF is caught by the parent, which kills the worker (see `_run`).
+    use_alarm = timeout is not None and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+    try:
+        if timeout is not None and use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        with open(path, "rb") as f:
+            data = f.read()  # Hashed and parsed from memory, the file is read once
+        record["sha256"] = hashlib.sha256(data).hexdigest()
+        record["timings"]["hash"] = time.perf_counter() - started
+        if record["sha256"] in _done:
+            return None
+
+        started = time.perf_counter()
+        with open_pdf(data) as doc:
+            record["pages"] = len(doc)
+            extracted = extract_references(doc, begin=begin, end=end)
+        record["timings"]["extract"] = time.perf_counter() - started
+        if extracted is not None:
+            record["type"] = extracted.ref_type.name
+            record["ref_pages"] = [extracted.page_begin + 1, extracted.page_end + 1]
+            record["count"] = len(extracted.refs)
+            record["refs"] = extracted.refs
+    except ExtractionTimeout:
+        record["error"] = f"Timed out after {timeout}s"
+    except Exception as e:
+        record["error"] = repr(e)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return record
+
+
+def run_batch(
+    inputs: Iterable[str],
+    output: str | IO[str],
+    workers: int | None = None,
+    timeout: float | None = 60.0,
+    begin: int = 0,
+    end: int = -1,
+    resume: bool = True,
+) -> dict[str, int]:
+    """
+    Extract the references of every PDF in `inputs` in a process pool, appending one JSON line per file to `output`.
+
+    Args:
+        inputs: Files, directories and glob patterns.
+        output: The JSONL file (appended to) or an open text stream.
+        workers: Number of processes. default: one per core
+        timeout: Give up on a file after this many seconds, killing its worker if needed. None waits forever. default: 60.0
+        begin: First page to look at, counting from 0. default: 0
+        end: Last page to look at, -1 for the last page. default: -1
+        resume: Skip files whose content already has an error-free record in `output`, only if `output` is a path. default: True
+
+    Returns:
+        dict[str, int]. How many files were "processed", "skipped" and "failed".
+    """
+    if isinstance(output, str):
+        done = load_done(output) if resume else set()
+        with open(output, "a") as f:
+            if f.tell() > 0 and not _ends_with_newline(output):
+                f.write("\n")  # Terminate the line an interrupted run cut short
+            return _run(inputs, f, workers, timeout, begin, end, done)
+    return _run(inputs, output, workers, timeout, begin, end, set())
+
+
+_KILL_GRACE = 1.0  # Seconds past the timeout before the parent kills a worker, giving the alarm in the worker the first chance
+
+
+def _new_pool(workers: int, done: set[str]) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(frozenset(done),))
+
+
+def _kill(pool: ProcessPoolExecutor) -> None:
+    """Kill the workers of `pool`, e.g. one stuck in MuPDF where the alarm cannot interrupt it."""
+    for process in list(pool._processes.values()):  # type: ignore[union-attr]  # No public API before Python 3.14
+        process.kill()
+    pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _error_record(path: str, error: str) -> dict:
+    return {"path": path, "sha256": None, "error": error}
+
+
+def _run(inputs: Iterable[str], output: IO[str], workers: int | None, timeout: float | None, begin: int, end: int, done: set[str]) -> dict[str, int]:
+    """
+    Feed the files to a process pool, at most one per worker so that a file's deadline starts when it is submitted.
+
+    A file still running `_KILL_GRACE` seconds after its timeout gets an error record and the pool is replaced.
+    When a worker dies, every file that was in flight is a suspect and is run again alone in a fresh pool: a file
+    that takes down a worker on its own gets an error record, the others are processed normally.
+    """
+    stats = {"processed": 0, "skipped": 0, "failed": 0}
+    workers = workers or os.cpu_count() or 1
+    paths = iter_pdf_paths(inputs)
+    requeued: list[str] = []  # In flight when the pool was replaced for another file's sake
+    suspects: list[str] = []  # In flight when a worker died
+    running: dict[Future, tuple[str, float, bool]] = {}  # path, deadline, run alone
+
+    def submit(path: str, alone: bool) -> None:
+        running[pool.submit(process_file, path, begin, end, timeout)] = (path, time.monotonic() + (timeout or 0) + _KILL_GRACE, alone)
+
+    def write(record: dict | None) -> None:
+        if record is None:
+            stats["skipped"] += 1
+            return
+        stats["failed" if record["error"] is not None else "processed"] += 1
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+    def collect(future: Future) -> bool:
+        """Write the record of a finished file. Returns False if the pool broke."""
+        path, _, alone = running.pop(future)
+        try:
+            write(future.result())
+        except BrokenProcessPool as e:
+            if alone:
+                write(_error_record(path, f"The worker process died: {e!r}"))
+            else:
+                suspects.append(path)
+            return False
+        except Exception as e:
+            write(_error_record(path, repr(e)))
+        return True
+
+    pool = _new_pool(workers, done)
+    try:
+        while True:
+            if suspects:
+                if not running:
+                    submit(suspects.pop(0), alone=True)
+            else:
+                # The path list of a large corpus is never materialized.
+                while len(running) < workers and (path := requeued.pop() if requeued else next(paths, None)) is not None:
+                    submit(path, alone=False)
+            if not running:
+                break
+
+            wait_for = None if timeout is None else max(min(deadline for _, deadline, _ in running.values()) - time.monotonic(), 0.0)
+            finished, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+            collected = [collect(future) for future in finished]
+            broken = not all(collected)
+            if broken:  # Every future of a broken pool fails, collect them all before starting over
+                for future in wait(running).done:
+                    collect(future)
+            now = time.monotonic()
+            expired = [] if broken else [future for future, (_, deadline, _) in running.items() if deadline <= now]
+            for future in expired:
+                write(_error_record(running.pop(future)[0], f"Timed out after {timeout}s"))
+            if expired:
+                requeued.extend(path for path, _, _ in running.values())
+                running.clear()
+                _kill(pool)
+            if broken or expired:
+                logger.warning(f"Replacing the process pool after {'a worker died' if broken else 'a timeout'}, {len(suspects)} files to run alone")
+                pool.shutdown(wait=True, cancel_futures=True)
+                pool = _new_pool(workers, done)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return stats
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Extract the references of many PDF files into a JSONL file")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("-o", "--output", help="JSONL file the records are appended to", default="references.jsonl")
+    parser.add_argument("--workers", type=int, help="Number of processes, one per core by default", default=None)
+    parser.add_argument("--timeout", type=float, help="Per-file timeout in seconds, 0 disables it", default=60.0)
+    parser.add_argument("--begin", type=int, help="Start page, counting from 0", default=0)
+    parser.add_argument("--end", type=int, help="End page, -1 for the last page", default=-1)
+    parser.add_argument("--no-resume", action="store_true", help="Process files that already have a record")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = run_batch(args.inputs, args.output, args.workers, args.timeout or None, args.begin, args.end, resume=not args.no_resume)
+    print(f"{stats['processed']} processed, {stats['skipped']} skipped, {stats['failed']} failed in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
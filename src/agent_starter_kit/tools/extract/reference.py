@@ -1,8 +1,13 @@
 import argparse
+import io
 import logging
+import mmap
+import os
 import re
 from collections import Counter
+from dataclasses import dataclass
 from enum import Enum
+from typing import IO
 
 import pymupdf
 
@@ -41,6 +46,10 @@ def classify_reference_type(block_text: str) -> ReferenceType | None:
     return None
 
 
+_REF_HEADING = re.compile(r"(\u53c2\u8003\u6587\u732e|reference|bibliography)")
+_WHITESPACE = re.compile(r"\s+")
+
+
 def is_ref_block(block_text: str):
     """
     Check if a block of text is a reference block (e.g. "参考文献", "Reference", "Bibliography")
@@ -51,128 +60,227 @@ def is_ref_block(block_text: str):
     Returns:
         bool. True if the block is a reference block, False otherwise
     """
-    block_text = re.sub(r"\s+", "", block_text.lower())
-    refbreak = re.compile(r"(\u53c2\u8003\u6587\u732e|reference|bibliography)")
+    block_text = _WHITESPACE.sub("", block_text.lower())
     if len(block_text) > 20:
         return False
-    ret = re.match(refbreak, block_text)
-    return ret is not None
+    return _REF_HEADING.match(block_text) is not None
 
 
-def get_ref_page(doc: pymupdf.Document):
+@dataclass(slots=True, frozen=True)
+class TextBlock:
+    """A text block of a page, with the normalized forms of its text computed once."""
 
-    reference_page = -1
+    rect: tuple[float, float, float, float]
+    text: str  # Lines joined by spaces, hyphenation removed
+    clean: str  # `text` without surrounding whitespace
+    is_heading: bool  # The raw text is a reference heading
+    is_clean_heading: bool  # `clean` is a reference heading, i.e. also after hyphenation was removed
 
-    for page in doc:
 
-        blist = page.get_text("blocks")
+def load_blocks(page: pymupdf.Page) -> list[TextBlock]:
+    """Read the text blocks of `page`, the only `get_text` call made per page."""
+    blocks = []
+    for block in page.get_text("blocks"):  # Block: (x0, y0, x1, y1, text, block_no, block_type)
+        raw = block[4]
+        text = raw.replace("\n", " ").replace("- ", "")
+        clean = text.strip()
+        blocks.append(TextBlock(tuple(block[:4]), text, clean, is_ref_block(raw), is_ref_block(clean)))
+    return blocks
 
-        for block in blist:
-            block_text = block[4]
-            color = (1, 0, 0)
-            rect = pymupdf.Rect(block[:4])
 
-            page.draw_rect(rect, color=color)
-            page.insert_textbox(rect=rect, buffer="Block", color=color, fontsize=5)
+class DocumentBlocks:
+    """The blocks of every page of a document, loaded on first access and cached."""
 
-            if is_ref_block(block_text):
-                reference_page = max(reference_page, page.number)
+    def __init__(self, doc: pymupdf.Document):
+        self.doc = doc
+        self._pages: dict[int, list[TextBlock]] = {}
 
-    return reference_page
+    def __len__(self) -> int:
+        return len(self.doc)
 
+    def __getitem__(self, pno: int) -> list[TextBlock]:
+        if pno not in self._pages:
+            self._pages[pno] = load_blocks(self.doc[pno])
+        return self._pages[pno]
 
-def mark_and_collect_references(page: pymupdf.Page, hit_ref_block=False):
-    blist = page.get_text("blocks", delimiters=None)  # make the word list
-    refs = []
-    for b in blist:  # scan through all words on page
-        block_text = b[4].replace("\n", " ").replace("- ", "").strip()
-        rect = pymupdf.Rect(b[:4])
 
-        if not hit_ref_block:
-            if is_ref_block(block_text):
-                hit_ref_block = True
-            page.draw_rect(rect, color=(0, 0, 1))
-            continue
+def _page_range(page_count: int, begin: int, end: int) -> range:
+    """Page numbers `begin` to `end` inclusive, `end=-1` meaning the last page."""
+    last = page_count - 1 if end == -1 else min(end, page_count - 1)
+    return range(max(begin, 0), last + 1)
 
-        if classify_reference_type(block_text) is None:  # Non reference
-            page.draw_rect(rect, color=(0, 0, 1))
-        else:  # Reference
-            page.draw_rect(rect, color=(1, 0, 1))
-            refs.append(block_text.strip().replace("\n", " ").replace("- ", "").replace("/ ", "/"))
 
-    return hit_ref_block, refs
+def get_ref_page(doc: pymupdf.Document | DocumentBlocks, begin: int = 0, end: int = -1) -> int:
+    """
+    Find the last page holding a reference heading, scanning backwards from the end of the document.
 
+    Args:
+        begin: First page to consider, counting from 0. default: 0
+        end: Last page to consider, -1 for the last page of the document. default: -1
+
+    Returns:
+        int. The page number, -1 if there is no reference heading.
+    """
+    blocks = doc if isinstance(doc, DocumentBlocks) else DocumentBlocks(doc)
+    for pno in reversed(_page_range(len(blocks), begin, end)):
+        if any(block.is_heading for block in blocks[pno]):
+            return pno
+    return -1
 
-def count_references_on_page(page: pymupdf.Page, type: ReferenceType):
-    """ """
-    counter = 0
-    for block in page.get_text("blocks"):
-        block_text = block[4].replace("\n", " ").replace("- ", "")  # Block: (x,y,w,h,text,...,...)
-        if type.pattern.match(block_text):
-            counter += 1
-    return counter
 
+def mark_blocks(page: pymupdf.Page, blocks: list[TextBlock]) -> None:
+    """Outline every block of `page` in red and label it."""
+    for block in blocks:
+        rect = pymupdf.Rect(block.rect)
+        page.draw_rect(rect, color=(1, 0, 0))
+        page.insert_textbox(rect=rect, buffer="Block", color=(1, 0, 0), fontsize=5)
 
-def get_all_refs(pdf_filepath: str, save_marked_pdf: bool = False) -> list[str] | None:
+
+def mark_and_collect_references(blocks: list[TextBlock], hit_ref_block=False, page: pymupdf.Page | None = None):
     """
-    Extracts all references from a PDF file.
-    This function processes a PDF file to identify and extract references from it. It identifies the reference section,
-    determines the major reference type, and collects all references. Optionally, it can save a marked version of the PDF.
-    Args:
-        pdf_filepath (str): The path to the PDF file.
-        save_marked_pdf (bool, optional): If True, saves a marked version of the PDF with references highlighted. Defaults to False.
+    Collect the references among `blocks`, the ones after the reference heading. If `page` is given, outline the
+    references in magenta and the other blocks in blue.
+
     Returns:
-        list[str] | None: A list of extracted references if found, otherwise None.
+        (hit_ref_block, refs): whether the heading was seen by the end of the page, and the references.
     """
+    refs = []
+    for block in blocks:
+        is_ref = False
+        if not hit_ref_block:
+            hit_ref_block = block.is_clean_heading
+        elif classify_reference_type(block.clean) is not None:
+            is_ref = True
+            refs.append(block.clean.replace("\n", " ").replace("- ", "").replace("/ ", "/"))
+        if page is not None:
+            page.draw_rect(pymupdf.Rect(block.rect), color=(1, 0, 1) if is_ref else (0, 0, 1))
 
-    doc = pymupdf.open(pdf_filepath)
+    return hit_ref_block, refs
 
-    ref_page_begin = get_ref_page(doc)
-    if ref_page_begin == -1:
-        print("No reference page found")
-        return None
 
+def count_references_on_page(blocks: list[TextBlock], type: ReferenceType):
+    """Count the blocks of a page that match the reference pattern of `type`."""
+    return sum(1 for block in blocks if type.pattern.match(block.text))
+
+
+def vote_reference_type(blocks: DocumentBlocks, ref_page_begin: int, end: int = -1) -> ReferenceType | None:
+    """The most common reference type among the blocks following the heading on the first two reference pages."""
+    votes: Counter = Counter()
     hit_ref_block = False
-    ref_counter: Counter = Counter()
-    for page in doc[ref_page_begin : ref_page_begin + 2]:  # noqa: E203
-        blist = page.get_text("blocks")
-        for block in blist:
+    for pno in _page_range(len(blocks), ref_page_begin, end)[:2]:
+        for block in blocks[pno]:
             if not hit_ref_block:
-                if not is_ref_block(block[4]):
+                if not block.is_heading:
                     continue
                 hit_ref_block = True
+            for ref_type in ReferenceType:
+                if ref_type.pattern.match(block.text):
+                    votes[ref_type] += 1
+    if not votes:
+        return None
+    return votes.most_common(1)[0][0]
+
+
+type PdfSource = str | os.PathLike | bytes | bytearray | memoryview | mmap.mmap | IO[bytes] | pymupdf.Document
+
 
-            block_text = block[4].replace("\n", " ").replace("- ", "")
-            matches = [ref_type for ref_type in ReferenceType if ref_type.pattern.match(block_text)]
-            ref_counter = ref_counter + Counter(matches)
+def open_pdf(source: PdfSource) -> pymupdf.Document:
+    """
+    Open a PDF given as a path, an in-memory buffer, a binary file-like object or an open document.
+
+    `bytes` and `io.BytesIO` are handed to MuPDF without a copy. MuPDF needs an immutable buffer, so `bytearray`,
+    `memoryview` and `mmap` contents are copied once, and other streams are read once.
+    """
+    if isinstance(source, pymupdf.Document):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        return pymupdf.open(source)
+    if isinstance(source, (bytes, io.BytesIO)):
+        return pymupdf.open(stream=source, filetype="pdf")
+    if isinstance(source, (bytearray, memoryview, mmap.mmap)):
+        return pymupdf.open(stream=bytes(source), filetype="pdf")
+    if hasattr(source, "read"):
+        return pymupdf.open(stream=source.read(), filetype="pdf")
+    raise TypeError(f"Cannot open a PDF from {type(source).__name__}")
+
+
+@dataclass(slots=True)
+class ExtractedReferences:
+    """The references of a document and where they were found."""
+
+    refs: list[str]
+    ref_type: ReferenceType  # The major reference style
+    page_begin: int  # First page of the reference section, counting from 0
+    page_end: int  # Last page holding references, counting from 0, -1 if no page did
+    marked_pdf: bytes | None = None  # The document with the blocks and references outlined, if marking was requested
+
+
+def extract_references(source: PdfSource, mark: bool = False, begin: int = 0, end: int = -1) -> ExtractedReferences | None:
+    """
+    Same as `get_all_refs`, but for any `PdfSource`, also reporting the detected reference style and page range.
+    Nothing is written to disk: with `mark`, the marked document is returned as bytes.
+
+    ```
+    pdf = await response.read()  # e.g. downloaded from PaperSearchResult.open_access_link
+    extracted = extract_references(pdf, mark=True)
+    ```
+
+    Args:
+        source: The PDF, see `open_pdf`. An open document is drawn on if `mark` is set.
+        mark: Outline the blocks and references and return the result in `marked_pdf`. default: False
+        begin: First page to look at, counting from 0. default: 0
+        end: Last page to look at, -1 for the last page of the document. default: -1
+
+    Returns:
+        ExtractedReferences | None. None if no reference section was found.
+    """
+    doc = open_pdf(source)
+    try:
+        return _extract_from_document(doc, mark, begin, end)
+    finally:
+        if doc is not source:  # Only close what was opened here, the caller keeps using its own document
+            doc.close()
+
+
+def _extract_from_document(doc: pymupdf.Document, mark: bool, begin: int, end: int) -> ExtractedReferences | None:
+    blocks = DocumentBlocks(doc)
+
+    ref_page_begin = get_ref_page(blocks, begin, end)
+    if ref_page_begin == -1:
+        logging.info("No reference page found")
+        return None
 
-    major_ref_type, _ = ref_counter.most_common(1)[0]
+    major_ref_type = vote_reference_type(blocks, ref_page_begin, end)
+    if major_ref_type is None:
+        logging.info("No references found after the reference heading")
+        return None
+
+    if mark:
+        for pno in range(len(doc)):
+            mark_blocks(doc[pno], blocks[pno])
 
     hit_ref_block = False
     ref_page_end = -1
     all_refs = []
-    for page in doc[ref_page_begin:]:
-        refcnt = count_references_on_page(page, major_ref_type)
-        logging.debug(f"Page {page.number+1} with refcnt {refcnt}")
+    for pno in _page_range(len(doc), ref_page_begin, end):
+        page_blocks = blocks[pno]
+        refcnt = count_references_on_page(page_blocks, major_ref_type)
+        logging.debug(f"Page {pno+1} with refcnt {refcnt}")
         if refcnt == 0 and ref_page_end != -1:
-            ref_page_end = max(ref_page_begin, page.number - 1)
+            ref_page_end = max(ref_page_begin, pno - 1)
             break
         if refcnt != 0:
-            ref_page_end = page.number
+            ref_page_end = pno
 
-        hit_ref_block, refs = mark_and_collect_references(page, hit_ref_block)  # mark the page's words
+        hit_ref_block, refs = mark_and_collect_references(page_blocks, hit_ref_block, doc[pno] if mark else None)
 
-        blockcnt = len(page.get_text("blocks"))
-        if refcnt / blockcnt < 0.05:
+        if not page_blocks or refcnt / len(page_blocks) < 0.05:
             continue
 
         all_refs.extend(refs)
 
-    print(f"Major Reference type: {major_ref_type}")
-    print(f"Reference page range: {ref_page_begin+1} - {ref_page_end+1}")
-
-    if save_marked_pdf:
-        doc.save("marked-" + doc.name)
+    logging.info(f"Major Reference type: {major_ref_type}")
+    logging.info(f"Reference page range: {ref_page_begin+1} - {ref_page_end+1}")
 
     all_refs_finegrained = []  # Sometimes [] references stick together and need further splitting
     if major_ref_type == ReferenceType.NUMBERED:
@@ -184,20 +292,50 @@ def get_all_refs(pdf_filepath: str, save_marked_pdf: bool = False) -> list[str]
     else:
         all_refs_finegrained = all_refs
 
-    return all_refs_finegrained
+    return ExtractedReferences(all_refs_finegrained, major_ref_type, ref_page_begin, ref_page_end, doc.tobytes() if mark else None)
+
+
+def get_all_refs(pdf_filepath: PdfSource, save_marked_pdf: bool = False, begin: int = 0, end: int = -1) -> list[str] | None:
+    """
+    Extracts all references from a PDF file.
+    This function processes a PDF file to identify and extract references from it. It identifies the reference section,
+    determines the major reference type, and collects all references. Optionally, it can save a marked version of the PDF.
+    Every page is read at most once, pages before the reference section are not read at all unless they are marked.
+    Args:
+        pdf_filepath (PdfSource): The path to the PDF file, or the PDF itself as bytes, a buffer or a binary stream.
+        save_marked_pdf (bool, optional): If True, saves a marked version of the PDF with references highlighted next to the
+            input, as "marked-<name>". Only possible for paths, see `extract_references` otherwise. Defaults to False.
+        begin (int, optional): First page to look at, counting from 0. Defaults to 0.
+        end (int, optional): Last page to look at, -1 for the last page of the document. Defaults to -1.
+    Returns:
+        list[str] | None: A list of extracted references if found, otherwise None.
+    """
+    if save_marked_pdf and not isinstance(pdf_filepath, (str, os.PathLike)):
+        raise ValueError("save_marked_pdf needs a file path, use extract_references(..., mark=True) to get the marked PDF as bytes")
+    extracted = extract_references(pdf_filepath, save_marked_pdf, begin, end)
+    if extracted is None:
+        return None
+    if extracted.marked_pdf is not None:
+        assert isinstance(pdf_filepath, (str, os.PathLike))
+        directory, name = os.path.split(os.fspath(pdf_filepath))
+        with open(os.path.join(directory, "marked-" + name), "wb") as f:
+            f.write(extracted.marked_pdf)
+    return extracted.refs
 
 
 if __name__ == "__main__":
     """
-    Usage: python extract_reference.py filename.pdf
+    Usage: python reference.py filename.pdf [--begin 0] [--end -1]
+
+    See `batch.py` to process many files.
     """
     parser = argparse.ArgumentParser(description="Mark blocks in a PDF file")
     parser.add_argument("filename", help="PDF file to process")
-    parser.add_argument("--begin", type=int, help="Start page", default=0)
-    parser.add_argument("--end", type=int, help="End page", default=-1)
+    parser.add_argument("--begin", type=int, help="Start page, counting from 0", default=0)
+    parser.add_argument("--end", type=int, help="End page, -1 for the last page", default=-1)
     args = parser.parse_args()
 
-    refs = get_all_refs(args.filename)
+    refs = get_all_refs(args.filename, begin=args.begin, end=args.end)
     if refs is None:
         print("No references found, please check the PDF file")
         exit(1)
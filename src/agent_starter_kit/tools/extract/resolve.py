@@ -0,0 +1,242 @@
+import asyncio
+import re
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Sequence
+
+from loguru import logger
+
+from ..search.base import PaperSearchResult, normalize_title
+from ..search.index import LocalPaperIndex
+from ..search.semantic_scholar import SemanticScholarSearchEngine
+
+_LEADING_NUMBER = re.compile(r"^\s*(?:\[\d+\]|\d+\.)\s*")
+_YEAR = re.compile(r"\b((?:19|20)\d{2})[a-z]?\b")
+_PAREN_YEAR = re.compile(r"\(\s*((?:19|20)\d{2})[a-z]?\s*\)\.?")
+_DOI = re.compile(r"\b(10\.\d{4,9}/[^\s\"<>]+[^\s\"<>.,;])")
+_ARXIV = re.compile(r"(?:arxiv:\s*|arxiv\.org/(?:abs|pdf)/)(\d{4}\.\d{4,5})", re.IGNORECASE)
+_NAME = r"[A-Z][\w'\-]+(?:\s[A-Z][\w'\-]+)*"
+_INITIALS = r"(?:[A-Z]\.[\s\-]?)+"
+# "Ba, E.; Hamilton, A. and Devlin, C." and "E. Devlin, B. Parmar and W. He" at the start of a reference
+_SEPARATOR = r"\s*[;,]?\s*(?:and\b|&)?\s*"
+_SURNAME_FIRST = re.compile(rf"^(?:{_NAME},\s*{_INITIALS}{_SEPARATOR})+(?:et al\.)?")
+_INITIALS_FIRST = re.compile(rf"^(?:{_INITIALS}\s*{_NAME}{_SEPARATOR})+(?:et al\.)?")
+_SURNAME_FIRST_NAME = re.compile(rf"({_NAME}),\s*({_INITIALS})")
+_INITIALS_FIRST_NAME = re.compile(rf"({_INITIALS})\s*({_NAME})")
+_SENTENCE_END = re.compile(r"(?<=[^\W_A-Z]|\))\.\s+|(?<=[?!])\s+")  # not after initials such as "A. "
+
+
+@dataclass(slots=True)
+class ParsedReference:
+    """The fields of a reference string, as far as they could be recognized."""
+
+    raw: str
+    authors: list[str] = field(default_factory=list)  # "E. Devlin", in order
+    title: str | None = None
+    year: int | None = None
+    venue: str | None = None
+    doi: str | None = None
+    arxiv_id: str | None = None
+
+
+@dataclass(slots=True)
+class ResolvedReference:
+    reference: ParsedReference
+    paper: PaperSearchResult | None  # The best candidate found, whatever its confidence
+    confidence: float  # 0 to 1, see `score_match`
+    source: str | None  # "index" or "semantic_scholar"
+
+
+def _match_authors(text: str) -> tuple[int, list[str]]:
+    """Where the author list at the start of `text` ends, and the authors as "E. Devlin", (0, []) if none is recognized."""
+    surname_first, initials_first = _SURNAME_FIRST.match(text), _INITIALS_FIRST.match(text)
+    if surname_first is not None and (initials_first is None or surname_first.end() >= initials_first.end()):
+        return surname_first.end(), [f"{initials.strip()} {surname}" for surname, initials in _SURNAME_FIRST_NAME.findall(surname_first.group())]
+    if initials_first is not None:
+        return initials_first.end(), [f"{initials.strip()} {surname}" for initials, surname in _INITIALS_FIRST_NAME.findall(initials_first.group())]
+    return 0, []
+
+
+def parse_reference(raw: str) -> ParsedReference:
+    """
+    Split a reference string into authors, title, year and venue with heuristics for the numbered,
+    author-year and APA styles, e.g. "[3] E. Devlin, B. Parmar. A title. In ICML, 2008.",
+    "Ba, E.; Hamilton, A. A title. ICML, 2012." or "Ba, E., & Hamilton, A. (2012). A title. ICML.".
+    """
+    text = _LEADING_NUMBER.sub("", raw).strip()
+    reference = ParsedReference(raw)
+    if doi := _DOI.search(text):
+        reference.doi = doi.group(1)
+    if arxiv := _ARXIV.search(text):
+        reference.arxiv_id = arxiv.group(1)
+
+    if paren := _PAREN_YEAR.search(text):
+        reference.year = int(paren.group(1))
+        authors, rest = text[: paren.start()], text[paren.end() :]  # noqa: E203
+        reference.authors = _match_authors(authors)[1] or [name.strip(" .") for name in re.split(r",|;|\band\b|&", authors) if name.strip(" .")]
+    else:
+        if years := _YEAR.findall(text):
+            reference.year = int(years[-1])
+        end, reference.authors = _match_authors(text)
+        if end > 0:
+            rest = text[end:]
+        else:  # Full names such as "Kaiming He, Xiangyu Zhang, and Jian Sun."
+            authors, _, rest = text.partition(". ")
+            reference.authors = [name.strip(" .") for name in re.split(r",|\band\b", authors) if name.strip(" .")]
+
+    sentences = _SENTENCE_END.split(rest.strip(" .,:"), maxsplit=1)
+    reference.title = sentences[0].strip(" .") or None
+    if len(sentences) > 1:
+        venue = _ARXIV.sub("", _DOI.sub("", sentences[1]))
+        venue = _YEAR.sub("", re.sub(r"^In\s+", "", venue))
+        venue = re.sub(r"\b(?:doi|arxiv)[:\s]*$", "", venue.strip(" .,;:"), flags=re.IGNORECASE).strip(" .,;:")
+        reference.venue = venue or None
+    return reference
+
+
+def _surname(name: str) -> str:
+    """The surname of `name` for comparison, so that E. Devlin and Jacob Devlin both give devlin."""
+    parts = name.split()
+    return normalize_title(parts[-1]) if parts else ""
+
+
+def score_match(reference: ParsedReference, paper: PaperSearchResult) -> float:
+    """
+    How likely `paper` is the paper `reference` refers to, from 0 to 1.
+
+    The base is the similarity of the normalized titles. A year within one of the reference's adds a little,
+    a year further away subtracts, and so does agreeing on the surname of the first author.
+    """
+    if reference.title is None:
+        return 0.0
+    score = SequenceMatcher(None, normalize_title(reference.title), normalize_title(paper.title)).ratio()
+    if reference.year is not None and paper.year is not None:
+        score += 0.05 if abs(reference.year - paper.year) <= 1 else -0.15
+    first_author = _surname(reference.authors[0]) if reference.authors else ""
+    if first_author and paper.authors and first_author == _surname(paper.authors[0].full_name):
+        score += 0.05
+    return min(max(score, 0.0), 1.0)
+
+
+class ReferenceResolver:
+    """
+    Turn extracted reference strings into paper records.
+
+    References are looked up in the local index first. What is not found there with at least `min_confidence`
+    goes to Semantic Scholar: references carrying a DOI or arXiv ID in one `papers_batch` request per 500 IDs,
+    the others by title, concurrently and deduplicated, paced by the engine's scheduler. Papers found remotely
+    are stored in the index, so resolving the references of related papers gets cheaper over time.
+
+    ```
+    resolver = ReferenceResolver(SemanticScholarSearchEngine(), LocalPaperIndex("papers.db"))
+    for resolved in await resolver.resolve(get_all_refs("paper.pdf")):
+        if resolved.confidence > 0.9:
+            print(resolved.paper.title)
+    ```
+    """
+
+    def __init__(
+        self,
+        engine: SemanticScholarSearchEngine | None = None,
+        index: LocalPaperIndex | None = None,
+        min_confidence: float = 0.85,
+        concurrency: int = 8,
+        candidates: int = 5,
+    ):
+        """
+        Args:
+            engine: Where to look up what the index does not know, None resolves locally only. default: None
+            index: The local index to look in first and to store remote results in. default: None
+            min_confidence: A local candidate this good is accepted without asking `engine`. default: 0.85
+            concurrency: Title lookups in flight at once, the scheduler still paces them. default: 8
+            candidates: Local candidates scored per reference. default: 5
+        """
+        self._engine = engine
+        self._index = index
+        self._min_confidence = min_confidence
+        self._concurrency = concurrency
+        self._candidates = candidates
+
+    async def _resolve_locally(self, resolved: ResolvedReference) -> None:
+        assert self._index is not None and resolved.reference.title is not None
+        for paper in await self._index.search(resolved.reference.title, limit=self._candidates):
+            self._offer(resolved, paper, "index")
+
+    def _offer(self, resolved: ResolvedReference, paper: PaperSearchResult | None, source: str, confidence: float | None = None) -> None:
+        """Keep `paper` if it is a better candidate than the current one."""
+        if paper is None:
+            return
+        confidence = score_match(resolved.reference, paper) if confidence is None else confidence
+        if resolved.paper is None or confidence > resolved.confidence:
+            resolved.paper, resolved.confidence, resolved.source = paper, confidence, source
+
+    async def _resolve_by_id(self, pending: list[ResolvedReference]) -> list[PaperSearchResult]:
+        assert self._engine is not None
+        ids: dict[str, list[ResolvedReference]] = {}
+        for resolved in pending:
+            reference = resolved.reference
+            if reference.doi is not None:
+                ids.setdefault(f"DOI:{reference.doi}", []).append(resolved)
+            elif reference.arxiv_id is not None:
+                ids.setdefault(f"ARXIV:{reference.arxiv_id}", []).append(resolved)
+        if not ids:
+            return []
+        try:
+            papers = await self._engine.papers_batch(list(ids))
+        except Exception as e:  # Like a failed title lookup, these references are then looked up by title or stay unresolved
+            logger.warning(f"Failed to look up {len(ids)} references by ID: {e!r}")
+            return []
+        for waiting, paper in zip(ids.values(), papers):
+            for resolved in waiting:
+                self._offer(resolved, paper, "semantic_scholar", confidence=1.0)  # the reference names the paper itself
+        return [paper for paper in papers if paper is not None]
+
+    async def _resolve_by_title(self, pending: list[ResolvedReference]) -> list[PaperSearchResult]:
+        assert self._engine is not None
+        engine = self._engine
+        titles: dict[str, list[ResolvedReference]] = {}
+        for resolved in pending:
+            if resolved.reference.title is not None:
+                titles.setdefault(normalize_title(resolved.reference.title), []).append(resolved)
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def match(title: str) -> PaperSearchResult | None:
+            async with semaphore:
+                return await engine.match_title(title)
+
+        queries = [str(waiting[0].reference.title) for waiting in titles.values()]
+        papers = await asyncio.gather(*(match(query) for query in queries), return_exceptions=True)
+        found = []
+        for query, waiting, paper in zip(queries, titles.values(), papers):
+            if isinstance(paper, BaseException):
+                logger.warning(f"Failed to look up {query!r}: {paper!r}")
+                continue
+            for resolved in waiting:
+                self._offer(resolved, paper, "semantic_scholar")
+            if paper is not None:
+                found.append(paper)
+        return found
+
+    async def resolve(self, references: Sequence[str]) -> list[ResolvedReference]:
+        """
+        Resolve every reference string.
+
+        Returns:
+            A list aligned with `references`. Unresolved references have no paper and a confidence of 0.
+        """
+        results = [ResolvedReference(parse_reference(raw), None, 0.0, None) for raw in references]
+
+        if self._index is not None:
+            await asyncio.gather(*(self._resolve_locally(resolved) for resolved in results if resolved.reference.title is not None))
+        if self._engine is None:
+            return results
+
+        pending = [resolved for resolved in results if resolved.confidence < self._min_confidence]
+        found = await self._resolve_by_id(pending)
+        found += await self._resolve_by_title(
+            [resolved for resolved in pending if resolved.confidence < 1.0 and resolved.source != "semantic_scholar"]
+        )
+        if self._index is not None and found and self._engine.index is not self._index:
+            self._index.ingest(found)
+        logger.debug(f"Resolved {sum(r.paper is not None for r in results)}/{len(results)} references, {len(found)} from Semantic Scholar")
+        return results
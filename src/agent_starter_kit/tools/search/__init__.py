@@ -1,5 +1,9 @@
 from .base import Author as Author  # noqa: F401
 from .base import PaperSearchResult as PaperSearchResult  # noqa: F401
 from .base import SearchEngine as SearchEngine  # noqa: F401
+from .batch import PaperSearchResultBatch as PaperSearchResultBatch  # noqa: F401
+from .federated import FederatedSearchEngine as FederatedSearchEngine  # noqa: F401
 from .google_scholar import GoogleScholarSearchEngine as GoogleScholarSearchEngine  # noqa: F401
+from .index import LocalFirstSearchEngine as LocalFirstSearchEngine  # noqa: F401
+from .index import LocalPaperIndex as LocalPaperIndex  # noqa: F401
 from .semantic_scholar import SemanticScholarSearchEngine as SemanticScholarSearchEngine  # noqa: F401
@@ -1,9 +1,38 @@
+import asyncio
 import json
+import re
+import unicodedata
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from typing import AsyncIterator, Iterable, Protocol
 
+_NON_WORD = re.compile(r"[\W_]+")
 
-@dataclass
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize a paper title for comparison: strip accents, casefold and drop punctuation and whitespace.
+
+    "Attention Is All You Need." and "attention is all you need" both become "attentionisallyouneed". Letters of
+    other scripts are kept, so CJK or Cyrillic titles stay distinct; a title with no word characters at all is
+    returned stripped but otherwise unchanged.
+    """
+    decomposed = unicodedata.normalize("NFKD", title)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    normalized = _NON_WORD.sub("", unicodedata.normalize("NFKC", stripped).casefold())
+    return normalized or title.strip()
+
+
+def normalize_doi(doi: str) -> str:
+    """Normalize a DOI for comparison, e.g. "https://doi.org/10.1000/ABC" becomes "10.1000/abc"."""
+    doi = doi.strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            return doi[len(prefix) :]  # noqa: E203
+    return doi
+
+
+@dataclass(slots=True)
 class Author:
     full_name: str
     google_scholar_id: str | None = None
@@ -11,6 +40,7 @@ class Author:
     orcid_id: str | None = None
     affiliation: str | None = None
     homepage: str | None = None
+    semantic_scholar_id: str | None = None
 
     def __str__(self):
         return self.full_name
@@ -23,13 +53,18 @@ class Author:
             "orcid_id": self.orcid_id,
             "affiliation": self.affiliation,
             "homepage": self.homepage,
+            "semantic_scholar_id": self.semantic_scholar_id,
         }
 
     def to_json(self) -> str:
         return json.dumps(self.to_dict())
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "Author":
+        return cls(**data)
 
-@dataclass
+
+@dataclass(slots=True)
 class PaperSearchResult:
     title: str
     authors: list[Author]
@@ -40,6 +75,8 @@ class PaperSearchResult:
     venue_url: str | None = None
     is_open_access: bool | None = None
     open_access_link: str | None = None  # URL to the PDF or Latex source. Only available if is_open_access is True
+    doi: str | None = None
+    semantic_scholar_id: str | None = None
 
     def to_dict(self) -> dict:
         return {
@@ -52,15 +89,88 @@ class PaperSearchResult:
             "venue_url": self.venue_url,
             "is_open_access": self.is_open_access,
             "open_access_link": self.open_access_link,
+            "doi": self.doi,
+            "semantic_scholar_id": self.semantic_scholar_id,
         }
 
     def to_json(self) -> str:
         return json.dumps(self.to_dict())
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "PaperSearchResult":
+        return cls(**{**data, "authors": [Author.from_dict(author) for author in data["authors"]]})
+
+
+def _fill_missing(primary: object, secondary: object, cls: type) -> dict:
+    """Field values of `primary`, falling back to `secondary` where `primary` has None."""
+    return {f.name: getattr(primary, f.name) if getattr(primary, f.name) is not None else getattr(secondary, f.name) for f in fields(cls)}
+
+
+def _merge_authors(primary: list[Author], secondary: list[Author]) -> list[Author]:
+    """Fill the missing IDs of `primary` from the author with the same normalized name in `secondary`."""
+    if not primary:
+        return list(secondary)
+    by_name = {normalize_title(author.full_name): author for author in secondary}
+    merged = []
+    for author in primary:
+        other = by_name.get(normalize_title(author.full_name))
+        if other is not None:
+            author = Author(**_fill_missing(author, other, Author))
+        merged.append(author)
+    return merged
+
+
+def merge_paper(primary: PaperSearchResult, secondary: PaperSearchResult) -> PaperSearchResult:
+    """
+    Combine two records of the same paper coming from different engines.
+
+    Fields missing in `primary` are taken from `secondary`, the citation count is the larger of both,
+    a paper is open access if any source says so, and author IDs are merged by author name.
+
+    Returns:
+        PaperSearchResult. A new record, the inputs are left untouched.
+    """
+    values = _fill_missing(primary, secondary, PaperSearchResult)
+    if primary.citation_count is not None and secondary.citation_count is not None:
+        values["citation_count"] = max(primary.citation_count, secondary.citation_count)
+    if primary.is_open_access or secondary.is_open_access:
+        values["is_open_access"] = True
+    longer, shorter = (primary.authors, secondary.authors) if len(primary.authors) >= len(secondary.authors) else (secondary.authors, primary.authors)
+    values["authors"] = _merge_authors(longer, shorter)
+    return PaperSearchResult(**values)
+
+
+class PaperSink(Protocol):
+    """Anything that can store search results, e.g. `LocalPaperIndex`."""
+
+    def ingest(self, papers: Iterable[PaperSearchResult]) -> int: ...
+
+
+def _dedup_keys(paper: PaperSearchResult) -> list[str]:
+    keys = [f"title:{normalize_title(paper.title)}:{paper.year if paper.year is not None else ''}"]
+    if paper.doi is not None:
+        keys.append(f"doi:{normalize_doi(paper.doi)}")
+    return keys
+
 
 class SearchEngine(ABC):
-    def __init__(self):
+    PAGE_SIZE = 10  # Results per request when paginating with `search_iter`
+    PARTIAL_PAGE_IS_LAST = True  # Whether a page shorter than requested means there are no more results
+    FIXED_PAGE_SIZE = False  # Whether every page holds `PAGE_SIZE` results whatever page size is requested
+
+    def __init__(self, index: PaperSink | None = None):
+        """
+        Args:
+            index: Every result returned by `search` is also stored in this index. default: None
+        """
         super().__init__()
+        self.index = index
+
+    def _remember(self, papers: list[PaperSearchResult]) -> list[PaperSearchResult]:
+        """Store `papers` in the attached index (if any) and return them unchanged."""
+        if self.index is not None and papers:
+            self.index.ingest(papers)
+        return papers
 
     @abstractmethod
     async def search(
@@ -80,3 +190,86 @@ class SearchEngine(ABC):
             A list of PaperSearchResult objects.
         """
         pass
+
+    async def _search_page(
+        self, query: str, year_from: int | None, year_to: int | None, offset: int, limit: int
+    ) -> tuple[list[PaperSearchResult], bool]:
+        """
+        Fetch one page for `search_iter`. Engines whose `search` does not map to a single request, or whose API
+        tells where the results end, override this.
+
+        Returns:
+            The papers of the page, and whether more pages may follow.
+        """
+        papers = await self.search(query, year_from, year_to, offset, limit)
+        return papers, bool(papers) and (not self.PARTIAL_PAGE_IS_LAST or len(papers) >= limit)
+
+    async def search_iter(
+        self,
+        query: str,
+        year_from: int | None = None,
+        year_to: int | None = None,
+        offset: int | None = None,
+        limit: int | None = None,
+        page_size: int | None = None,
+        prefetch: int = 2,
+    ) -> AsyncIterator[PaperSearchResult]:
+        """
+        Stream search results page by page.
+
+        While the caller consumes one page, up to `prefetch` following pages are already being fetched.
+        Papers seen on an earlier page (same DOI, or same normalized title and year) are skipped, and
+        iteration stops after exactly `limit` papers or at the last page (see `_search_page`).
+
+        ```
+        async for paper in engine.search_iter("graph neural networks", limit=200):
+            print(paper.title)
+        ```
+
+        Args:
+            query: The search query.
+            year_from: Limit search results to papers published after this year.
+            year_to: Limit search results to papers published before this year.
+            offset: Offset how many results to skip.
+            limit: Maximum number of results to yield, None yields everything the engine returns.
+            page_size: Results per request, ignored by engines with a `FIXED_PAGE_SIZE`. default: `PAGE_SIZE` of the engine
+            prefetch: How many pages are fetched ahead of the consumer. default: 2
+
+        Returns:
+            An async iterator over PaperSearchResult objects.
+        """
+        if limit is not None and limit <= 0:
+            return
+        page_size = self.PAGE_SIZE if self.FIXED_PAGE_SIZE or not page_size else page_size
+        start = next_offset = offset or 0
+        pending: list[asyncio.Task[tuple[list[PaperSearchResult], bool]]] = []
+        seen: set[str] = set()
+        count = 0
+
+        def schedule() -> None:
+            nonlocal next_offset
+            pending.append(asyncio.create_task(self._search_page(query, year_from, year_to, next_offset, page_size)))
+            next_offset += page_size
+
+        try:
+            while True:
+                # Keep `prefetch` pages in flight, but do not fetch far beyond `limit` unless duplicates made us fall short.
+                while not pending or (len(pending) <= prefetch and (limit is None or next_offset - start < limit)):
+                    schedule()
+                page, more = await pending.pop(0)
+                for paper in page:
+                    keys = _dedup_keys(paper)
+                    if any(key in seen for key in keys):
+                        continue
+                    seen.update(keys)
+                    yield paper
+                    count += 1
+                    if limit is not None and count >= limit:
+                        return
+                if not more:
+                    return
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
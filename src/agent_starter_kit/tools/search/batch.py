@@ -0,0 +1,207 @@
+import json
+from array import array
+from dataclasses import astuple, replace
+from json.encoder import encode_basestring_ascii  # type: ignore[attr-defined]
+from typing import IO, Iterable, Iterator, overload
+
+from .base import Author, PaperSearchResult
+
+_MISSING = -(2**31)  # Stands for None in the integer columns
+_JSONL_LINE = (
+    '{{"title": {}, "authors": [{}], "year": {}, "abstract": {}, "citation_count": {}, "venue_name": {}, "venue_url": {}, '
+    '"is_open_access": {}, "open_access_link": {}, "doi": {}, "semantic_scholar_id": {}}}\n'
+)  # Same keys and layout as `json.dumps(PaperSearchResult.to_dict())`
+
+
+def _to_int(value: int | bool | None) -> int:
+    return _MISSING if value is None else int(value)
+
+
+def _from_int(value: int) -> int | None:
+    return None if value == _MISSING else value
+
+
+class PaperSearchResultBatch:
+    """
+    A column-wise container for many PaperSearchResults.
+
+    Years, citation counts and open-access flags are stored in typed arrays, the string fields in one list per
+    column, and every distinct author is stored once and referenced by index. This takes a fraction of the
+    memory of a list of PaperSearchResult objects and exports much faster. Authors are copied in and out, so
+    mutating a paper taken from the batch changes neither the batch nor the other papers of the same author.
+
+    ```
+    batch = PaperSearchResultBatch(papers)
+    batch.write_jsonl("papers.jsonl")
+    batch.write_columnar("papers.columns.json")
+    assert PaperSearchResultBatch.read_columnar("papers.columns.json")[0] == papers[0]
+    ```
+    """
+
+    _STR_COLUMNS = ("title", "abstract", "venue_name", "venue_url", "open_access_link", "doi", "semantic_scholar_id")
+    _INT_COLUMNS = ("year", "citation_count", "is_open_access")
+
+    def __init__(self, papers: Iterable[PaperSearchResult] = ()):
+        self._str: dict[str, list[str | None]] = {name: [] for name in self._STR_COLUMNS}
+        self._int: dict[str, array] = {name: array("i") for name in self._INT_COLUMNS}
+        self._authors: list[Author] = []  # Distinct authors
+        self._author_ids: dict[tuple, int] = {}
+        self._author_index = array("I")  # Authors of paper i are self._authors[j] for j in self._author_index[offsets[i]:offsets[i + 1]]
+        self._author_offsets = array("I", [0])
+        self.extend(papers)
+
+    def __len__(self) -> int:
+        return len(self._author_offsets) - 1
+
+    @overload
+    def __getitem__(self, i: int) -> PaperSearchResult: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[PaperSearchResult]: ...
+
+    def __getitem__(self, i: int | slice) -> PaperSearchResult | list[PaperSearchResult]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("PaperSearchResultBatch index out of range")
+        open_access = _from_int(self._int["is_open_access"][i])
+        return PaperSearchResult(
+            title=self._str["title"][i],  # type: ignore[arg-type]
+            authors=[replace(self._authors[j]) for j in self._author_index[self._author_offsets[i] : self._author_offsets[i + 1]]],  # noqa: E203
+            year=_from_int(self._int["year"][i]),
+            abstract=self._str["abstract"][i],
+            citation_count=_from_int(self._int["citation_count"][i]),
+            venue_name=self._str["venue_name"][i],
+            venue_url=self._str["venue_url"][i],
+            is_open_access=None if open_access is None else bool(open_access),
+            open_access_link=self._str["open_access_link"][i],
+            doi=self._str["doi"][i],
+            semantic_scholar_id=self._str["semantic_scholar_id"][i],
+        )
+
+    def __iter__(self) -> Iterator[PaperSearchResult]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def _intern(self, author: Author) -> int:
+        key = astuple(author)
+        idx = self._author_ids.get(key)
+        if idx is None:
+            idx = self._author_ids[key] = len(self._authors)
+            self._authors.append(replace(author))
+        return idx
+
+    def append(self, paper: PaperSearchResult) -> None:
+        for name, column in self._str.items():
+            column.append(getattr(paper, name))
+        for name, values in self._int.items():
+            values.append(_to_int(getattr(paper, name)))
+        self._author_index.extend(self._intern(author) for author in paper.authors)
+        self._author_offsets.append(len(self._author_index))
+
+    def extend(self, papers: Iterable[PaperSearchResult]) -> None:
+        for paper in papers:
+            self.append(paper)
+
+    @property
+    def titles(self) -> list[str | None]:
+        return self._str["title"]
+
+    @property
+    def years(self) -> array:
+        """The years as an int array, missing years are `-(2**31)`."""
+        return self._int["year"]
+
+    @property
+    def citation_counts(self) -> array:
+        """The citation counts as an int array, missing counts are `-(2**31)`."""
+        return self._int["citation_count"]
+
+    @property
+    def authors(self) -> list[Author]:
+        """Copies of every distinct author of the batch, once."""
+        return [replace(author) for author in self._authors]
+
+    def write_jsonl(self, file: str | IO[str]) -> None:
+        """
+        Write one `PaperSearchResult.to_json()` compatible line per paper.
+
+        Every distinct author is serialized once and spliced into the lines that reference it.
+        """
+        if isinstance(file, str):
+            with open(file, "w") as fp:
+                return self.write_jsonl(fp)
+
+        # Encode column by column with the C string encoder of `json`, then stitch the lines together.
+        def encode_str(values: list[str | None]) -> list[str]:
+            return ["null" if value is None else encode_basestring_ascii(value) for value in values]
+
+        def encode_int(values: array) -> list[str]:
+            return ["null" if value == _MISSING else str(value) for value in values]
+
+        authors = [author.to_json() for author in self._authors]
+        offsets, index = self._author_offsets, self._author_index
+        paper_authors = [", ".join([authors[j] for j in index[offsets[i] : offsets[i + 1]]]) for i in range(len(self))]  # noqa: E203
+        open_access = ["null" if value == _MISSING else ("true" if value else "false") for value in self._int["is_open_access"]]
+        rows = zip(
+            encode_str(self._str["title"]),
+            paper_authors,
+            encode_int(self._int["year"]),
+            encode_str(self._str["abstract"]),
+            encode_int(self._int["citation_count"]),
+            encode_str(self._str["venue_name"]),
+            encode_str(self._str["venue_url"]),
+            open_access,
+            encode_str(self._str["open_access_link"]),
+            encode_str(self._str["doi"]),
+            encode_str(self._str["semantic_scholar_id"]),
+        )
+        file.writelines(_JSONL_LINE.format(*row) for row in rows)
+
+    @classmethod
+    def read_jsonl(cls, file: str | IO[str]) -> "PaperSearchResultBatch":
+        if isinstance(file, str):
+            with open(file, "r") as fp:
+                return cls.read_jsonl(fp)
+        return cls(PaperSearchResult.from_dict(json.loads(line)) for line in file if line.strip())
+
+    def to_columns(self) -> dict:
+        """The batch as plain lists, one per column, plus the author table and its CSR index."""
+        return {
+            "length": len(self),
+            "columns": {
+                **self._str,
+                "year": [_from_int(value) for value in self._int["year"]],
+                "citation_count": [_from_int(value) for value in self._int["citation_count"]],
+                "is_open_access": [None if value == _MISSING else bool(value) for value in self._int["is_open_access"]],
+            },
+            "authors": [author.to_dict() for author in self._authors],
+            "author_offsets": self._author_offsets.tolist(),
+            "author_index": self._author_index.tolist(),
+        }
+
+    def write_columnar(self, file: str | IO[str]) -> None:
+        """Write `to_columns()` as a single JSON document."""
+        if isinstance(file, str):
+            with open(file, "w") as fp:
+                return self.write_columnar(fp)
+        json.dump(self.to_columns(), file)
+
+    @classmethod
+    def read_columnar(cls, file: str | IO[str]) -> "PaperSearchResultBatch":
+        if isinstance(file, str):
+            with open(file, "r") as fp:
+                return cls.read_columnar(fp)
+        data = json.load(file)
+        batch = cls()
+        for name in cls._STR_COLUMNS:
+            batch._str[name] = data["columns"][name]
+        for name in cls._INT_COLUMNS:
+            batch._int[name] = array("i", (_to_int(value) for value in data["columns"][name]))
+        batch._authors = [Author.from_dict(author) for author in data["authors"]]
+        batch._author_ids = {astuple(author): i for i, author in enumerate(batch._authors)}
+        batch._author_offsets = array("I", data["author_offsets"])
+        batch._author_index = array("I", data["author_index"])
+        return batch
@@ -0,0 +1,179 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
+from loguru import logger
+
+BLOCK_MARKERS = ("not a robot", "unusual traffic")
+
+
+def default_browser_factory(debugging_port: int) -> AsyncWebCrawler:
+    """The headless Chromium the Google Scholar crawler has always used. Each browser gets its own debugging port."""
+    browser_cfg = BrowserConfig(
+        headless=True,
+        user_agent_mode="random",
+        cookies=[],
+        use_persistent_context=True,
+        browser_type="chromium",
+        debugging_port=debugging_port,
+    )
+    return AsyncWebCrawler(verbose=False, config=browser_cfg)
+
+
+class PooledBrowser:
+    """One warm browser of a `BrowserPool` and its bookkeeping."""
+
+    def __init__(self, crawler: AsyncWebCrawler, generation: int):
+        self.crawler = crawler
+        self.generation = generation
+        self.pages = 0  # Pages fetched so far
+        self.inflight = 0  # Pages being fetched right now
+        self.failures = 0  # Consecutive failed fetches
+        self.retired = False  # No new pages are handed to a retired browser, it is closed once idle
+
+    def __repr__(self) -> str:
+        return f"PooledBrowser(generation={self.generation}, pages={self.pages}, inflight={self.inflight}, retired={self.retired})"
+
+
+class BrowserPool:
+    """
+    A bounded pool of long-lived headless browsers shared by many searches.
+
+    Launching Chromium costs far more than fetching a page, so browsers are started once and reused.
+    Every browser serves at most `pages_per_browser` pages at a time. A browser is recycled (closed and
+    replaced by a fresh one) after `max_pages` pages, after `max_failures` consecutive errors, or as soon
+    as a page looks like a block page (see `BLOCK_MARKERS`).
+
+    ```
+    async with BrowserPool(size=2) as pool:
+        pages = await asyncio.gather(*(pool.fetch(url, CrawlerRunConfig()) for url in urls))
+    ```
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        pages_per_browser: int = 2,
+        max_pages: int = 50,
+        max_failures: int = 3,
+        block_markers: tuple[str, ...] = BLOCK_MARKERS,
+        browser_factory: Callable[[int], AsyncWebCrawler] = default_browser_factory,
+        base_debugging_port: int = 9222,
+    ):
+        """
+        Args:
+            size: Number of browsers. default: 2
+            pages_per_browser: Concurrent page fetches per browser. default: 2
+            max_pages: Recycle a browser after it fetched this many pages. default: 50
+            max_failures: Recycle a browser after this many consecutive failed fetches. default: 3
+            block_markers: A page containing any of these strings counts as blocked and recycles its browser.
+            browser_factory: Creates an unstarted crawler given a free debugging port. default: `default_browser_factory`
+            base_debugging_port: First debugging port handed to `browser_factory`. default: 9222
+        """
+        self._size = size
+        self._max_pages = max_pages
+        self._max_failures = max_failures
+        self._block_markers = block_markers
+        self._browser_factory = browser_factory
+        self._base_debugging_port = base_debugging_port
+        self._launches = 0
+        self._slots: list[PooledBrowser | None] = [None] * size
+        self._slot_locks = [asyncio.Lock() for _ in range(size)]
+        self._tokens: asyncio.Queue[int] = asyncio.Queue()
+        for _ in range(pages_per_browser):
+            for slot in range(size):
+                self._tokens.put_nowait(slot)
+        self._closed = False
+
+    async def __aenter__(self) -> "BrowserPool":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close every browser. Fetches that are still running fail."""
+        self._closed = True
+        browsers = [browser for browser in self._slots if browser is not None and not browser.retired]
+        self._slots = [None] * self._size
+        await asyncio.gather(*(self._shutdown(browser) for browser in browsers), return_exceptions=True)
+
+    def is_healthy(self, browser: PooledBrowser) -> bool:
+        return not browser.retired and browser.crawler.ready and browser.pages < self._max_pages and browser.failures < self._max_failures
+
+    def is_blocked(self, html: str) -> bool:
+        return any(marker in html for marker in self._block_markers)
+
+    async def _launch(self) -> PooledBrowser:
+        port = self._base_debugging_port + self._launches % (4 * self._size)
+        self._launches += 1
+        crawler = self._browser_factory(port)
+        await crawler.start()
+        logger.debug(f"Started browser #{self._launches} on debugging port {port}")
+        return PooledBrowser(crawler, self._launches)
+
+    async def _shutdown(self, browser: PooledBrowser) -> None:
+        try:
+            await browser.crawler.close()
+        except Exception as e:
+            logger.warning(f"Failed to close {browser}: {e!r}")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[PooledBrowser]:
+        """
+        Borrow a healthy browser for one page fetch. Waits while every browser is busy.
+        """
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        slot = await self._tokens.get()
+        try:
+            async with self._slot_locks[slot]:
+                browser = self._slots[slot]
+                if browser is not None and not self.is_healthy(browser):
+                    logger.info(f"Recycling {browser}")
+                    if not browser.retired:
+                        browser.retired = True
+                        if browser.inflight == 0:
+                            await self._shutdown(browser)
+                    browser = None
+                if browser is None:
+                    browser = self._slots[slot] = await self._launch()
+                browser.inflight += 1
+            try:
+                yield browser
+            finally:
+                browser.pages += 1
+                browser.inflight -= 1
+                if browser.retired and browser.inflight == 0:
+                    await self._shutdown(browser)
+        finally:
+            self._tokens.put_nowait(slot)
+
+    async def fetch(self, url: str, config: CrawlerRunConfig, **kwargs) -> str:
+        """
+        Fetch `url` on a pooled browser and return its HTML.
+
+        Args:
+            url: The page to fetch.
+            config: The run configuration passed to `AsyncWebCrawler.arun`.
+            kwargs: Extra keyword arguments passed to `AsyncWebCrawler.arun`.
+
+        Returns:
+            str. The page HTML. Blocked pages are returned as well, but their browser is recycled.
+        """
+        async with self.acquire() as browser:
+            try:
+                result = await browser.crawler.arun(url=url, config=config, **kwargs)
+            except Exception:
+                browser.failures += 1
+                raise
+            html = result.html or ""
+            if not result.success or html.strip() == "":
+                browser.failures += 1
+            else:
+                browser.failures = 0
+            if self.is_blocked(html):
+                logger.warning(f"{browser} got blocked, recycling it")
+                browser.retired = True
+            return html
@@ -0,0 +1,121 @@
+import asyncio
+from typing import AsyncIterator, Sequence
+
+from loguru import logger
+
+from .base import PaperSearchResult, PaperSink, SearchEngine, merge_paper, normalize_doi, normalize_title
+
+
+class PaperMerger:
+    """
+    Incrementally deduplicate papers coming from several engines.
+
+    Two records describe the same paper if their normalized DOIs match, or if their normalized titles match
+    and their years agree (a missing year agrees with any year).
+    """
+
+    def __init__(self) -> None:
+        self._papers: list[PaperSearchResult] = []
+        self._by_doi: dict[str, int] = {}
+        self._by_title: dict[str, list[int]] = {}
+
+    def _find(self, paper: PaperSearchResult) -> int | None:
+        if paper.doi is not None and (idx := self._by_doi.get(normalize_doi(paper.doi))) is not None:
+            return idx
+        for idx in self._by_title.get(normalize_title(paper.title), []):
+            year = self._papers[idx].year
+            if year is None or paper.year is None or year == paper.year:
+                return idx
+        return None
+
+    def add(self, papers: Sequence[PaperSearchResult]) -> None:
+        for paper in papers:
+            idx = self._find(paper)
+            if idx is None:
+                idx = len(self._papers)
+                self._papers.append(paper)
+                self._by_title.setdefault(normalize_title(paper.title), []).append(idx)
+            else:
+                self._papers[idx] = merge_paper(self._papers[idx], paper)
+            if self._papers[idx].doi is not None:
+                self._by_doi[normalize_doi(self._papers[idx].doi)] = idx  # type: ignore[arg-type]
+
+    def results(self) -> list[PaperSearchResult]:
+        return list(self._papers)
+
+
+class FederatedSearchEngine(SearchEngine):
+    """
+    Fan one query out to several engines concurrently and merge what comes back.
+
+    Engines that have not answered when the deadline expires are cancelled, engines that fail are skipped,
+    so a search returns whatever arrived in time. Earlier engines in `engines` win when fields conflict.
+
+    ```
+    engine = FederatedSearchEngine([SemanticScholarSearchEngine(), GoogleScholarSearchEngine()], timeout=20)
+    papers = await engine.search("graph neural networks", year_from=2020)
+
+    async for partial in engine.search_stream("graph neural networks"):
+        print(len(partial))
+    ```
+    """
+
+    def __init__(self, engines: Sequence[SearchEngine], timeout: float | None = 30.0, index: PaperSink | None = None):
+        """
+        Args:
+            engines: The engines to query, in order of precedence.
+            timeout: Overall deadline of one search in seconds, None waits for every engine. default: 30.0
+            index: Store the merged results in this index. default: None
+        """
+        super().__init__(index=index)
+        self._engines = list(engines)
+        self._timeout = timeout
+
+    async def search_stream(
+        self, query: str, year_from: int | None = None, year_to: int | None = None, offset: int | None = None, limit: int | None = None
+    ) -> AsyncIterator[list[PaperSearchResult]]:
+        """
+        Same as `search`, but yield the merged results so far every time an engine answers.
+
+        Each yielded list supersedes the previous one.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._timeout if self._timeout is not None else None
+        tasks = {asyncio.create_task(engine.search(query, year_from, year_to, offset, limit)): i for i, engine in enumerate(self._engines)}
+        answers: dict[int, list[PaperSearchResult]] = {}
+        pending = set(tasks)
+        expired = False
+        try:
+            while pending:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    expired = True
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    expired = True
+                    break
+                for task in done:
+                    engine = self._engines[tasks[task]]
+                    if task.exception() is not None:
+                        logger.warning(f"{type(engine).__name__} failed: {task.exception()!r}")
+                        continue
+                    answers[tasks[task]] = task.result()
+                merger = PaperMerger()
+                for i in sorted(answers):  # merge in engine order so that precedence does not depend on timing
+                    merger.add(answers[i])
+                yield merger.results()[:limit] if limit is not None else merger.results()
+        finally:
+            for task in pending:
+                if expired:
+                    logger.warning(f"{type(self._engines[tasks[task]]).__name__} missed the deadline of {self._timeout}s")
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)  # let the engines clean up before returning
+
+    async def search(
+        self, query: str, year_from: int | None = None, year_to: int | None = None, offset: int | None = None, limit: int | None = None
+    ) -> list[PaperSearchResult]:
+        result: list[PaperSearchResult] = []
+        async for result in self.search_stream(query, year_from, year_to, offset, limit):
+            pass
+        return self._remember(result)
@@ -1,160 +1,209 @@
 import asyncio
-import warnings
+import re
+import time
+from typing import cast
 
-import requests
-from bs4 import BeautifulSoup, Tag
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CacheMode, CrawlerRunConfig
+from crawl4ai import CacheMode, CrawlerRunConfig
 from crawl4ai.chunking_strategy import RegexChunking
+from loguru import logger
 from lxml import etree, html
-from rich import print
 
-from .base import Author, PaperSearchResult, SearchEngine
+from .base import Author, PaperSearchResult, PaperSink, SearchEngine
+from .browser_pool import BrowserPool
+from .proxy_pool import ProxyPool
+
+# Compiled once, evaluated relative to a single result node so that no query walks the whole page.
+_RESULTS = etree.XPath("//div[@id='gs_res_ccl_mid']/div")
+_TITLE = etree.XPath(".//div[@class='gs_ri']/h3/a")
+_CITED_BY = etree.XPath(".//a[starts-with(text(), 'Cited by')]/text()")
+_GS_A = etree.XPath(".//div[@class='gs_a']")
+_GS_FMAA = etree.XPath(".//div[@class='gs_fmaa']")
+_FMA_VENUE = etree.XPath(".//div[@class='gs_a gs_fma_p']/text()")
+_FMA_ABSTRACT = etree.XPath(".//div[@class='gs_fma_abs']/div[@class='gs_fma_snp']")
+_GS_RS = etree.XPath(".//div[@class='gs_rs']")
+_AUTHOR_LINKS = etree.XPath("./a[contains(@href, 'user=')]")
+
+_META_SEPARATOR = re.compile(r"\s-\s")  # "authors - venue, year - site", \s also matches the &nbsp; Google puts there
+_TRAILING_YEAR = re.compile(r"(?:^|,)\s*((?:19|20)\d{2})\s*$")
+_USER_ID = re.compile(r"user=([^&]+)")
+
+
+def _squash(text: str) -> str:
+    return " ".join(text.split())  # also turns the \xa0 of the page into plain spaces
+
+
+def _parse_authors(names: str, container: html.HtmlElement) -> list[Author]:
+    """Split "A Vaswani, N Shazeer…" into authors, attaching the Google Scholar IDs of the linked ones in `container`."""
+    ids = {}
+    for link in cast(list[html.HtmlElement], _AUTHOR_LINKS(container)):
+        match = _USER_ID.search(link.get("href", ""))
+        if match is not None:
+            ids[_squash(link.text_content())] = match.group(1)
+    authors = []
+    for name in names.split(","):
+        name = _squash(name).rstrip("…").strip()
+        if name:
+            authors.append(Author(full_name=name, google_scholar_id=ids.get(name)))
+    return authors
+
+
+def _parse_venue(source: str | None) -> tuple[str | None, int | None]:
+    """Split "Advances in neural …, 2017" (or "2021 - Springer") into venue name and year."""
+    if source is None:
+        return None, None
+    year = None
+    parts = []
+    for part in _META_SEPARATOR.split(source):
+        match = _TRAILING_YEAR.search(part)
+        if match is not None:
+            year = int(match.group(1))
+            part = part[: match.start()]
+        part = _squash(part)
+        if part:
+            parts.append(part)
+    return " - ".join(parts) or None, year
 
 
 def parse_google_scholar_html(html_content: str) -> list[PaperSearchResult]:
-    result = []
-    soup = BeautifulSoup(html_content, "html.parser")
+    """
+    Parse a Google Scholar result page.
 
-    body = soup.find(id="gs_res_ccl_mid")
-    if body is None or not isinstance(body, Tag):
-        if "not a robot" in html_content:
-            raise ValueError("Google Scholar is blocking the request")
-        else:
-            raise ValueError("Cannot find the body tag of the google scholar search result")
+    Both result layouts are supported: the common one with a `gs_a` line ("authors - venue, year - site")
+    and the detailed one with a `gs_fmaa` author list. The page is parsed once and every field is read with
+    precompiled XPath queries relative to its result node.
 
-    # Get all children of the body
-    children = body.find_all("div", recursive=False)
-    # print(f"The body has {len(children)} children")
+    Args:
+        html_content: str. The HTML of the result page.
 
-    for child in children:
-        # Get the title of the paper
-        tree = html.fromstring(str(child))
-        title = tree.xpath("//div[@class='gs_ri']/h3/a")
+    Returns:
+        list[PaperSearchResult]. The results in page order. Results without a link (e.g. [CITATION]) are skipped.
 
-        if len(title) > 0:  # type: ignore
-            title = title[0].text_content()  # type: ignore
-            title = " ".join(title.split())  # type: ignore
-        else:
-            continue
+    Raises:
+        ValueError: If the page is a block page or not a result page.
+    """
+    tree = html.document_fromstring(html_content)
+    nodes = cast(list[html.HtmlElement], _RESULTS(tree))
+    if not nodes and tree.find(".//div[@id='gs_res_ccl_mid']") is None:
+        if "not a robot" in html_content:
+            raise ValueError("Google Scholar is blocking the request")
+        raise ValueError("Cannot find the body tag of the google scholar search result")
 
-        citedby = tree.xpath("//a[starts-with(text(), 'Cited by')]")
-        if len(citedby) > 0:  # type: ignore
-            citedby = citedby[0].text_content()  # type: ignore
-            citedby = citedby.split()[-1]  # type: ignore
-            citedby = int(citedby)  # type: ignore
-        else:
-            citedby = 0
-
-        # Determine the detailed result or general result
-        detailed = False
-        if len(tree.xpath("//div[@class='gs_a']")) > 0:  # type: ignore
-            detailed = False
-        elif len(tree.xpath("//div[@class='gs_fmaa']")) > 0:  # type: ignore
-            detailed = True
-        else:
-            raise ValueError("Cannot determine the type of the result")
-
-        if detailed:
-            venue = tree.xpath("//div[@class='gs_a gs_fma_p']/text()")
-            venue_name = venue[0] if len(venue) > 0 else None  # type: ignore
-            venue_url = venue[1] if len(venue) > 1 else None  # type: ignore
-
-            venue_name, year = venue_name.split(",") if venue_name is not None else (None, None)  # type: ignore
-            venue_name = " ".join(venue_name.split()) if venue_name is not None else None  # type: ignore # remove the \xa0 in the string
-            year = int(year) if year is not None else None
-
-            authors = tree.xpath("//div[@class='gs_fmaa']")
-            if len(authors) > 0:  # type: ignore
-                authors_source = etree.tostring(authors[0]).decode("utf-8")  # type: ignore
-
-                authors = authors_source.split(",")  # split the html string by comma
-
-                for author in authors:
-                    author_html = html.fromstring(author)  # type: ignore
-                    author_name = author_html.xpath("//text()")[0]  # type: ignore
-                    author_id = author_html.xpath("//a/@href")[0]  # type: ignore
-                    if author_id is not None:
-                        author_id = author_id.split("user=")[1]  # type: ignore
-                        author_id = author_id.split("&")[0]  # type: ignore
-
-                    authors = [Author(full_name=str(author_name), google_scholar_id=str(author_id)) for author in authors]
-
-                authors = authors[0].text_content()  # type: ignore
-                authors = " ".join(authors.split())  # type: ignore
-                authors = authors.split(",")  # type: ignore
-                authors = [Author(full_name=author.strip()) for author in authors]  # type: ignore
-            else:
-                authors = None  # type: ignore
-
-            abstract = tree.xpath("//div[@class='gs_fma_abs']/div[@class='gs_fma_snp']")
-            if len(abstract) > 0:  # type: ignore
-                abstract = abstract[0].text_content()  # type: ignore
-            else:
-                abstract = None  # type: ignore
+    result = []
+    for node in nodes:
+        title_links = cast(list[html.HtmlElement], _TITLE(node))
+        if not title_links:
+            continue
+        title = _squash(title_links[0].text_content())
+
+        cited_by = cast(list[str], _CITED_BY(node))
+        citation_count = int(cited_by[0].split()[-1]) if cited_by else 0
+
+        gs_a = cast(list[html.HtmlElement], _GS_A(node))
+        if gs_a:
+            meta = _META_SEPARATOR.split(gs_a[0].text_content())
+            authors = _parse_authors(meta[0], gs_a[0])
+            venue_url = _squash(meta[-1]) if len(meta) >= 2 else None
+            venue_name, year = _parse_venue(" - ".join(meta[1:-1]) if len(meta) >= 3 else None)
+            abstract_nodes = cast(list[html.HtmlElement], _GS_RS(node))
         else:
-            authors = tree.xpath("//div[@class='gs_a']")
-            print(authors[0].text_content().split("-"))
-
-            temp = authors[0].text_content().split("-") if len(authors) > 0 else (None, None, None)
-            if len(temp) >= 3:
-                authors, venue_name, venue_url = temp[0], temp[-2], temp[-1]
-            else:
-                authors = authors[0].text_content()  # type: ignore
-                venue_name = None
-                venue_url = None
-
-            authors = authors.split(",")  # type: ignore
-            authors = [Author(full_name=author.strip()) for author in authors]  # type: ignore
-            venue_url = venue_url.strip() if venue_url is not None else None  # type: ignore
-
-            temp = venue_name.split(",") if venue_name is not None else (None, None)
-            if len(temp) > 1:
-                venue_name, year = temp[0], temp[-1]
-            else:
-                venue_name = temp[0]
-                year = None
-            venue_name = " ".join(venue_name.split()) if venue_name is not None else None  # remove the \xa0 in the string
-            year = int(year) if year is not None else None
-
-            abstract = tree.xpath("//div[@class='gs_rs']")
-            if len(abstract) > 0:  # type: ignore
-                abstract = abstract[0].text_content()  # type: ignore
-            else:
-                abstract = None  # type: ignore
-
-        assert type(authors) is list
-        assert type(year) is int if year is not None else True, f"year: {year} have type {type(year)}"
-        assert type(authors[0]) is Author if authors is not None else True
+            gs_fmaa = cast(list[html.HtmlElement], _GS_FMAA(node))
+            if not gs_fmaa:
+                raise ValueError("Cannot determine the type of the result")
+            authors = _parse_authors(gs_fmaa[0].text_content(), gs_fmaa[0])
+            venue = cast(list[str], _FMA_VENUE(node))
+            venue_name, year = _parse_venue(venue[0] if venue else None)
+            venue_url = _squash(venue[1]) if len(venue) > 1 else None
+            abstract_nodes = cast(list[html.HtmlElement], _FMA_ABSTRACT(node))
 
         result.append(
             PaperSearchResult(
                 title=title,
-                authors=authors,  # type: ignore
+                authors=authors,
                 year=year,
-                abstract=abstract,  # type: ignore
-                citation_count=citedby,
+                abstract=abstract_nodes[0].text_content() if abstract_nodes else None,
+                citation_count=citation_count,
                 venue_name=venue_name,
-                venue_url=venue_url,  # type: ignore
+                venue_url=venue_url,
             )
         )
     return result
 
 
-def get_next_proxy():
-    ret = requests.get("https://proxypool.scrape.center/random")
-
-    return {
-        "server": "http://" + ret.content.decode("utf-8"),
-    }
-
-
 class GoogleScholarSearchEngine(SearchEngine):
     """
     Find usage example in `pd-core-latex/demo_search_google_scholar.py`
+
+    Pages are fetched on the warm browsers of a `BrowserPool` that lives as long as the engine, so
+    close the engine (or use it as an async context manager) when done:
+
+    ```
+    async with GoogleScholarSearchEngine(prefetch=2) as engine:
+        page1 = await engine.search("machine learning")
+        page2 = await engine.search("machine learning", offset=10)  # already prefetched
+    ```
     """
 
-    def __init__(self):
-        super().__init__()
+    PAGE_SIZE = 10  # Results per Google Scholar page
+    FIXED_PAGE_SIZE = True
+
+    def __init__(
+        self,
+        pool: BrowserPool | None = None,
+        prefetch: int = 0,
+        block_retries: int = 1,
+        index: PaperSink | None = None,
+        proxies: ProxyPool | None = None,
+    ):
+        """
+        Args:
+            pool: Share this browser pool, the engine will not close it. default: a private `BrowserPool()`
+            prefetch: After each search, fetch this many following pages in the background. default: 0
+            block_retries: Retry a blocked page this many times on a fresh browser. default: 1
+            index: Store every search result in this index, e.g. a `LocalPaperIndex`. default: None
+            proxies: Fetch pages through the proxies of this pool, the engine will not close it. Pages are fetched
+                directly while the pool has no healthy proxy. default: a private `ProxyPool()`
+        """
+        super().__init__(index=index)
+        self._pool = pool
+        self._owns_pool = pool is None
+        self._proxies = proxies
+        self._owns_proxies = proxies is None
+        self._prefetch = prefetch
+        self._block_retries = block_retries
+        self._prefetched: dict[str, asyncio.Task[str]] = {}
+        self._prefetch_tasks: set[asyncio.Task[str]] = set()  # Every prefetch not finished yet, including evicted ones
+
+    async def __aenter__(self) -> "GoogleScholarSearchEngine":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Cancel and await pending prefetches, then close the browser and proxy pools if the engine created them."""
+        tasks = list(self._prefetch_tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._prefetched.clear()
+        if self._owns_pool and self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        if self._owns_proxies and self._proxies is not None:
+            await self._proxies.close()
+            self._proxies = None
+
+    def _get_pool(self) -> BrowserPool:
+        if self._pool is None:
+            self._pool = BrowserPool()
+        return self._pool
+
+    async def _get_proxies(self) -> ProxyPool:
+        if self._proxies is None:
+            self._proxies = ProxyPool()
+        await self._proxies.start()
+        return self._proxies
 
     def _get_url(self, query: str, offset: int | None, year_from: int | None = None, year_to: int | None = None) -> str:
         GOOGLE_SCHOLAR_BASE = "https://scholar.google.com/scholar"
@@ -173,61 +222,113 @@ class GoogleScholarSearchEngine(SearchEngine):
         param_string = "&".join(f"{k}={v}" for k, v in PARAMS.items())
         return f"{GOOGLE_SCHOLAR_BASE}?{param_string}"
 
-    async def _search(self, query: str, year_from: int | None, year_to: int | None, offset: int | None, limit: int | None) -> list[PaperSearchResult]:
-        browser_cfg = BrowserConfig(headless=True, user_agent_mode="random", cookies=[], use_persistent_context=True, browser_type="chromium")
-        async with AsyncWebCrawler(verbose=True, config=browser_cfg) as crawler:
-
-            config = CrawlerRunConfig(
-                js_code=["let buttons = document.querySelectorAll('a.gs_or_cit');", "if (buttons.length > 0) {buttons[buttons.length - 1].click();}"],
-                proxy_config=get_next_proxy(),
-            )
-
-            result = await crawler.arun(
-                url=self._get_url(query, offset, year_from, year_to),
+    async def _fetch_html(self, url: str) -> str:
+        proxies = await self._get_proxies()
+        server = proxies.get()
+        config = CrawlerRunConfig(
+            js_code=["let buttons = document.querySelectorAll('a.gs_or_cit');", "if (buttons.length > 0) {buttons[buttons.length - 1].click();}"],
+            proxy_config={"server": server} if server is not None else None,
+        )
+        started = time.monotonic()
+        try:
+            html = await self._get_pool().fetch(
+                url,
+                config,
                 cache_mode=CacheMode.BYPASS,
                 simulate_user=True,  # Causes random mouse movements and clicks
                 override_navigator=True,  # Makes the browser appear more like a real user
                 remove_overlay_elements=True,
                 chunking_strategy=RegexChunking(patterns=["\n\n"]),
-                config=config,
             )
-            assert result.html.strip() != "", "The result is empty"
-            return parse_google_scholar_html(result.html)
+        except Exception:
+            if server is not None:
+                proxies.report(server, success=False)
+            raise
+        if server is not None:
+            proxies.report(server, success=html.strip() != "", latency=time.monotonic() - started, blocked=self._get_pool().is_blocked(html))
+        return html
+
+    def _prefetch_done(self, task: asyncio.Task[str]) -> None:
+        self._prefetch_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:  # Retrieved here, evicted prefetches are never awaited
+            logger.debug(f"Prefetch failed: {task.exception()!r}")
+
+    def _schedule_prefetch(self, query: str, year_from: int | None, year_to: int | None, offset: int | None) -> None:
+        for page in range(1, self._prefetch + 1):
+            url = self._get_url(query, (offset or 0) + page * self.PAGE_SIZE, year_from, year_to)
+            if url not in self._prefetched:
+                task = asyncio.create_task(self._fetch_html(url))
+                task.add_done_callback(self._prefetch_done)
+                self._prefetch_tasks.add(task)
+                self._prefetched[url] = task
+        while len(self._prefetched) > 4 * self._prefetch:  # drop the oldest prefetches nobody asked for
+            self._prefetched.pop(next(iter(self._prefetched))).cancel()
+
+    async def _search(
+        self, query: str, year_from: int | None, year_to: int | None, offset: int | None, limit: int | None, prefetch: bool = True
+    ) -> list[PaperSearchResult]:
+        url = self._get_url(query, offset, year_from, year_to)
+        if prefetch and self._prefetch > 0:  # False when `search_iter` drives, it prefetches on its own
+            self._schedule_prefetch(query, year_from, year_to, offset)
+
+        html: str | None = None
+        task = self._prefetched.pop(url, None)
+        if task is not None:
+            try:
+                html = await task
+            except Exception as e:
+                logger.warning(f"Prefetch of {url} failed: {e!r}")
+
+        for attempt in range(self._block_retries + 1):
+            if html is None or (attempt > 0 and self._get_pool().is_blocked(html)):
+                html = await self._fetch_html(url)
+            if not self._get_pool().is_blocked(html):
+                break
+
+        assert html is not None and html.strip() != "", "The result is empty"
+        papers = parse_google_scholar_html(html)
+        return papers[:limit] if limit is not None else papers
+
+    async def _search_page(
+        self, query: str, year_from: int | None, year_to: int | None, offset: int, limit: int
+    ) -> tuple[list[PaperSearchResult], bool]:
+        papers = self._remember(await self._search(query, year_from, year_to, offset, limit, prefetch=False))
+        return papers, bool(papers)  # [CITATION] entries are skipped, so pages are often shorter than PAGE_SIZE
 
     async def search(
         self, query: str, year_from: int | None = None, year_to: int | None = None, offset: int | None = None, limit: int | None = None
     ) -> list[PaperSearchResult]:
-        if limit is not None:
-            warnings.warn(
-                message="The limit is not supported for Google Scholar search engine",
-                category=UserWarning,
-                stacklevel=2,
-            )
-        return await self._search(query, year_from, year_to, offset, limit)
+        """
+        Search Google Scholar. Without `limit` one result page is returned, otherwise as many pages as needed
+        are fetched (concurrently, see `search_iter`) to return `limit` results.
+        """
+        if limit is None:
+            return self._remember(await self._search(query, year_from, year_to, offset, limit))
+        return [paper async for paper in self.search_iter(query, year_from, year_to, offset, limit)]
 
 
 async def get_search_result_googlescholar(keyword: str, page: int) -> list[PaperSearchResult]:
     assert page > 0
-    search_engine = GoogleScholarSearchEngine()
-    return await search_engine.search(
-        query=keyword,
-        offset=(page - 1) * 10,
-    )
+    async with GoogleScholarSearchEngine() as search_engine:
+        return await search_engine.search(
+            query=keyword,
+            offset=(page - 1) * 10,
+        )
 
 
 async def get_all_paper(keyword: str) -> list[PaperSearchResult]:
-    search_engine = GoogleScholarSearchEngine()
-    return await search_engine.search(
-        query=keyword,
-    )
+    async with GoogleScholarSearchEngine() as search_engine:
+        return await search_engine.search(
+            query=keyword,
+        )
 
 
 async def get_all_paper_year_till_now(keyword: str, fromyear: int) -> list[PaperSearchResult]:
-    search_engine = GoogleScholarSearchEngine()
-    return await search_engine.search(
-        query=keyword,
-        year_from=fromyear,
-    )
+    async with GoogleScholarSearchEngine() as search_engine:
+        return await search_engine.search(
+            query=keyword,
+            year_from=fromyear,
+        )
 
 
 if __name__ == "__main__":
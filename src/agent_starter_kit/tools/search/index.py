@@ -0,0 +1,244 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable
+
+from .base import PaperSearchResult, SearchEngine, merge_paper, normalize_doi, normalize_title
+
+_TOKEN = re.compile(r"\w+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    doi TEXT,
+    year INTEGER,
+    citation_count INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS papers_doi ON papers (doi);
+CREATE INDEX IF NOT EXISTS papers_year ON papers (year);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5 (title, abstract, authors, venue);
+CREATE TABLE IF NOT EXISTS queries (
+    key TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    paper_ids TEXT NOT NULL
+);
+"""
+
+
+def _paper_key(paper: PaperSearchResult) -> str:
+    return f"{normalize_title(paper.title)}:{paper.year if paper.year is not None else ''}"
+
+
+def _fts_query(query: str) -> str:
+    # Quote every token so that user input can never be interpreted as FTS5 syntax, tokens are AND-ed.
+    return " ".join(f'"{token}"' for token in _TOKEN.findall(query))
+
+
+def query_key(query: str, year_from: int | None = None, year_to: int | None = None, offset: int | None = None, limit: int | None = None) -> str:
+    """The key under which `LocalPaperIndex.record_query` stores a search."""
+    return json.dumps([" ".join(query.lower().split()), year_from, year_to, offset or 0, limit])
+
+
+class LocalPaperIndex(SearchEngine):
+    """
+    Persistent local store of papers with full-text search, backed by SQLite FTS5.
+
+    It can be queried like any other engine, and attached to other engines so that it fills up
+    with everything they return:
+
+    ```
+    index = LocalPaperIndex("papers.db")
+    engine = SemanticScholarSearchEngine(index=index)
+    await engine.search("graph neural networks")
+
+    papers = await index.search("graph neural", year_from=2020, limit=10)  # offline
+    ```
+
+    Records of the same paper are merged on ingest, with the rules of `PaperMerger`: the same DOI, or the same
+    normalized title and years that agree, a missing year agreeing with any year.
+    """
+
+    def __init__(self, path: str = "papers.db"):
+        """
+        Args:
+            path: The SQLite database file, ":memory:" keeps the index in memory. default: "papers.db"
+        """
+        super().__init__()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def _find(self, paper: PaperSearchResult) -> tuple[int, PaperSearchResult] | None:
+        """The stored record of `paper`, matched like `PaperMerger` does: same DOI, or same title and a year that agrees."""
+        row = None
+        if paper.doi is not None:
+            row = self._db.execute("SELECT id, data FROM papers WHERE doi = ?", (normalize_doi(paper.doi),)).fetchone()
+        if row is None:
+            title = normalize_title(paper.title)
+            if paper.year is not None:
+                # The same year, else a record without one
+                key = _paper_key(paper)
+                row = self._db.execute(
+                    "SELECT id, data FROM papers WHERE key IN (?, ?) ORDER BY key = ? DESC, id LIMIT 1", (key, f"{title}:", key)
+                ).fetchone()
+            else:
+                # A missing year agrees with any year, the keys of the title all start with "title:" (titles have no punctuation)
+                row = self._db.execute(
+                    "SELECT id, data FROM papers WHERE key >= ? AND key < ? ORDER BY id LIMIT 1", (f"{title}:", f"{title};")
+                ).fetchone()
+        if row is None:
+            return None
+        return row[0], PaperSearchResult.from_dict(json.loads(row[1]))
+
+    def _delete(self, rowid: int) -> None:
+        self._db.execute("DELETE FROM papers WHERE id = ?", (rowid,))
+        self._db.execute("DELETE FROM papers_fts WHERE rowid = ?", (rowid,))
+
+    def _ingest(self, papers: Iterable[PaperSearchResult]) -> list[int]:
+        rowids = []
+        for paper in papers:
+            found = self._find(paper)
+            if found is not None:
+                rowid, stored = found
+                paper = merge_paper(stored, paper)
+                key = _paper_key(paper)
+                # Filling in a missing year changes the key, and another record may already hold the new one.
+                clash = self._db.execute("SELECT id, data FROM papers WHERE key = ? AND id != ?", (key, rowid)).fetchone()
+                if clash is not None:
+                    paper = merge_paper(paper, PaperSearchResult.from_dict(json.loads(clash[1])))
+                    self._delete(clash[0])
+                self._db.execute("DELETE FROM papers_fts WHERE rowid = ?", (rowid,))
+                self._db.execute(
+                    "UPDATE papers SET key = ?, doi = ?, year = ?, citation_count = ?, data = ? WHERE id = ?",
+                    (key, normalize_doi(paper.doi) if paper.doi else None, paper.year, paper.citation_count, paper.to_json(), rowid),
+                )
+            else:
+                cursor = self._db.execute(
+                    "INSERT INTO papers (key, doi, year, citation_count, data) VALUES (?, ?, ?, ?, ?)",
+                    (_paper_key(paper), normalize_doi(paper.doi) if paper.doi else None, paper.year, paper.citation_count, paper.to_json()),
+                )
+                rowid = cursor.lastrowid  # type: ignore[assignment]
+            self._db.execute(
+                "INSERT INTO papers_fts (rowid, title, abstract, authors, venue) VALUES (?, ?, ?, ?, ?)",
+                (rowid, paper.title, paper.abstract or "", " ".join(author.full_name for author in paper.authors), paper.venue_name or ""),
+            )
+            rowids.append(rowid)
+        return rowids
+
+    def _load(self, rowids: list[int]) -> list[PaperSearchResult]:
+        if not rowids:
+            return []
+        placeholders = ",".join("?" * len(rowids))
+        data = dict(self._db.execute(f"SELECT id, data FROM papers WHERE id IN ({placeholders})", rowids).fetchall())
+        return [PaperSearchResult.from_dict(json.loads(data[rowid])) for rowid in rowids if rowid in data]
+
+    def ingest(self, papers: Iterable[PaperSearchResult]) -> int:
+        """
+        Insert or merge papers in a single transaction.
+
+        Returns:
+            int. The number of papers processed.
+        """
+        with self._lock, self._db:
+            return len(self._ingest(papers))
+
+    def record_query(self, key: str, papers: list[PaperSearchResult]) -> None:
+        """
+        Store the answer of a remote search so that `cached_query` can replay it.
+
+        Args:
+            key: Identifies the search, see `query_key`.
+            papers: The papers the remote engine returned, in order. They are ingested as well.
+        """
+        with self._lock, self._db:
+            rowids = self._ingest(papers)
+            self._db.execute("INSERT OR REPLACE INTO queries (key, fetched_at, paper_ids) VALUES (?, ?, ?)", (key, time.time(), json.dumps(rowids)))
+
+    def cached_query(self, key: str, max_age: float | None = None) -> list[PaperSearchResult] | None:
+        """
+        The papers recorded for `key`, or None if the search was never recorded or is older than `max_age` seconds.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT fetched_at, paper_ids FROM queries WHERE key = ?", (key,)).fetchone()
+            if row is None or (max_age is not None and time.time() - row[0] > max_age):
+                return None
+            return self._load(json.loads(row[1]))
+
+    async def search(
+        self, query: str, year_from: int | None = None, year_to: int | None = None, offset: int | None = None, limit: int | None = None
+    ) -> list[PaperSearchResult]:
+        match = _fts_query(query)
+        if not match:
+            return []
+
+        sql = "SELECT papers.data FROM papers_fts JOIN papers ON papers.id = papers_fts.rowid WHERE papers_fts MATCH ?"
+        params: list = [match]
+        if year_from is not None:
+            sql += " AND papers.year >= ?"
+            params.append(year_from)
+        if year_to is not None:
+            sql += " AND papers.year <= ?"
+            params.append(year_to)
+        sql += " ORDER BY bm25(papers_fts), papers.citation_count DESC LIMIT ? OFFSET ?"
+        params += [limit if limit is not None else -1, offset or 0]
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [PaperSearchResult.from_dict(json.loads(row[0])) for row in rows]
+
+
+class LocalFirstSearchEngine(SearchEngine):
+    """
+    Answer repeated searches from a `LocalPaperIndex` and only go to `remote` on a miss.
+
+    A search is a hit if the same query (with the same filters, offset and limit) was answered by `remote`
+    less than `max_age` seconds ago, in which case the recorded answer is replayed, or if a full-text search
+    of the index already finds at least `min_results` papers.
+
+    ```
+    engine = LocalFirstSearchEngine(SemanticScholarSearchEngine(), LocalPaperIndex("papers.db"))
+    await engine.search("graph neural networks")  # remote
+    await engine.search("graph neural networks")  # local, no network
+    ```
+    """
+
+    def __init__(self, remote: SearchEngine, index: LocalPaperIndex, max_age: float | None = None, min_results: int | None = None):
+        """
+        Args:
+            remote: The engine to ask on a miss.
+            index: The local index, the results of `remote` are stored in it.
+            max_age: Recorded queries older than this many seconds are misses, None keeps them forever. default: None
+            min_results: Also count a search as a hit if the index returns at least this many papers. default: None
+        """
+        super().__init__()
+        self._remote = remote
+        self._local = index
+        self._max_age = max_age
+        self._min_results = min_results
+
+    async def search(
+        self, query: str, year_from: int | None = None, year_to: int | None = None, offset: int | None = None, limit: int | None = None
+    ) -> list[PaperSearchResult]:
+        key = query_key(query, year_from, year_to, offset, limit)
+        if (cached := self._local.cached_query(key, self._max_age)) is not None:
+            return cached
+
+        if self._min_results is not None:
+            local = await self._local.search(query, year_from, year_to, offset, limit)
+            if len(local) >= self._min_results:
+                return local
+
+        results = await self._remote.search(query, year_from, year_to, offset, limit)
+        self._local.record_query(key, results)
+        return results
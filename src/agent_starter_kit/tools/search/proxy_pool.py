@@ -0,0 +1,216 @@
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable
+
+import aiohttp
+from loguru import logger
+
+PROXY_POOL_URL = os.getenv("PROXY_POOL_URL", "https://proxypool.scrape.center/all")
+
+ProxyProvider = Callable[[], Awaitable[list[str]]]  # Returns the current candidates, e.g. ["1.2.3.4:8080", "http://5.6.7.8:3128"]
+
+
+def _normalize(proxy: str) -> str:
+    proxy = proxy.strip()
+    return proxy if "://" in proxy else f"http://{proxy}"
+
+
+def _split(text: str) -> list[str]:
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+
+
+class StaticProxyProvider:
+    """Always returns the same proxies. Stands in for a real provider in tests and offline setups."""
+
+    def __init__(self, proxies: Iterable[str]):
+        self._proxies = list(proxies)
+
+    async def __call__(self) -> list[str]:
+        return list(self._proxies)
+
+
+class FileProxyProvider:
+    """Reads one proxy per line from a file, `#` starts a comment. The file is re-read on every refresh."""
+
+    def __init__(self, path: str):
+        self._path = path
+
+    async def __call__(self) -> list[str]:
+        def read() -> list[str]:
+            with open(self._path, "r") as f:
+                return _split(f.read())
+
+        return await asyncio.to_thread(read)
+
+
+class RemoteProxyProvider:
+    """Downloads a newline separated proxy list, by default from the proxy pool service the crawler has always used."""
+
+    def __init__(self, url: str = PROXY_POOL_URL, timeout: float = 10.0):
+        self._url = url
+        self._timeout = timeout
+
+    async def __call__(self) -> list[str]:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self._timeout)) as session:
+            async with session.get(self._url) as response:
+                response.raise_for_status()
+                return _split(await response.text())
+
+
+@dataclass(slots=True)
+class ProxyStats:
+    """Health record of one proxy."""
+
+    server: str
+    latency: float | None = None  # Exponentially weighted moving average, in seconds
+    successes: int = 0
+    failures: int = 0
+    blocks: int = 0
+    consecutive_failures: int = 0
+    quarantined_until: float = 0.0  # time.monotonic() until which the proxy is not handed out
+
+    def score(self) -> float:
+        """Higher is better: the smoothed success rate, minus the block rate, per second of latency."""
+        attempts = self.successes + self.failures + self.blocks
+        success_rate = (self.successes + 1) / (attempts + 2)  # An untried proxy scores 0.5
+        block_rate = self.blocks / attempts if attempts else 0.0
+        return max(success_rate - block_rate, 0.0) / (1.0 + (self.latency or 0.0))
+
+    def __repr__(self) -> str:
+        latency = "?" if self.latency is None else f"{self.latency:.2f}s"
+        return f"ProxyStats({self.server}, latency={latency}, ok={self.successes}, failed={self.failures}, blocked={self.blocks})"
+
+
+class ProxyPool:
+    """
+    Candidate proxies loaded in bulk from a provider, refreshed in the background and ranked by health.
+
+    `get` never blocks: it picks the better of two random healthy proxies, which favours fast and reliable
+    proxies without sending all traffic to one of them. Callers report the outcome of every request with
+    `report`. A proxy that fails `max_failures` times in a row, or is blocked, is quarantined for a while.
+
+    ```
+    async with ProxyPool(FileProxyProvider("proxies.txt")) as proxies:
+        server = proxies.get()
+        ...
+        proxies.report(server, success=True, latency=1.3)
+    ```
+    """
+
+    def __init__(
+        self,
+        provider: ProxyProvider | None = None,
+        refresh_interval: float | None = 600.0,
+        max_failures: int = 3,
+        quarantine: float = 600.0,
+        alpha: float = 0.3,
+    ):
+        """
+        Args:
+            provider: Where the candidates come from. default: `RemoteProxyProvider()`
+            refresh_interval: Reload the candidates every this many seconds, None loads them once. default: 600.0
+            max_failures: Quarantine a proxy after this many consecutive failures. default: 3
+            quarantine: Seconds a failing or blocked proxy is not handed out. default: 600.0
+            alpha: Weight of the newest sample in the latency average. default: 0.3
+        """
+        self._provider = provider or RemoteProxyProvider()
+        self._refresh_interval = refresh_interval
+        self._max_failures = max_failures
+        self._quarantine = quarantine
+        self._alpha = alpha
+        self._proxies: dict[str, ProxyStats] = {}
+        self._refresher: asyncio.Task | None = None
+        self._started = False
+        self._start_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "ProxyPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """Load the candidates and start refreshing them in the background. Calling it again does nothing."""
+        async with self._start_lock:
+            if self._started:
+                return
+            await self.refresh()
+            if self._refresh_interval is not None:
+                self._refresher = asyncio.create_task(self._refresh_forever(self._refresh_interval))
+            self._started = True
+
+    async def close(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+        self._started = False
+
+    async def _refresh_forever(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.refresh()
+
+    async def refresh(self) -> None:
+        """Reload the candidates. Known proxies keep their statistics, proxies the provider dropped are forgotten."""
+        try:
+            candidates = [_normalize(proxy) for proxy in await self._provider()]
+        except Exception as e:
+            logger.warning(f"Failed to load proxies, keeping the {len(self._proxies)} known ones: {e!r}")
+            return
+        self._proxies = {server: self._proxies.get(server) or ProxyStats(server) for server in candidates}
+        logger.debug(f"Loaded {len(self._proxies)} proxies")
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    def stats(self) -> list[ProxyStats]:
+        """Every known proxy, healthiest first."""
+        return sorted(self._proxies.values(), key=ProxyStats.score, reverse=True)
+
+    def healthy(self) -> list[ProxyStats]:
+        now = time.monotonic()
+        return [stats for stats in self._proxies.values() if stats.quarantined_until <= now]
+
+    def get(self) -> str | None:
+        """A healthy proxy server such as "http://1.2.3.4:8080", or None if there is none."""
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0].server
+        a, b = random.sample(candidates, 2)
+        return (a if a.score() >= b.score() else b).server
+
+    def report(self, server: str, success: bool, latency: float | None = None, blocked: bool = False) -> None:
+        """
+        Record the outcome of a request made through `server`.
+
+        Args:
+            server: A server returned by `get`.
+            success: Whether the request went through.
+            latency: How long the request took, in seconds. default: None
+            blocked: The target refused to serve through this proxy, e.g. a captcha page. default: False
+        """
+        stats = self._proxies.get(server)
+        if stats is None:  # Dropped by a refresh in the meantime
+            return
+        if latency is not None:
+            stats.latency = latency if stats.latency is None else self._alpha * latency + (1 - self._alpha) * stats.latency
+        if blocked:
+            stats.blocks += 1
+            stats.consecutive_failures += 1
+        elif success:
+            stats.successes += 1
+            stats.consecutive_failures = 0
+        else:
+            stats.failures += 1
+            stats.consecutive_failures += 1
+        if blocked or stats.consecutive_failures >= self._max_failures:
+            logger.info(f"Quarantining {stats}")
+            stats.quarantined_until = time.monotonic() + self._quarantine
+            stats.consecutive_failures = 0
@@ -0,0 +1,190 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+# Published Semantic Scholar limits: 1 request per second with an API key, and roughly 100 requests per
+# 5 minutes per client without one. Both can be overridden for keys with a higher quota.
+AUTHENTICATED_RATE = float(os.getenv("SEMANTIC_SCHOLAR_RATE", "1.0"))
+UNAUTHENTICATED_RATE = float(os.getenv("SEMANTIC_SCHOLAR_UNAUTHENTICATED_RATE", str(100 / 300)))
+
+
+class Retry(Exception):
+    """
+    Raised by a request function to have the scheduler send it again later.
+
+    Args:
+        error: The exception to raise once the retries are exhausted.
+        retry_after: The delay the server asked for (Retry-After), in seconds. default: None
+        throttled: The server rate limited the key, hold back every request of the key, not only this one. default: False
+    """
+
+    def __init__(self, error: Exception, retry_after: float | None = None, throttled: bool = False):
+        super().__init__(str(error))
+        self.error = error
+        self.retry_after = retry_after
+        self.throttled = throttled
+
+
+@dataclass
+class SchedulerMetrics:
+    submitted: int = 0  # Requests handed to `submit`
+    completed: int = 0  # Requests that returned
+    failed: int = 0  # Requests that raised, after retries
+    retries: int = 0  # Attempts that were retried
+    throttled: int = 0  # Attempts the server rate limited
+    queue_depth: int = 0  # Attempts waiting for their turn right now
+    total_wait: float = 0.0  # Seconds attempts spent in the queue, summed
+    max_wait: float = 0.0  # Longest time an attempt spent in the queue
+
+    @property
+    def mean_wait(self) -> float:
+        attempts = self.completed + self.failed + self.retries
+        return self.total_wait / attempts if attempts else 0.0
+
+
+class RequestScheduler:
+    """
+    Paces the requests made with one API key and queues them by priority.
+
+    Requests are released at most `rate` per second, lower `priority` values first and in submission order
+    otherwise. A request that raises `Retry` is queued again after a jittered exponential backoff, or after
+    the Retry-After delay if the server sent a longer one. If the server rate limited the key, every request
+    of the key waits, so that concurrent callers do not hammer the API with retries.
+
+    ```
+    scheduler = get_scheduler(api_key)
+    data = await scheduler.submit(lambda: send_request(...), priority=0)
+    print(scheduler.metrics())
+    ```
+    """
+
+    def __init__(self, rate: float | None, max_retries: int = 3, backoff: float = 1.0, max_backoff: float = 60.0):
+        """
+        Args:
+            rate: Requests per second, None releases requests as soon as they are submitted.
+            max_retries: Default number of retries of a request. default: 3
+            backoff: Default base delay of the exponential backoff in seconds. default: 1.0
+            max_backoff: Upper bound of the backoff delay in seconds. default: 60.0
+        """
+        self._interval = 1.0 / rate if rate else 0.0
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._metrics = SchedulerMetrics()
+        self._seq = itertools.count()
+        self._heap: list[tuple[int, int, asyncio.Future]] = []
+        self._next_slot = 0.0  # time.monotonic() at which the next request may go
+        self._paused_until = 0.0  # time.monotonic() until which the key is rate limited
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+
+    def metrics(self) -> SchedulerMetrics:
+        """A snapshot of the counters."""
+        return replace(self._metrics, queue_depth=sum(not future.done() for _, _, future in self._heap))
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # The queue is bound to the loop it was created in, e.g. each `asyncio.run` needs a new one.
+            self._loop = loop
+            self._heap = []
+            self._wakeup = asyncio.Event()
+            self._dispatcher = None
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = max(self._next_slot, self._paused_until) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._heap)
+            if future.done():  # The caller gave up waiting
+                continue
+            future.set_result(None)
+            self._next_slot = max(self._next_slot, time.monotonic()) + self._interval
+
+    async def _turn(self, priority: int) -> None:
+        self._start()
+        assert self._wakeup is not None
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), future))
+        self._wakeup.set()
+        enqueued = time.monotonic()
+        try:
+            await future
+        finally:
+            waited = time.monotonic() - enqueued
+            self._metrics.total_wait += waited
+            self._metrics.max_wait = max(self._metrics.max_wait, waited)
+
+    async def submit(self, send: Callable[[], Awaitable[T]], priority: int = 0, max_retries: int | None = None, backoff: float | None = None) -> T:
+        """
+        Run `send()` when its turn comes and return its result, retrying it while it raises `Retry`.
+
+        Args:
+            send: Makes one attempt of the request.
+            priority: Lower values are served first. default: 0
+            max_retries: Retries before the error of the last `Retry` is raised. default: the scheduler's
+            backoff: Base delay of the exponential backoff in seconds. default: the scheduler's
+
+        Returns:
+            Whatever `send()` returned.
+        """
+        max_retries = self._max_retries if max_retries is None else max_retries
+        backoff = self._backoff if backoff is None else backoff
+        self._metrics.submitted += 1
+        for attempt in range(max_retries + 1):
+            await self._turn(priority)
+            try:
+                result = await send()
+            except Retry as retry:
+                if retry.throttled:
+                    self._metrics.throttled += 1
+                if attempt == max_retries:
+                    self._metrics.failed += 1
+                    raise retry.error
+                delay = min(backoff * 2**attempt * (1 + random.random()), self._max_backoff)
+                if retry.retry_after is not None:
+                    delay = max(delay, retry.retry_after)
+                if retry.throttled:
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                self._metrics.retries += 1
+                logger.warning(f"{retry.error}, retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._metrics.failed += 1
+                raise
+            self._metrics.completed += 1
+            return result
+        raise AssertionError("unreachable")
+
+
+_SCHEDULERS: dict[tuple[str, str | None], RequestScheduler] = {}
+
+
+def get_scheduler(api_key: str | None, base_url: str = "") -> RequestScheduler:
+    """
+    The scheduler shared by every engine that uses `api_key` on `base_url`, created at the published rate on first use.
+    """
+    key = (base_url, api_key)
+    if key not in _SCHEDULERS:
+        _SCHEDULERS[key] = RequestScheduler(AUTHENTICATED_RATE if api_key is not None else UNAUTHENTICATED_RATE)
+    return _SCHEDULERS[key]
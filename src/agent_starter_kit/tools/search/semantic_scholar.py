@@ -1,19 +1,253 @@
+import asyncio
+import contextlib
 import json
 import os
-import time
+from email.utils import parsedate_to_datetime
+from time import time
+from typing import Any, AsyncIterator, Iterable
 
-import requests
+import aiohttp
 from loguru import logger
-from rich import print
 
-from .base import Author, PaperSearchResult, SearchEngine
+from .base import Author, PaperSearchResult, PaperSink, SearchEngine
+from .scheduler import RequestScheduler, Retry, get_scheduler
 
 SEMANTIC_SCHOLAR_API_KEY = os.getenv("SEMANTIC_SCHOLAR_API_KEY", None)
+SEMANTIC_SCHOLAR_API_BASE = os.getenv("SEMANTIC_SCHOLAR_API_BASE", "https://api.semanticscholar.org/graph/v1")
+
+PAPER_SEARCH_FIELDS = (
+    "paperId,title,authors,externalIds,year,abstract,referenceCount,citationCount,venue,publicationVenue,isOpenAccess,openAccessPdf,tldr"
+)
+PAPER_BATCH_SIZE = 500  # Maximum number of IDs per `POST /paper/batch` request
+SEARCH_RESULT_CAP = 1000  # `GET /paper/search` serves only the first 1000 results of a query, offset + limit must stay within it
+
+
+class SemanticScholarError(Exception):
+    """The Semantic Scholar API answered with an error payload."""
+
+    def __init__(self, message: str, status: int | None = None, payload: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.payload = payload
+
+
+class SemanticScholarRateLimitError(SemanticScholarError):
+    """The Semantic Scholar API kept answering 429 after all retries."""
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    """The delay of a Retry-After header in seconds, which is either a number of seconds or an HTTP date."""
+    if not value:
+        return None
+    with contextlib.suppress(ValueError):
+        return max(float(value), 0.0)
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _decode(body: bytes) -> Any:
+    """The JSON value of a response body, None if it is empty or not JSON (e.g. the HTML page of a gateway error)."""
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _is_rate_limited(status: int, payload: Any) -> bool:
+    # Over the limit, the API answers 429 with {"message": "Too Many Requests", "code": "429"}.
+    return status == 429 or (isinstance(payload, dict) and str(payload.get("code")) == "429")
+
+
+def parse_paper(paper: dict) -> PaperSearchResult:
+    """
+    Convert a paper object of the Graph API into a PaperSearchResult.
+
+    Args:
+        paper: dict. One element of the `data` array returned by the Graph API.
+
+    Returns:
+        PaperSearchResult. The converted paper.
+    """
+    return PaperSearchResult(
+        title=paper["title"],
+        authors=[
+            Author(
+                full_name=author["name"],
+                google_scholar_id=(author.get("externalIds") or {}).get("googleScholarId"),
+                dblp_id=(author.get("externalIds") or {}).get("DBLP"),
+                orcid_id=(author.get("externalIds") or {}).get("ORCID"),
+                affiliation=str(author.get("affiliations", [])),
+                homepage=author.get("homepage"),
+                semantic_scholar_id=author.get("authorId"),
+            )
+            for author in paper.get("authors") or []
+        ],
+        year=paper.get("year"),
+        abstract=paper.get("abstract"),
+        citation_count=paper.get("citationCount"),
+        venue_name=(paper.get("publicationVenue") or {}).get("name") or paper.get("venue") or None,
+        venue_url=(paper.get("publicationVenue") or {}).get("url"),
+        is_open_access=paper.get("isOpenAccess"),
+        open_access_link=(paper.get("openAccessPdf") or {}).get("url"),
+        doi=(paper.get("externalIds") or {}).get("DOI"),
+        semantic_scholar_id=paper.get("paperId"),
+    )
 
 
 class SemanticScholarSearchEngine(SearchEngine):
-    def __init__(self):
-        super().__init__()
+    """
+    Search engine backed by the Semantic Scholar Graph API.
+
+    All requests of one engine share a single `aiohttp.ClientSession`, so concurrent searches reuse
+    keep-alive connections instead of opening a new one per call. Use the engine as an async context
+    manager (or call `close()`) to release the connections.
+
+    Requests go through a `RequestScheduler` shared by every engine with the same API key, which keeps
+    them within the rate limit of the key no matter how many searches run concurrently.
+
+    ```
+    async with SemanticScholarSearchEngine() as engine:
+        results = await asyncio.gather(*(engine.search(q) for q in queries))
+    ```
+    """
+
+    PAGE_SIZE = 100
+
+    def __init__(
+        self,
+        api_key: str | None = SEMANTIC_SCHOLAR_API_KEY,
+        base_url: str = SEMANTIC_SCHOLAR_API_BASE,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_connections: int = 32,
+        session: aiohttp.ClientSession | None = None,
+        index: PaperSink | None = None,
+        scheduler: RequestScheduler | None = None,
+    ):
+        """
+        Args:
+            api_key: The Semantic Scholar API key. default: $SEMANTIC_SCHOLAR_API_KEY
+            base_url: The Graph API root, override it to point the engine at a stub server. default: $SEMANTIC_SCHOLAR_API_BASE
+            timeout: Total timeout of one HTTP request in seconds. default: 30.0
+            max_retries: How many times a rate limited or failed request is retried. default: 3
+            backoff: Base delay of the exponential backoff between retries in seconds. default: 1.0
+            max_connections: Size of the connection pool. default: 32
+            session: Use this session instead of creating one. The engine will not close it.
+            index: Store every search result in this index, e.g. a `LocalPaperIndex`. default: None
+            scheduler: Paces and queues the requests. default: the scheduler shared by all engines using `api_key`,
+                see `get_scheduler`
+        """
+        super().__init__(index=index)
+        self._api_key = api_key
+        self._base_url = base_url.rstrip("/")
+        self._scheduler = scheduler or get_scheduler(api_key, self._base_url)
+        self._timeout = aiohttp.ClientTimeout(total=timeout)
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_connections = max_connections
+        self._session = session
+        self._owns_session = session is None
+        self._session_loop: asyncio.AbstractEventLoop | None = None
+
+    async def __aenter__(self) -> "SemanticScholarSearchEngine":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close the underlying HTTP session if the engine created it."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._session_loop = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if not self._owns_session:
+            assert self._session is not None
+            return self._session
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # A session is bound to the loop it was created in, e.g. each `asyncio.run` needs a new one.
+            headers = {"x-api-key": self._api_key} if self._api_key is not None else {}
+            connector = aiohttp.TCPConnector(limit=self._max_connections, ttl_dns_cache=300, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(headers=headers, connector=connector, timeout=self._timeout)
+            self._session_loop = loop
+        return self._session
+
+    async def _request(
+        self, method: str, path: str, params: dict | None = None, json_body: dict | None = None, priority: int = 0, expected: type = dict
+    ) -> Any:
+        """
+        Send a request to the Graph API through the engine's scheduler and return the decoded JSON body.
+
+        Rate limited (429), server side (5xx) and connection failures are retried by the scheduler, honouring
+        Retry-After. The status is checked before the body is decoded, so an HTML error page of a gateway is
+        retried like any other 5xx. The body is read exactly once.
+
+        Args:
+            priority: Scheduler priority, lower values are sent first. default: 0
+            expected: The JSON type of a successful response, anything else raises `SemanticScholarError`. default: dict
+        """
+        session = self._get_session()
+        url = f"{self._base_url}/{path.lstrip('/')}"
+        params = {k: str(v) for k, v in (params or {}).items() if v is not None}
+
+        async def send() -> Any:
+            try:
+                async with session.request(method, url, params=params, json=json_body) as resp:
+                    status = resp.status
+                    retry_after = _parse_retry_after(resp.headers.get(aiohttp.hdrs.RETRY_AFTER))
+                    body = await resp.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise Retry(SemanticScholarError(f"Semantic Scholar API request failed: {e!r}")) from e
+
+            payload = _decode(body)
+            details = payload if payload is not None else body[:200].decode(errors="replace")
+            error_payload = payload if isinstance(payload, dict) else None
+            if _is_rate_limited(status, payload):
+                raise Retry(
+                    SemanticScholarRateLimitError(f"Semantic Scholar API limit reached: {details}", status, error_payload),
+                    retry_after,
+                    throttled=True,
+                )
+            if status >= 500:
+                raise Retry(SemanticScholarError(f"Semantic Scholar API error {status}: {details}", status, error_payload), retry_after)
+            if status >= 400 or (isinstance(payload, dict) and "message" in payload and "data" not in payload):
+                raise SemanticScholarError(f"Semantic Scholar API error {status}: {details}", status, error_payload)
+            if not isinstance(payload, expected):
+                raise SemanticScholarError(f"Unexpected Semantic Scholar API response: {details}", status, error_payload)
+            return payload
+
+        return await self._scheduler.submit(send, priority=priority, max_retries=self._max_retries, backoff=self._backoff)
+
+    async def _search_request(
+        self, query: str, year_from: int | str | None, year_to: int | str | None, offset: int | None, limit: int | None
+    ) -> tuple[list[PaperSearchResult], dict]:
+        year = None
+        if year_from is not None or year_to is not None:
+            year = f"{year_from if year_from is not None else ''}-{year_to if year_to is not None else ''}"
+
+        data = await self._request(
+            "GET",
+            "paper/search",
+            params={
+                "query": query,
+                "year": year,
+                "limit": limit,
+                "offset": offset,
+                "fields": PAPER_SEARCH_FIELDS,
+            },
+        )
+        papers = data.get("data") or []
+        logger.debug(f"Semantic Scholar returned {len(papers)} papers for {query!r}")
+        return self._remember([parse_paper(paper) for paper in papers]), data
 
     async def search(
         self,
@@ -23,100 +257,106 @@ class SemanticScholarSearchEngine(SearchEngine):
         offset: int | None = None,
         limit: int | None = None,
     ) -> list[PaperSearchResult]:
-        if year_from is not None and year_to is None:
-            year_from = f"{year_from}-"
-        if year_to is not None and year_from is None:
-            year_to = f"-{year_to}"
-
-        year = f"{year_from}-{year_to}" if year_from is not None and year_to is not None else None
-        result = []
-
-        headers = (
-            {
-                "x-api-key": SEMANTIC_SCHOLAR_API_KEY,
-            }
-            if SEMANTIC_SCHOLAR_API_KEY is not None
-            else {}
-        )
+        return (await self._search_request(query, year_from, year_to, offset, limit))[0]
 
-        ret = requests.get(
-            "https://api.semanticscholar.org/graph/v1/paper/search",
-            params={
-                "query": query,
-                "year": year,
-                # "fieldsOfStudy": "Computer Science",
-                "limit": limit,
-                "offset": offset,
-                "fields": "paperId,title,authors,externalIds,year,abstract,referenceCount,"
-                "citationCount,venue,publicationVenue,isOpenAccess,openAccessPdf,tldr",
-            },
-            headers=headers,
+    async def _search_page(
+        self, query: str, year_from: int | None, year_to: int | None, offset: int, limit: int
+    ) -> tuple[list[PaperSearchResult], bool]:
+        """A page of `search_iter`, which ends where the response has no `next` or at `SEARCH_RESULT_CAP`."""
+        limit = min(limit, SEARCH_RESULT_CAP - offset)
+        if limit <= 0:  # The API would answer 400
+            return [], False
+        papers, data = await self._search_request(query, year_from, year_to, offset, limit)
+        next_offset, total = data.get("next"), data.get("total")
+        if not papers or not isinstance(next_offset, int):
+            return papers, False
+        return papers, next_offset < SEARCH_RESULT_CAP and (not isinstance(total, int) or next_offset < total)
+
+    async def papers_batch(self, paper_ids: Iterable[str], fields: str = PAPER_SEARCH_FIELDS) -> list[PaperSearchResult | None]:
+        """
+        Look up many papers at once with the multi-ID endpoint (`POST /paper/batch`).
+
+        The IDs are split into chunks of `PAPER_BATCH_SIZE` which are fetched concurrently.
+
+        Args:
+            paper_ids: Any ID format the Graph API accepts, e.g. "649def34...", "DOI:10.1145/...", "ARXIV:1706.03762".
+            fields: Comma separated list of fields to return. default: PAPER_SEARCH_FIELDS
+
+        Returns:
+            A list aligned with `paper_ids`, holding None for IDs the API does not know.
+        """
+        paper_ids = list(paper_ids)
+        chunks = [paper_ids[i : i + PAPER_BATCH_SIZE] for i in range(0, len(paper_ids), PAPER_BATCH_SIZE)]  # noqa: E203
+        pages = await asyncio.gather(
+            *(self._request("POST", "paper/batch", params={"fields": fields}, json_body={"ids": chunk}, expected=list) for chunk in chunks)
         )
+        results = [parse_paper(paper) if paper is not None else None for page in pages for paper in page]
+        self._remember([paper for paper in results if paper is not None])
+        return results
 
-        logger.info(ret.json())
-        if "code" in ret.json():  # 429
-            logger.error(ret.json())
-            time.sleep(5)
-            raise Exception(f"Semantic Scholar API limit reached: {ret.json()}")
-        elif "message" in ret.json():
-            logger.error(ret.json())
-            time.sleep(5)
-            raise Exception(f"Semantic Scholar API error: {ret.json()}")
-
-        if "data" in ret.json():
-            data = ret.json()["data"]
-            for paper in data:
-                result.append(
-                    PaperSearchResult(
-                        title=paper["title"],
-                        authors=[
-                            Author(
-                                full_name=author["name"],
-                                google_scholar_id=author.get("externalIds", {}).get("googleScholarId"),
-                                dblp_id=author.get("externalIds", {}).get("DBLP"),
-                                orcid_id=author.get("externalIds", {}).get("ORCID"),
-                                affiliation=str(author.get("affiliations", [])),
-                                homepage=author.get("homepage"),
-                            )
-                            for author in paper["authors"]
-                        ],
-                        year=paper["year"],
-                        abstract=paper["abstract"],
-                        citation_count=paper["citationCount"],
-                        venue_name=json.dumps(paper["publicationVenue"]),
-                        is_open_access=paper["isOpenAccess"],
-                        open_access_link=json.dumps(paper["openAccessPdf"]),
-                    )
-                )
+    async def _paginate(self, path: str, fields: str, offset: int, limit: int | None, page_size: int) -> AsyncIterator[dict]:
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            # Bulk pagination yields to interactive searches queued on the same key.
+            page = await self._request("GET", path, params={"fields": fields, "offset": offset, "limit": size}, priority=1)
+            data = page.get("data") or []
+            for item in data:
+                yield item
+            if remaining is not None:
+                remaining -= len(data)
+            if "next" not in page or not data:
+                return
+            offset = page["next"]
 
-        # if "total" in ret.json():
-        #     # this means no result
-        #     return []
-        return result
-
-    def paper_citations(self, paper_id: str, limit: int = 1000, offset: int = 0) -> list[dict]:
-        while True:
-            ret = requests.get(
-                url=f"https://api.semanticscholar.org/graph/v1/paper/{paper_id}/citations",
-                params={
-                    "fields": "paperId,title,year,abstract",
-                    "limit": str(limit),
-                    "offset": str(offset),
-                },
-            )
+    def paper_citations(
+        self, paper_id: str, fields: str = "paperId,title,year,abstract", offset: int = 0, limit: int | None = None, page_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        """
+        Stream the papers citing `paper_id`, one page at a time.
+
+        ```
+        async for item in engine.paper_citations("649def34f8be52c8b66281af98ae884c09aef38b"):
+            print(item["citingPaper"]["title"])
+        ```
+
+        Args:
+            paper_id: The paper to look up.
+            fields: Comma separated list of fields of the citing papers. default: "paperId,title,year,abstract"
+            offset: How many citations to skip. default: 0
+            limit: Stop after this many citations, None streams all of them. default: None
+            page_size: Citations fetched per request, at most 1000. default: 1000
+
+        Returns:
+            An async iterator over the API items, i.e. `{"citingPaper": {...}}`.
+        """
+        return self._paginate(f"paper/{paper_id}/citations", fields, offset, limit, page_size)
 
-            if "code" in ret.json() or "message" in ret.json():
-                print(ret.json())
-                time.sleep(5)
-                continue
+    def paper_references(
+        self, paper_id: str, fields: str = "paperId,title,year,abstract", offset: int = 0, limit: int | None = None, page_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        """
+        Stream the papers referenced by `paper_id`. See `paper_citations` for the arguments.
 
-            if "data" in ret.json():
-                return ret.json()["data"]
+        Returns:
+            An async iterator over the API items, i.e. `{"citedPaper": {...}}`.
+        """
+        return self._paginate(f"paper/{paper_id}/references", fields, offset, limit, page_size)
 
-            if "total" in ret.json():
-                # this means no result
-                return []
+    async def match_title(self, title: str, fields: str = PAPER_SEARCH_FIELDS) -> PaperSearchResult | None:
+        """
+        Find the paper whose title best matches `title` (`GET /paper/search/match`).
 
-            print(ret.json())
-            time.sleep(5)
-            continue
+        Returns:
+            PaperSearchResult | None. The closest paper, None if the API finds no match.
+        """
+        try:
+            data = await self._request("GET", "paper/search/match", params={"query": title, "fields": fields})
+        except SemanticScholarError as e:
+            if e.status == 404:  # "Title match not found"
+                return None
+            raise
+        papers = data.get("data") or []
+        if not papers:
+            return None
+        return self._remember([parse_paper(papers[0])])[0]
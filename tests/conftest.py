@@ -0,0 +1,30 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from agent_starter_kit.tools.search import SemanticScholarSearchEngine
+from agent_starter_kit.tools.search.scheduler import RequestScheduler
+
+
+@pytest.fixture
+def semantic_scholar() -> Callable:
+    """
+    `async with semantic_scholar(app, **kwargs) as engine` serves the stub `app` locally and yields a
+    `SemanticScholarSearchEngine` pointed at it, with an unpaced scheduler so tests do not wait on the rate limit.
+    """
+
+    @asynccontextmanager
+    async def serve(app: web.Application, **kwargs) -> AsyncIterator[SemanticScholarSearchEngine]:
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            kwargs.setdefault("scheduler", RequestScheduler(rate=None))
+            async with SemanticScholarSearchEngine(api_key=None, base_url=str(server.make_url("")), **kwargs) as engine:
+                yield engine
+        finally:
+            await server.close()
+
+    return serve
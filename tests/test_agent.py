@@ -0,0 +1,77 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from aiohttp import web
+
+from agent_starter_kit.agent import Agent
+
+
+def _chunk(content: str | None) -> bytes:
+    choice = {"index": 0, "delta": {} if content is None else {"content": content}, "finish_reason": None if content is not None else "stop"}
+    chunk = {"id": "chatcmpl-1", "object": "chat.completion.chunk", "created": 0, "model": "fake", "choices": [choice]}
+    return f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+@pytest.fixture
+def openai_server(monkeypatch):
+    """A streaming chat completions stub on a background loop, `Agent` is synchronous. Yields the request bodies."""
+    bodies: list[dict] = []
+
+    async def completions(request: web.Request) -> web.StreamResponse:
+        bodies.append(await request.json())
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for token in ["<ANSWER>", "4", "2", "</ANSWER>"]:
+            await response.write(_chunk(token))
+        await response.write(_chunk(None))
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", 0).start())
+    host, port = runner.addresses[0][:2]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://{host}:{port}/v1")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-fake")
+    try:
+        yield bodies
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.run_until_complete(runner.cleanup())
+        loop.close()
+
+
+def test_run_streams_tokens_and_sends_sampling_parameters(openai_server):
+    agent = Agent("Test", temperature=0.5, seed=7, tracing=False)
+    tokens: list[str] = []
+
+    assert agent.run(prompt="What is 6 * 7?", stream_callback=tokens.append) == "<ANSWER>42</ANSWER>"
+    assert tokens == ["<ANSWER>", "4", "2", "</ANSWER>"]
+    body = openai_server[0]
+    assert body["messages"] == [{"role": "user", "content": "What is 6 * 7?"}]
+    assert (body["temperature"], body["seed"], body["stream"]) == (0.5, 7, True)
+
+
+def test_run_accepts_a_message_list(openai_server):
+    messages = [{"role": "system", "content": "Be brief"}, {"role": "user", "content": "Hi"}]
+    Agent("Test", tracing=False).run(prompt=messages, response_format="json_object")
+    assert openai_server[0]["messages"] == messages
+    assert openai_server[0]["response_format"] == {"type": "json_object"}
+
+
+def test_parse_extracts_tags_of_the_last_response(openai_server):
+    agent = Agent("Test", tracing=False)
+    with pytest.raises(ValueError, match="No response"):
+        agent.parse("ANSWER")
+    agent.run(prompt="What is 6 * 7?")
+    assert agent.parse("ANSWER") == "42"
+    with pytest.raises(ValueError, match="not found"):
+        agent.parse("REASONING")
@@ -0,0 +1,55 @@
+import io
+import json
+
+from agent_starter_kit.tools.search import Author, PaperSearchResult, PaperSearchResultBatch
+
+ALICE = Author(full_name="Alice", orcid_id="0000-0001")
+BOB = Author(full_name="Bob")
+PAPERS = [
+    PaperSearchResult(title="A", authors=[ALICE, BOB], year=2020, citation_count=3, is_open_access=True, open_access_link="https://a.pdf"),
+    PaperSearchResult(title="B", authors=[BOB], abstract="About B", is_open_access=False, doi="10.1/b"),
+    PaperSearchResult(title="C", authors=[]),
+]
+
+
+def test_records_are_slotted():
+    assert not hasattr(PAPERS[0], "__dict__")
+    assert not hasattr(ALICE, "__dict__")
+
+
+def test_batch_round_trips_records():
+    batch = PaperSearchResultBatch(PAPERS)
+    assert len(batch) == 3
+    assert list(batch) == PAPERS
+    assert batch[-1] == PAPERS[-1]
+    assert batch[1:] == PAPERS[1:]
+    assert batch.authors == [ALICE, BOB]
+    assert batch.titles == ["A", "B", "C"]
+
+
+def test_jsonl_matches_to_dict():
+    out = io.StringIO()
+    PaperSearchResultBatch(PAPERS).write_jsonl(out)
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == [paper.to_dict() for paper in PAPERS]
+    assert list(PaperSearchResultBatch.read_jsonl(io.StringIO(out.getvalue()))) == PAPERS
+
+
+def test_columnar_round_trip():
+    out = io.StringIO()
+    PaperSearchResultBatch(PAPERS).write_columnar(out)
+    columns = json.loads(out.getvalue())
+    assert columns["columns"]["year"] == [2020, None, None]
+    assert len(columns["authors"]) == 2
+    assert list(PaperSearchResultBatch.read_columnar(io.StringIO(out.getvalue()))) == PAPERS
+
+
+def test_materialized_authors_are_not_shared():
+    author = Author(full_name="Alice")
+    batch = PaperSearchResultBatch([PaperSearchResult(title="A", authors=[author]), PaperSearchResult(title="B", authors=[author])])
+    author.affiliation = "Changed after appending"
+    first = batch[0]
+    first.authors[0].affiliation = "Changed on a materialized paper"
+    batch.authors[0].homepage = "https://changed"
+    assert batch[1].authors[0] == Author(full_name="Alice")
+    assert batch[0].authors[0] == Author(full_name="Alice")
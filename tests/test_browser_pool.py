@@ -0,0 +1,111 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+from crawl4ai import CrawlerRunConfig
+
+from agent_starter_kit.tools.search import GoogleScholarSearchEngine
+from agent_starter_kit.tools.search.browser_pool import BrowserPool
+from agent_starter_kit.tools.search.proxy_pool import ProxyPool, StaticProxyProvider
+
+FIRST_PAGE = (Path(__file__).parent / "fixtures" / "google_scholar" / "gs_a_machine_learning.html").read_text()
+
+
+class FakeCrawler:
+    launched: list["FakeCrawler"] = []
+
+    def __init__(self, port: int, pages: dict[str, str]):
+        self.port = port
+        self.pages = pages
+        self.ready = False
+        self.closed = False
+        self.running = 0
+        self.max_running = 0
+        FakeCrawler.launched.append(self)
+
+    async def start(self):
+        self.ready = True
+        return self
+
+    async def close(self):
+        assert not self.closed, "closed twice"
+        self.closed = True
+
+    async def arun(self, url, config, **kwargs):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        return SimpleNamespace(html=self.pages.get(url, "<html>ok</html>"), success=True)
+
+
+def _pool(pages: dict[str, str] | None = None, **kwargs) -> BrowserPool:
+    FakeCrawler.launched = []
+    return BrowserPool(browser_factory=lambda port: FakeCrawler(port, pages or {}), **kwargs)  # type: ignore[arg-type, return-value]
+
+
+def test_browsers_are_reused_and_bounded():
+    async def main():
+        async with _pool(size=2, pages_per_browser=2) as pool:
+            await asyncio.gather(*(pool.fetch(f"https://example.com/{i}", CrawlerRunConfig()) for i in range(20)))
+
+    asyncio.run(main())
+    assert len(FakeCrawler.launched) == 2
+    assert all(c.max_running <= 2 for c in FakeCrawler.launched)
+    assert all(c.closed for c in FakeCrawler.launched)
+
+
+def test_browsers_are_recycled_after_max_pages_and_on_block():
+    async def main():
+        async with _pool({"https://blocked": "please show you're not a robot"}, size=1, pages_per_browser=1, max_pages=3) as pool:
+            for i in range(6):
+                await pool.fetch(f"https://example.com/{i}", CrawlerRunConfig())
+            await pool.fetch("https://blocked", CrawlerRunConfig())
+            await pool.fetch("https://example.com/after", CrawlerRunConfig())
+
+    asyncio.run(main())
+    assert len(FakeCrawler.launched) == 4
+    assert len({c.port for c in FakeCrawler.launched}) == 4
+    assert all(c.closed for c in FakeCrawler.launched)
+
+
+class SlowPrefetchCrawler(FakeCrawler):
+    """Serves the first result page at once and never finishes the following ones."""
+
+    async def arun(self, url, config, **kwargs):
+        if "start=0" not in url:
+            await asyncio.sleep(3600)
+        return SimpleNamespace(html=FIRST_PAGE, success=True)
+
+
+def test_engine_truncates_to_limit_and_awaits_prefetches_on_close():
+    crawler = SlowPrefetchCrawler(0, {})
+
+    async def main():
+        pool = BrowserPool(size=1, pages_per_browser=4, browser_factory=lambda port: crawler)  # type: ignore[arg-type, return-value]
+        async with pool, ProxyPool(StaticProxyProvider([])) as proxies:
+            engine = GoogleScholarSearchEngine(pool=pool, prefetch=2, proxies=proxies)
+            papers = await engine._search("machine learning", None, None, 0, 3)
+            tasks = set(engine._prefetch_tasks)
+            await engine.close()
+            return papers, tasks, engine._prefetch_tasks
+
+    papers, tasks, remaining = asyncio.run(main())
+    assert len(papers) == 3
+    assert len(tasks) == 2 and all(task.cancelled() for task in tasks)
+    assert not remaining
+
+
+def test_search_iter_pages_do_not_prefetch_twice():
+    crawler = SlowPrefetchCrawler(0, {})
+
+    async def main():
+        pool = BrowserPool(size=1, browser_factory=lambda port: crawler)  # type: ignore[arg-type, return-value]
+        async with pool, ProxyPool(StaticProxyProvider([])) as proxies:
+            async with GoogleScholarSearchEngine(pool=pool, prefetch=2, proxies=proxies) as engine:
+                papers, more = await engine._search_page("machine learning", None, None, 0, 10)
+                return papers, more, len(engine._prefetch_tasks)
+
+    papers, more, prefetches = asyncio.run(main())
+    assert len(papers) == 9 and more
+    assert prefetches == 0
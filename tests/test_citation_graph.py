@@ -0,0 +1,165 @@
+import asyncio
+
+from aiohttp import web
+
+from agent_starter_kit.tools.crawl import CitationGraphCrawler
+from agent_starter_kit.tools.crawl.citation_graph import SeenSet
+from agent_starter_kit.tools.search import SemanticScholarSearchEngine
+
+# a <- b, a <- c, b <- d, c <- d, d <- e: the value lists the papers citing the key
+CITED_BY = {"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": ["e"], "e": []}
+
+
+def _app(requests: list[str], cited_by: dict[str, list], failures: dict[str, int]) -> web.Application:
+    """
+    Serves `cited_by` in both directions, answering 404 to the first `failures[paper_id]` requests of a paper,
+    or to the first `failures[f"{paper_id}@{offset}"]` requests of the page of a paper starting at `offset`.
+    """
+    cites: dict[str, list] = {paper_id: [] for paper_id in cited_by}
+    for cited, citing in cited_by.items():
+        for paper_id in citing:
+            if paper_id is not None:
+                cites[paper_id].append(cited)
+
+    def page(request: web.Request, neighbours: dict[str, list], key: str) -> web.Response:
+        paper_id = request.match_info["paper_id"]
+        requests.append(paper_id)
+        offset, limit = int(request.query.get("offset", 0)), int(request.query["limit"])
+        for failing in (paper_id, f"{paper_id}@{offset}"):
+            if failures.get(failing, 0) > 0:
+                failures[failing] -= 1
+                return web.json_response({"error": "Paper not found"}, status=404)
+        items = neighbours[paper_id][offset : offset + limit]  # noqa: E203
+        body: dict = {"offset": offset, "data": [{key: {"paperId": p, "title": p and p.upper(), "citationCount": 0}} for p in items]}
+        if offset + limit < len(neighbours[paper_id]):
+            body["next"] = offset + limit
+        return web.json_response(body)
+
+    async def citations(request: web.Request) -> web.Response:
+        return page(request, cited_by, "citingPaper")
+
+    async def references(request: web.Request) -> web.Response:
+        return page(request, cites, "citedPaper")
+
+    app = web.Application()
+    app.router.add_get("/paper/{paper_id}/citations", citations)
+    app.router.add_get("/paper/{paper_id}/references", references)
+    return app
+
+
+def _crawl(
+    semantic_scholar,
+    state_dir: str,
+    requests: list[str],
+    max_nodes_per_run: list[int | None],
+    cited_by: dict[str, list] = CITED_BY,
+    failures: dict[str, int] | None = None,
+    **kwargs,
+) -> list:
+    async def main():
+        async with semantic_scholar(_app(requests, cited_by, failures or {})) as engine:
+            stats = []
+            for max_nodes in max_nodes_per_run:
+                crawler = CitationGraphCrawler(engine, state_dir, **kwargs)
+                stats.append(await crawler.crawl(["a"], max_nodes=max_nodes))
+                crawler.close()
+            return stats
+
+    return asyncio.run(main())
+
+
+def test_crawl_expands_each_paper_once(semantic_scholar, tmp_path):
+    requests: list[str] = []
+    (stats,) = _crawl(semantic_scholar, str(tmp_path), requests, [None], max_depth=5, page_size=1)
+
+    assert sorted(set(requests)) == ["a", "b", "c", "d", "e"]
+    assert requests.count("a") == 2  # two pages of one paper, the second one has no `next`
+    assert stats.expanded == 5 and stats.edges == 5 and stats.frontier == 0
+
+    crawler = CitationGraphCrawler(SemanticScholarSearchEngine(api_key=None), str(tmp_path))
+    assert sorted(crawler.iter_edges()) == [("b", "a"), ("c", "a"), ("d", "b"), ("d", "c"), ("e", "d")]
+    ids, offsets, targets = crawler.adjacency()
+    cites = {ids[i]: sorted(ids[j] for j in targets[offsets[i] : offsets[i + 1]]) for i in range(len(ids))}  # noqa: E203
+    assert cites == {"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"], "e": ["d"]}
+
+
+def test_crawl_respects_max_depth(semantic_scholar, tmp_path):
+    requests: list[str] = []
+    (stats,) = _crawl(semantic_scholar, str(tmp_path), requests, [None], max_depth=1)
+    assert sorted(requests) == ["a", "b", "c"]
+    assert stats.edges == 4  # d is recorded as a neighbour of b and c, but not expanded
+
+
+def test_interrupted_crawl_resumes_where_it_stopped(semantic_scholar, tmp_path):
+    requests: list[str] = []
+    first, second = _crawl(semantic_scholar, str(tmp_path), requests, [2, None], max_depth=5)
+
+    assert first.expanded == 2 and first.frontier > 0
+    assert second.expanded == 3 and second.frontier == 0
+    assert sorted(requests) == ["a", "b", "c", "d", "e"]
+
+    crawler = CitationGraphCrawler(SemanticScholarSearchEngine(api_key=None), str(tmp_path))
+    assert len(list(crawler.iter_edges())) == 5
+
+
+def test_uncommitted_edges_are_dropped_on_resume(semantic_scholar, tmp_path):
+    requests: list[str] = []
+    _crawl(semantic_scholar, str(tmp_path), requests, [1], max_depth=5)
+    with open(tmp_path / "edges.jsonl", "a") as f:
+        f.write('{"source": "x", "target": "y"}\n{"source": "x"')  # a run killed while writing
+
+    _crawl(semantic_scholar, str(tmp_path), requests, [None], max_depth=5)
+    crawler = CitationGraphCrawler(SemanticScholarSearchEngine(api_key=None), str(tmp_path))
+    assert ("x", "y") not in set(crawler.iter_edges())
+    assert len(list(crawler.iter_edges())) == 5
+
+
+def test_seen_set():
+    seen = SeenSet(["a", "b"])
+    seen.add("c")
+    assert "a" in seen and "c" in seen and "d" not in seen
+    assert len(seen) == 3
+
+
+def test_papers_without_id_are_skipped_and_duplicates_dropped(semantic_scholar, tmp_path):
+    requests: list[str] = []
+    cited_by = {"a": [None, "b", None, "b", "c"], "b": [], "c": []}
+    (stats,) = _crawl(semantic_scholar, str(tmp_path), requests, [None], cited_by=cited_by, page_size=1)
+
+    assert requests.count("a") == 5  # the pages holding papers without an ID do not shift the offset
+    assert stats.edges == 2
+    crawler = CitationGraphCrawler(SemanticScholarSearchEngine(api_key=None), str(tmp_path))
+    assert sorted(crawler.iter_edges()) == [("b", "a"), ("c", "a")]
+
+
+def test_both_directions_write_each_edge_once(semantic_scholar, tmp_path):
+    requests: list[str] = []
+    (stats,) = _crawl(semantic_scholar, str(tmp_path), requests, [None], direction="both", max_depth=5)
+
+    assert stats.expanded == 5 and stats.edges == 5
+    crawler = CitationGraphCrawler(SemanticScholarSearchEngine(api_key=None), str(tmp_path))
+    assert sorted(crawler.iter_edges()) == [("b", "a"), ("c", "a"), ("d", "b"), ("d", "c"), ("e", "d")]
+
+
+def test_failed_nodes_are_retried_on_resume(semantic_scholar, tmp_path):
+    requests: list[str] = []
+    runs = _crawl(semantic_scholar, str(tmp_path), requests, [None, None, None], failures={"b": 2}, max_depth=5, max_retries=1)
+
+    assert [(s.expanded, s.failed) for s in runs] == [(4, 1), (0, 1), (0, 0)]  # the retry fails too, then b is given up
+
+    requests.clear()
+    runs = _crawl(semantic_scholar, str(tmp_path / "retried"), requests, [None, None], failures={"b": 1}, max_depth=5)
+    assert [(s.expanded, s.failed) for s in runs] == [(4, 1), (1, 0)]
+    crawler = CitationGraphCrawler(SemanticScholarSearchEngine(api_key=None), str(tmp_path / "retried"))
+    assert len(list(crawler.iter_edges())) == 5
+
+
+def test_node_failing_on_a_later_page_writes_its_edges_once(semantic_scholar, tmp_path):
+    requests: list[str] = []
+    cited_by = {"a": ["b", "c", "d"], "b": [], "c": [], "d": []}
+    failed, resumed = _crawl(semantic_scholar, str(tmp_path), requests, [None, None], cited_by=cited_by, failures={"a@2": 1}, page_size=1)
+
+    assert (failed.expanded, failed.failed, failed.edges) == (0, 1, 0)  # the first two pages arrived, but nothing was written
+    assert (resumed.expanded, resumed.edges) == (4, 3)
+    crawler = CitationGraphCrawler(SemanticScholarSearchEngine(api_key=None), str(tmp_path))
+    assert sorted(crawler.iter_edges()) == [("b", "a"), ("c", "a"), ("d", "a")]
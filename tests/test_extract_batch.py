@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from agent_starter_kit.tools.extract import batch
+from agent_starter_kit.tools.extract.batch import iter_pdf_paths, process_file, run_batch
+
+FIXTURES = Path(__file__).parent / "fixtures" / "pdf"
+
+
+def _records(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def test_batch_writes_one_record_per_file_and_resumes(tmp_path):
+    corpus = tmp_path / "corpus"
+    shutil.copytree(FIXTURES, corpus / "nested")
+    (corpus / "broken.pdf").write_bytes(b"not a pdf")
+    output = tmp_path / "refs.jsonl"
+
+    stats = run_batch([str(corpus)], str(output), workers=2)
+    assert stats == {"processed": 5, "skipped": 0, "failed": 1}
+    records = {Path(r["path"]).name: r for r in _records(output)}
+    assert set(records) == {p.name for p in FIXTURES.glob("*.pdf")} | {"broken.pdf"}
+
+    numbered = records["numbered.pdf"]
+    assert (numbered["type"], numbered["ref_pages"], numbered["count"], numbered["pages"]) == ("NUMBERED", [6, 7], 40, 8)
+    assert numbered["refs"][0].startswith("[1] ") and numbered["error"] is None
+    assert set(numbered["timings"]) == {"hash", "extract"}
+    assert records["no_references.pdf"]["type"] is None and records["no_references.pdf"]["error"] is None
+    assert records["broken.pdf"]["error"] is not None
+
+    with open(output, "a") as f:
+        f.write('{"path": "interrupted')  # a run killed mid-write
+    shutil.copy(FIXTURES / "numbered.pdf", corpus / "copy_of_numbered.pdf")  # same content, already done
+    stats = run_batch([str(corpus / "**" / "*.pdf")], str(output), workers=2)
+    assert stats == {"processed": 0, "skipped": 6, "failed": 1}  # only the broken file is retried
+    assert len(output.read_text().splitlines()) == 6 + 1 + 1
+
+
+def _misbehaving_process_file(path: str, *args):
+    """Stands in for `process_file` in the workers, `run_batch` looks it up when submitting."""
+    name = Path(path).name
+    if name == "crash.pdf":
+        os._exit(1)  # As if MuPDF segfaulted
+    if name == "raise.pdf":
+        raise RuntimeError("not caught in the worker")
+    if name == "hang.pdf":
+        time.sleep(3600)  # As if stuck in a C call, without the alarm of `process_file`
+    return process_file(path, *args)
+
+
+def test_crashing_raising_and_hanging_workers_fail_only_their_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "process_file", _misbehaving_process_file)
+    corpus = tmp_path / "corpus"
+    shutil.copytree(FIXTURES, corpus)
+    for name in ("crash.pdf", "raise.pdf", "hang.pdf"):
+        shutil.copy(FIXTURES / "numbered.pdf", corpus / name)
+    output = tmp_path / "refs.jsonl"
+
+    stats = run_batch([str(corpus)], str(output), workers=2, timeout=2.0, resume=False)
+    assert stats == {"processed": 5, "skipped": 0, "failed": 3}
+    records = {Path(r["path"]).name: r for r in _records(output)}
+    assert records["crash.pdf"]["error"].startswith("The worker process died")
+    assert records["raise.pdf"]["error"] == "RuntimeError('not caught in the worker')"
+    assert records["hang.pdf"]["error"] == "Timed out after 2.0s"
+    assert all(records[p.name]["error"] is None for p in FIXTURES.glob("*.pdf"))
+
+
+def test_page_range_bounds_the_search():
+    path = str(FIXTURES / "numbered.pdf")
+    assert process_file(path, end=4)["type"] is None  # type: ignore[index]  # the references start on page 6
+    bounded = process_file(path, begin=5, end=5)
+    assert bounded is not None and bounded["ref_pages"] == [6, 6] and bounded["count"] < 40
+
+
+def test_timeout_is_reported_as_an_error():
+    record = process_file(str(FIXTURES / "long_numbered.pdf"), timeout=1e-6)
+    assert record is not None and record["error"] == "Timed out after 1e-06s"
+
+
+def test_inputs_are_expanded_once():
+    paths = list(iter_pdf_paths([str(FIXTURES), str(FIXTURES / "numbered.pdf"), str(FIXTURES / "*.pdf")]))
+    assert len(paths) == len(set(paths)) == 5
@@ -0,0 +1,107 @@
+import asyncio
+from contextlib import aclosing
+
+from loguru import logger
+
+from agent_starter_kit.tools.search import Author, FederatedSearchEngine, PaperSearchResult, SearchEngine
+
+
+class FakeEngine(SearchEngine):
+    def __init__(self, results: list[PaperSearchResult], delay: float = 0.0, error: Exception | None = None):
+        super().__init__()
+        self._results = results
+        self._delay = delay
+        self._error = error
+
+    async def search(self, query, year_from=None, year_to=None, offset=None, limit=None):
+        await asyncio.sleep(self._delay)
+        if self._error is not None:
+            raise self._error
+        return self._results
+
+
+SEMANTIC = PaperSearchResult(
+    title="Attention Is All You Need",
+    authors=[Author(full_name="Ashish Vaswani", semantic_scholar_id="40348417"), Author(full_name="Noam Shazeer")],
+    year=2017,
+    citation_count=90000,
+    doi="10.48550/arXiv.1706.03762",
+    is_open_access=True,
+    open_access_link="https://arxiv.org/pdf/1706.03762",
+)
+GOOGLE = PaperSearchResult(
+    title="Attention is all you need.",
+    authors=[Author(full_name="Ashish Vaswani", google_scholar_id="oR9sCGYAAAAJ")],
+    year=2017,
+    citation_count=120000,
+    venue_name="NeurIPS",
+)
+
+
+def test_merges_same_paper_from_both_engines():
+    other = PaperSearchResult(title="BERT", authors=[Author(full_name="Jacob Devlin")], year=2019)
+    engine = FederatedSearchEngine([FakeEngine([SEMANTIC]), FakeEngine([GOOGLE, other])])
+    results = asyncio.run(engine.search("attention"))
+
+    assert [r.title for r in results] == ["Attention Is All You Need", "BERT"]
+    merged = results[0]
+    assert merged.citation_count == 120000
+    assert merged.venue_name == "NeurIPS"
+    assert merged.open_access_link == "https://arxiv.org/pdf/1706.03762"
+    assert merged.authors[0].semantic_scholar_id == "40348417"
+    assert merged.authors[0].google_scholar_id == "oR9sCGYAAAAJ"
+    assert len(merged.authors) == 2
+
+
+def test_deadline_returns_what_arrived_and_skips_failures():
+    engine = FederatedSearchEngine(
+        [FakeEngine([GOOGLE], delay=5), FakeEngine([SEMANTIC]), FakeEngine([], error=RuntimeError("blocked"))],
+        timeout=0.2,
+    )
+    results = asyncio.run(engine.search("attention"))
+    assert [r.citation_count for r in results] == [90000]
+
+
+def test_stream_yields_after_each_engine():
+    engine = FederatedSearchEngine([FakeEngine([SEMANTIC], delay=0.1), FakeEngine([GOOGLE])])
+
+    async def main():
+        return [partial async for partial in engine.search_stream("attention")]
+
+    snapshots = asyncio.run(main())
+    assert [len(s) for s in snapshots] == [1, 1]
+    assert snapshots[0][0].citation_count == 120000
+    assert snapshots[0][0].doi is None
+    assert snapshots[1][0].doi == SEMANTIC.doi
+
+
+def test_keeps_non_latin_titles_apart():
+    first = PaperSearchResult(title="注意力机制综述", authors=[], year=2021)
+    second = PaperSearchResult(title="图神经网络综述", authors=[], year=2021)
+    russian = PaperSearchResult(title="Обзор механизмов внимания", authors=[], year=2021)
+    duplicate = PaperSearchResult(title="注意力机制综述。", authors=[], year=2021, citation_count=12)
+    engine = FederatedSearchEngine([FakeEngine([first, second, russian]), FakeEngine([duplicate])])
+    results = asyncio.run(engine.search("综述"))
+
+    assert [r.title for r in results] == [first.title, second.title, russian.title]
+    assert results[0].citation_count == 12
+
+
+def test_stopping_early_cancels_engines_without_a_deadline_warning():
+    slow = FakeEngine([GOOGLE], delay=5)
+    engine = FederatedSearchEngine([FakeEngine([SEMANTIC]), slow], timeout=10)
+    warnings: list[str] = []
+    sink = logger.add(warnings.append, level="WARNING")
+
+    async def main():
+        async with aclosing(engine.search_stream("attention")) as stream:
+            async for _ in stream:
+                break
+        return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    try:
+        leftover = asyncio.run(main())
+    finally:
+        logger.remove(sink)
+    assert leftover == []
+    assert not [w for w in warnings if "deadline" in w]
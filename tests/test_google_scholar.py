@@ -0,0 +1,65 @@
+from pathlib import Path
+
+import pytest
+
+from agent_starter_kit.tools.search.google_scholar import parse_google_scholar_html
+
+FIXTURES = Path(__file__).parent / "fixtures" / "google_scholar"
+
+
+def _parse(name: str):
+    return parse_google_scholar_html((FIXTURES / name).read_text())
+
+
+def test_gs_a_layout():
+    results = _parse("gs_a_machine_learning.html")
+    assert len(results) == 9  # the [CITATION] entry has no link and is skipped
+
+    scikit = results[2]
+    assert scikit.title == "Scikit-learn: Machine learning in Python"
+    assert scikit.year == 2011
+    assert scikit.venue_name == "the Journal of machine Learning research"
+    assert scikit.venue_url == "jmlr.org"
+    assert scikit.citation_count == 112034
+    assert [a.full_name for a in scikit.authors] == ["F Pedregosa", "G Varoquaux", "A Gramfort", "V Michel"]
+    assert scikit.authors[0].google_scholar_id is not None
+    assert scikit.authors[3].google_scholar_id is None
+    assert scikit.abstract is not None and scikit.abstract.startswith("Scikit-learn is a Python module")
+
+    book = results[0]
+    assert (book.year, book.venue_name, book.venue_url) == (2021, "Springer Nature", "books.google.com")
+
+    hyphenated = results[7]
+    assert [a.full_name for a in hyphenated.authors] == ["S Shalev-Shwartz", "S Ben-David"]
+
+    no_venue = results[8]
+    assert (no_venue.year, no_venue.venue_name, no_venue.venue_url, no_venue.citation_count) == (None, None, "deeplearning.ai", 0)
+
+
+def test_gs_fmaa_layout():
+    results = _parse("gs_fmaa_attention_is_all_you_need.html")
+    assert len(results) == 10
+
+    detailed = results[0]
+    assert detailed.title == "Attention is all you need"
+    assert detailed.year == 2017
+    assert detailed.venue_name == "Advances in neural information processing systems"
+    assert detailed.venue_url == "proceedings.neurips.cc"
+    assert detailed.citation_count == 152340
+    assert len(detailed.authors) == 7
+    assert all(a.google_scholar_id for a in detailed.authors)
+    assert detailed.abstract is not None and detailed.abstract.startswith("The dominant sequence transduction models")
+
+    assert results[2].venue_name == "ICASSP 2021-2021 IEEE …"
+    assert results[2].year == 2021
+
+
+def test_unlinked_authors_in_detailed_layout():
+    [resnet, *_] = _parse("gs_fmaa_deep_residual_learning.html")
+    assert [a.full_name for a in resnet.authors] == ["K He", "X Zhang", "S Ren", "J Sun"]
+    assert resnet.authors[3].google_scholar_id is None
+
+
+def test_blocked_page():
+    with pytest.raises(ValueError, match="blocking"):
+        _parse("blocked.html")
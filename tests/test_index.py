@@ -0,0 +1,111 @@
+import asyncio
+
+from agent_starter_kit.tools.search import Author, LocalFirstSearchEngine, LocalPaperIndex, PaperSearchResult, SearchEngine
+
+
+class CountingEngine(SearchEngine):
+    def __init__(self, results: list[PaperSearchResult]):
+        super().__init__()
+        self.calls = 0
+        self._results = results
+
+    async def search(self, query, year_from=None, year_to=None, offset=None, limit=None):
+        self.calls += 1
+        return self._results
+
+
+def _paper(title: str, year: int, citations: int = 0, **kwargs) -> PaperSearchResult:
+    return PaperSearchResult(title=title, authors=[Author(full_name="Ada Lovelace")], year=year, citation_count=citations, **kwargs)
+
+
+def test_full_text_search_with_year_filter_and_paging():
+    index = LocalPaperIndex(":memory:")
+    index.ingest([_paper(f"Graph neural networks part {i}", 2015 + i, citations=i) for i in range(10)] + [_paper("Convolutional networks", 2020)])
+
+    async def main():
+        return (
+            await index.search("graph networks"),
+            await index.search("graph networks", year_from=2018, year_to=2020),
+            await index.search("graph networks", offset=2, limit=3),
+            await index.search('lovelace" (*'),
+        )
+
+    everything, filtered, page, odd = asyncio.run(main())
+    assert len(everything) == 10
+    assert sorted(p.year for p in filtered) == [2018, 2019, 2020]
+    assert len(page) == 3
+    assert len(odd) == 11
+
+
+def test_ingest_merges_duplicates():
+    index = LocalPaperIndex(":memory:")
+    index.ingest([_paper("Attention Is All You Need", 2017, citations=10, doi="10.1/abc")])
+    index.ingest([_paper("Attention is all you need.", 2017, citations=20, venue_name="NeurIPS")])
+    index.ingest([_paper("Attention (renamed)", 2017, doi="https://doi.org/10.1/ABC", is_open_access=True)])
+
+    assert len(index) == 1
+    [paper] = asyncio.run(index.search("attention"))
+    assert (paper.citation_count, paper.venue_name, paper.is_open_access) == (20, "NeurIPS", True)
+
+
+def test_ingest_merges_records_without_a_year_like_the_merger():
+    index = LocalPaperIndex(":memory:")
+    index.ingest([PaperSearchResult(title="Attention Is All You Need", authors=[], year=None, citation_count=5)])
+    index.ingest([_paper("Attention is all you need", 2017, citations=10)])  # Fills in the year
+    index.ingest([_paper("Attention Is All You Need", 2017, venue_name="NeurIPS")])
+    index.ingest([PaperSearchResult(title="Attention is all you need.", authors=[])])  # Agrees with any year
+    assert len(index) == 1
+    [paper] = asyncio.run(index.search("attention"))
+    assert (paper.year, paper.citation_count, paper.venue_name) == (2017, 10, "NeurIPS")
+
+    index.ingest([_paper("Attention Is All You Need", 2018)])  # A different year is a different paper
+    assert len(index) == 2
+
+
+def test_ingest_keeps_non_latin_titles_apart():
+    index = LocalPaperIndex(":memory:")
+    index.ingest([_paper("注意力机制综述", 2021), _paper("图神经网络综述", 2021), _paper("知识图谱嵌入", 2021)])
+    index.ingest([_paper("注意力机制综述。", 2021, citations=7)])
+    assert len(index) == 3
+
+
+def test_ingest_merges_a_record_whose_new_key_is_taken():
+    index = LocalPaperIndex(":memory:")
+    index.ingest([_paper("Attention Is All You Need", 2017, citations=10)])
+    # A record without a year and another DOI, as an index written before records were matched across years could hold
+    index._db.execute(
+        "INSERT INTO papers (key, doi, citation_count, data) VALUES (?, ?, ?, ?)",
+        ("attentionisallyouneed:", "10.1/abc", 3, PaperSearchResult(title="Attention Is All You Need", authors=[], doi="10.1/abc").to_json()),
+    )
+    index.ingest([_paper("Attention Is All You Need", 2017, doi="10.1/abc")])  # Found by DOI, takes the year of the other record
+    assert len(index) == 1
+    [paper] = asyncio.run(index.search("attention"))
+    assert (paper.year, paper.doi, paper.citation_count) == (2017, "10.1/abc", 10)
+
+
+def test_local_first_only_hits_remote_on_miss(tmp_path):
+    remote = CountingEngine([_paper("Deep residual learning", 2016), _paper("Batch normalization", 2015)])
+    engine = LocalFirstSearchEngine(remote, LocalPaperIndex(str(tmp_path / "papers.db")))
+
+    first = asyncio.run(engine.search("resnet"))
+    second = asyncio.run(engine.search("  ResNet "))
+    assert remote.calls == 1
+    assert [p.title for p in second] == [p.title for p in first]
+
+    reopened = LocalFirstSearchEngine(remote, LocalPaperIndex(str(tmp_path / "papers.db")))
+    asyncio.run(reopened.search("resnet"))
+    asyncio.run(reopened.search("resnet", year_from=2016))
+    assert remote.calls == 2
+
+
+def test_engines_populate_attached_index():
+    index = LocalPaperIndex(":memory:")
+
+    class Engine(CountingEngine):
+        async def search(self, query, year_from=None, year_to=None, offset=None, limit=None):
+            return self._remember(await super().search(query, year_from, year_to, offset, limit))
+
+    engine = Engine([_paper("Deep residual learning", 2016)])
+    engine.index = index
+    asyncio.run(engine.search("resnet"))
+    assert len(index) == 1
@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from agent_starter_kit.tools.search import GoogleScholarSearchEngine
+from agent_starter_kit.tools.search.browser_pool import BrowserPool
+from agent_starter_kit.tools.search.proxy_pool import FileProxyProvider, ProxyPool, RemoteProxyProvider, StaticProxyProvider
+
+
+def test_healthiest_proxy_is_preferred_and_failing_ones_are_quarantined():
+    async def main():
+        async with ProxyPool(StaticProxyProvider(["1.1.1.1:80", "2.2.2.2:80"]), max_failures=2) as proxies:
+            assert {s.server for s in proxies.stats()} == {"http://1.1.1.1:80", "http://2.2.2.2:80"}
+
+            proxies.report("http://1.1.1.1:80", success=True, latency=0.2)
+            proxies.report("http://2.2.2.2:80", success=True, latency=5.0)
+            assert {proxies.get() for _ in range(20)} == {"http://1.1.1.1:80"}
+
+            proxies.report("http://1.1.1.1:80", success=False)
+            proxies.report("http://1.1.1.1:80", success=False)
+            assert [s.server for s in proxies.healthy()] == ["http://2.2.2.2:80"]
+            assert proxies.get() == "http://2.2.2.2:80"
+
+            proxies.report("http://2.2.2.2:80", success=False, blocked=True)
+            assert proxies.get() is None
+
+    asyncio.run(main())
+
+
+def test_refresh_keeps_statistics_and_survives_provider_errors(tmp_path):
+    path = tmp_path / "proxies.txt"
+    path.write_text("# comment\n1.1.1.1:80\n\n2.2.2.2:80\n")
+
+    async def main():
+        async with ProxyPool(FileProxyProvider(str(path)), refresh_interval=None) as proxies:
+            proxies.report("http://1.1.1.1:80", success=True, latency=1.0)
+            path.write_text("1.1.1.1:80\n3.3.3.3:80\n")
+            await proxies.refresh()
+            assert {s.server for s in proxies.stats()} == {"http://1.1.1.1:80", "http://3.3.3.3:80"}
+            assert next(s for s in proxies.stats() if s.server == "http://1.1.1.1:80").successes == 1
+
+            path.unlink()
+            await proxies.refresh()
+            assert len(proxies) == 2
+
+    asyncio.run(main())
+
+
+def test_remote_provider_loads_in_bulk_and_refreshes_in_background():
+    calls = []
+
+    async def handler(request: web.Request) -> web.Response:
+        calls.append(request.path)
+        return web.Response(text="1.1.1.1:80\n2.2.2.2:80\n")
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/all", handler)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            async with ProxyPool(RemoteProxyProvider(str(server.make_url("/all"))), refresh_interval=0.05) as proxies:
+                assert len(proxies) == 2
+                await asyncio.sleep(0.2)
+        finally:
+            await server.close()
+
+    asyncio.run(main())
+    assert len(calls) >= 3
+
+
+class RecordingCrawler:
+    def __init__(self, pages: dict[str, str]):
+        self.pages = pages
+        self.ready = False
+        self.proxies: list[str] = []
+
+    async def start(self):
+        self.ready = True
+
+    async def close(self):
+        pass
+
+    async def arun(self, url, config, **kwargs):
+        self.proxies.append(config.proxy_config["server"])
+        html = self.pages.get(config.proxy_config["server"], "<html><body>ok</body></html>")
+        return SimpleNamespace(html=html, success=True)
+
+
+def test_engine_reports_blocked_proxies():
+    crawler = RecordingCrawler({"http://1.1.1.1:80": "please show you're not a robot"})
+
+    async def main():
+        pool = BrowserPool(size=1, browser_factory=lambda port: crawler)  # type: ignore[arg-type, return-value]
+        async with ProxyPool(StaticProxyProvider(["1.1.1.1:80", "2.2.2.2:80"])) as proxies:
+            proxies.report("http://1.1.1.1:80", success=True)  # Outranks the untried proxy, so it is the first one used
+            async with GoogleScholarSearchEngine(pool=pool, proxies=proxies) as engine:
+                for _ in range(10):
+                    await engine._fetch_html("https://scholar.google.com/scholar?q=x")
+            return proxies.stats()
+
+    stats = asyncio.run(main())
+    assert stats[0].server == "http://2.2.2.2:80" and stats[0].blocks == 0
+    assert stats[1].blocks == 1
+    assert crawler.proxies.count("http://1.1.1.1:80") == 1
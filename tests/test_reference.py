@@ -0,0 +1,107 @@
+import io
+import mmap
+import shutil
+from pathlib import Path
+
+import pymupdf
+import pytest
+
+from agent_starter_kit.tools.extract.reference import DocumentBlocks, extract_references, get_all_refs, get_ref_page, is_ref_block
+
+FIXTURES = Path(__file__).parent / "fixtures" / "pdf"
+
+
+@pytest.mark.parametrize(
+    "name, count, first",
+    [
+        ("numbered.pdf", 40, "[1] E. Devlin, B. Parmar, W. He. The data baseline show training data. In ICML, 2008."),
+        ("long_numbered.pdf", 90, "[1] F. He, R. Ren, D. Ren. Of attention in training attention. In ICML, 2022."),
+        ("author_year.pdf", 35, "Ba, E.; Hamilton, A.; Devlin, C. Method on task performance layer training in evaluation network. ICML, 2012."),
+        ("chinese_heading.pdf", 15, "[1] N. Kipf, L. Chang, H. Vaswani, W. Hamilton. The that in approach layer network. In ACL, 2003."),
+    ],
+)
+def test_get_all_refs(name, count, first):
+    refs = get_all_refs(str(FIXTURES / name))
+    assert refs is not None
+    assert len(refs) == count
+    assert refs[0] == first
+
+
+def test_numbered_references_stuck_together_are_split():
+    refs = get_all_refs(str(FIXTURES / "numbered.pdf"))
+    assert refs is not None
+    assert [ref.split("]")[0] for ref in refs] == [f"[{i}" for i in range(1, 41)]
+
+
+def test_no_reference_section():
+    assert get_all_refs(str(FIXTURES / "no_references.pdf")) is None
+
+
+def test_reference_page_is_found_without_reading_the_body():
+    doc = pymupdf.open(str(FIXTURES / "long_numbered.pdf"))
+    blocks = DocumentBlocks(doc)
+    assert get_ref_page(blocks) == 22
+    assert set(blocks._pages) == set(range(22, len(doc)))
+
+
+def test_pages_are_only_drawn_on_when_marking(tmp_path, monkeypatch):
+    drawn = []
+    monkeypatch.setattr(pymupdf.Page, "draw_rect", lambda self, *args, **kwargs: drawn.append(self.number))
+    get_all_refs(str(FIXTURES / "numbered.pdf"))
+    assert drawn == []
+
+    monkeypatch.undo()
+    shutil.copy(FIXTURES / "numbered.pdf", tmp_path / "paper.pdf")
+    assert get_all_refs(str(tmp_path / "paper.pdf"), save_marked_pdf=True) == get_all_refs(str(tmp_path / "paper.pdf"))
+    assert len(pymupdf.open(tmp_path / "marked-paper.pdf")[6].get_drawings()) > 0
+
+
+def test_is_ref_block():
+    assert is_ref_block("References\n")
+    assert is_ref_block("B I B L I O G R A P H Y")
+    assert is_ref_block("参考文献")
+    assert not is_ref_block("References to prior work are listed at the end of the paper")
+
+
+def test_in_memory_sources():
+    path = FIXTURES / "author_year.pdf"
+    expected = get_all_refs(str(path))
+    data = path.read_bytes()
+    assert get_all_refs(data) == expected
+    assert get_all_refs(memoryview(data)) == expected
+    assert get_all_refs(io.BytesIO(data)) == expected
+    with open(path, "rb") as f:
+        assert get_all_refs(f) == expected
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert get_all_refs(mapped) == expected
+
+
+def test_closes_only_the_documents_it_opens(monkeypatch):
+    opened: list[pymupdf.Document] = []
+    open_document = pymupdf.open
+
+    def tracked_open(*args, **kwargs) -> pymupdf.Document:
+        opened.append(open_document(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(pymupdf, "open", tracked_open)
+    path = FIXTURES / "numbered.pdf"
+    assert extract_references(str(path)) is not None
+    assert extract_references(path.read_bytes()) is not None
+    assert len(opened) == 2 and all(doc.is_closed for doc in opened)
+
+    with open_document(path) as doc:
+        assert extract_references(doc) is not None
+        assert not doc.is_closed
+
+
+def test_marked_pdf_is_returned_as_bytes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    extracted = extract_references((FIXTURES / "numbered.pdf").read_bytes(), mark=True)
+    assert extracted is not None and extracted.marked_pdf is not None
+    assert len(pymupdf.open(stream=extracted.marked_pdf)[6].get_drawings()) > 0
+    assert list(tmp_path.iterdir()) == []
+    assert extract_references(str(FIXTURES / "numbered.pdf")).marked_pdf is None  # type: ignore[union-attr]
+
+    with pytest.raises(ValueError):
+        get_all_refs((FIXTURES / "numbered.pdf").read_bytes(), save_marked_pdf=True)
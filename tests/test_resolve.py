@@ -0,0 +1,163 @@
+import asyncio
+
+from aiohttp import web
+
+from agent_starter_kit.tools.extract.resolve import ReferenceResolver, parse_reference, score_match
+from agent_starter_kit.tools.search.base import Author, PaperSearchResult
+from agent_starter_kit.tools.search.index import LocalPaperIndex
+
+RESNET = {
+    "paperId": "p2",
+    "title": "Deep Residual Learning for Image Recognition",
+    "authors": [{"name": "Kaiming He"}],
+    "year": 2016,
+}
+GCN = {
+    "paperId": "p3",
+    "title": "Semi-Supervised Classification with Graph Convolutional Networks",
+    "authors": [{"name": "Thomas N. Kipf"}, {"name": "Max Welling"}],
+    "year": 2017,
+}
+
+
+def test_parse_numbered_reference():
+    reference = parse_reference("[1] E. Devlin, B. Parmar, and W. He. The data baseline show training data. In ICML, 2008.")
+    assert reference.authors == ["E. Devlin", "B. Parmar", "W. He"]
+    assert reference.title == "The data baseline show training data"
+    assert reference.year == 2008
+    assert reference.venue == "ICML"
+
+
+def test_parse_author_year_and_apa_references():
+    reference = parse_reference("Ba, E.; Hamilton, A. & Devlin, C. Method on task performance. ICML, 2012.")
+    assert reference.authors == ["E. Ba", "A. Hamilton", "C. Devlin"]
+    assert (reference.title, reference.year, reference.venue) == ("Method on task performance", 2012, "ICML")
+
+    reference = parse_reference("Vaswani, A., Shazeer, N., & Parmar, N. (2017). Attention is all you need. Advances in NeurIPS, 30.")
+    assert reference.authors == ["A. Vaswani", "N. Shazeer", "N. Parmar"]
+    assert (reference.title, reference.year) == ("Attention is all you need", 2017)
+
+
+def test_parse_identifiers_and_full_names():
+    reference = parse_reference(
+        "[12] Kaiming He, Xiangyu Zhang, and Jian Sun. Deep residual learning for image recognition. In CVPR, 2016. doi:10.1109/CVPR.2016.90."
+    )
+    assert reference.authors == ["Kaiming He", "Xiangyu Zhang", "Jian Sun"]
+    assert reference.doi == "10.1109/CVPR.2016.90"
+    assert reference.venue == "CVPR"
+
+    reference = parse_reference("[3] A. Vaswani et al. Attention is all you need. arXiv:1706.03762, 2017.")
+    assert reference.arxiv_id == "1706.03762"
+    assert reference.title == "Attention is all you need"
+
+
+def test_score_match_prefers_title_year_and_author_agreement():
+    reference = parse_reference("A. Vaswani et al. Attention is all you need. In NeurIPS, 2017.")
+    paper = PaperSearchResult(title="Attention Is All You Need", authors=[Author("Ashish Vaswani")], year=2017)
+    assert score_match(reference, paper) == 1.0
+    assert score_match(reference, PaperSearchResult(title="Attention Is All You Need", authors=[], year=2010)) < 0.9
+    assert score_match(reference, PaperSearchResult(title="Deep Residual Learning", authors=[], year=2017)) < 0.5
+
+
+def test_score_match_only_credits_the_first_author():
+    reference = parse_reference("[1] A. Vaswani, N. Shazeer. Attention is all you need. In NeurIPS, 2017.")
+    first = PaperSearchResult(title="Attention is not all you need", authors=[Author("Ashish Vaswani"), Author("Noam Shazeer")])
+    second = PaperSearchResult(title="Attention is not all you need", authors=[Author("Noam Shazeer"), Author("Ashish Vaswani")])
+    assert score_match(reference, first) > score_match(reference, second)
+
+
+def test_resolver_uses_index_then_batches_ids_and_matches_titles(semantic_scholar):
+    calls: dict[str, list] = {"batch": [], "match": []}
+
+    async def batch(request: web.Request) -> web.Response:
+        ids = (await request.json())["ids"]
+        calls["batch"].append(ids)
+        return web.json_response([RESNET if paper_id == "DOI:10.1109/CVPR.2016.90" else None for paper_id in ids])
+
+    async def match(request: web.Request) -> web.Response:
+        calls["match"].append(request.query["query"])
+        if "graph convolutional" in request.query["query"].lower():
+            return web.json_response({"data": [GCN]})
+        return web.json_response({"error": "Title match not found"}, status=404)
+
+    references = [
+        "[1] A. Vaswani et al. Attention is all you need. In NeurIPS, 2017.",
+        "[2] K. He, X. Zhang. Deep residual learning for image recognition. In CVPR, 2016. doi:10.1109/CVPR.2016.90.",
+        "[3] T. N. Kipf and M. Welling. Semi-supervised classification with graph convolutional networks. In ICLR, 2017.",
+        "[4] T. Kipf, M. Welling. Semi-supervised classification with graph convolutional networks. ICLR, 2017.",
+        "[5] X. Nobody. A paper nobody has heard of. Nowhere, 1999.",
+    ]
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/paper/batch", batch)
+        app.router.add_get("/paper/search/match", match)
+        index = LocalPaperIndex(":memory:")
+        index.ingest([PaperSearchResult(title="Attention Is All You Need", authors=[Author("Ashish Vaswani")], year=2017)])
+        async with semantic_scholar(app) as engine:
+            resolver = ReferenceResolver(engine, index)
+            return await resolver.resolve(references), len(index)
+
+    results, indexed = asyncio.run(main())
+    assert [r.source for r in results] == ["index", "semantic_scholar", "semantic_scholar", "semantic_scholar", None]
+    assert results[1].paper is not None and results[1].paper.title == RESNET["title"]
+    assert results[1].confidence == 1.0
+    assert results[2].paper is not None and results[2].paper.year == 2017
+    assert results[2].confidence > 0.9 and results[3].confidence > 0.9
+    assert results[4].paper is None and results[4].confidence == 0.0
+    # One batch request for the DOI, one title lookup per distinct title that was neither local nor identified
+    assert calls["batch"] == [["DOI:10.1109/CVPR.2016.90"]]
+    assert sorted(calls["match"]) == ["A paper nobody has heard of", "Semi-supervised classification with graph convolutional networks"]
+    assert indexed == 3
+
+
+def test_resolver_without_engine_only_looks_locally():
+    async def main():
+        index = LocalPaperIndex(":memory:")
+        index.ingest([PaperSearchResult(title="Attention Is All You Need", authors=[], year=2017)])
+        return await ReferenceResolver(index=index).resolve(
+            ["[1] A. Vaswani. Attention is all you need. 2017.", "[2] B. Other. Something else. 2001."]
+        )
+
+    results = asyncio.run(main())
+    assert results[0].source == "index" and results[0].confidence > 0.9
+    assert results[1].paper is None
+
+
+def test_resolver_matches_non_latin_references():
+    reference = parse_reference("[1] 张伟, 李娜. 注意力机制综述. 计算机学报, 2021.")
+    assert (reference.authors, reference.title, reference.venue) == (["张伟", "李娜"], "注意力机制综述", "计算机学报")
+
+    async def main():
+        index = LocalPaperIndex(":memory:")
+        index.ingest([PaperSearchResult(title=title, authors=[Author("张伟")], year=2021) for title in ("图神经网络综述", "注意力机制综述")])
+        return await ReferenceResolver(index=index).resolve([reference.raw])
+
+    [result] = asyncio.run(main())
+    assert result.paper is not None and result.paper.title == "注意力机制综述"
+    assert result.confidence > 0.9
+
+
+def test_failed_id_lookup_falls_back_to_titles(semantic_scholar):
+    calls: list[str] = []
+
+    async def batch(request: web.Request) -> web.Response:
+        calls.append("batch")
+        return web.json_response({"error": "Invalid ids"}, status=400)
+
+    async def match(request: web.Request) -> web.Response:
+        calls.append("match")
+        return web.json_response({"data": [RESNET]})
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/paper/batch", batch)
+        app.router.add_get("/paper/search/match", match)
+        async with semantic_scholar(app) as engine:
+            return await ReferenceResolver(engine).resolve(
+                ["[2] K. He, X. Zhang. Deep residual learning for image recognition. In CVPR, 2016. doi:10.1109/CVPR.2016.90."]
+            )
+
+    (resolved,) = asyncio.run(main())
+    assert resolved.source == "semantic_scholar" and resolved.paper is not None and resolved.paper.title == RESNET["title"]
+    assert calls == ["batch", "match"]
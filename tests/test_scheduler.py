@@ -0,0 +1,91 @@
+import asyncio
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from agent_starter_kit.tools.search import SemanticScholarSearchEngine
+from agent_starter_kit.tools.search.scheduler import RequestScheduler, Retry, get_scheduler
+
+
+def test_requests_are_paced_and_served_by_priority():
+    order: list[str] = []
+
+    async def main():
+        scheduler = RequestScheduler(rate=20)
+
+        def request(name: str):
+            async def send():
+                order.append(name)
+
+            return send
+
+        begin = time.perf_counter()
+        tasks = [asyncio.create_task(scheduler.submit(request(f"bulk{i}"), priority=1)) for i in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(scheduler.submit(request("urgent"), priority=0)))
+        await asyncio.sleep(0.01)
+        assert scheduler.metrics().queue_depth == 4  # bulk0 already went out
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - begin, scheduler.metrics()
+
+    elapsed, metrics = asyncio.run(main())
+    assert order == ["bulk0", "urgent", "bulk1", "bulk2", "bulk3"]
+    assert elapsed >= 4 / 20 - 0.01
+    assert metrics.submitted == metrics.completed == 5 and metrics.queue_depth == 0
+    assert metrics.max_wait >= 0.15 and 0 < metrics.mean_wait < metrics.max_wait
+
+
+def test_retries_give_up_with_the_original_error():
+    attempts = 0
+
+    async def send():
+        nonlocal attempts
+        attempts += 1
+        raise Retry(ValueError("boom"))
+
+    async def main():
+        scheduler = RequestScheduler(rate=None, max_retries=2, backoff=0.001)
+        try:
+            await scheduler.submit(send)
+        except ValueError:
+            return scheduler.metrics()
+
+    metrics = asyncio.run(main())
+    assert attempts == 3
+    assert metrics is not None and (metrics.retries, metrics.failed) == (2, 1)
+
+
+def test_retry_after_holds_back_every_request_of_the_key():
+    sent: list[tuple[str, float]] = []
+
+    async def handler(request: web.Request) -> web.Response:
+        sent.append((request.query["query"], time.perf_counter()))
+        if len(sent) == 1:
+            return web.json_response({"message": "Too Many Requests"}, status=429, headers={"Retry-After": "0.3"})
+        return web.json_response({"total": 0, "offset": 0, "data": []})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/paper/search", handler)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            scheduler = RequestScheduler(rate=None)
+            async with SemanticScholarSearchEngine(api_key=None, base_url=str(server.make_url("")), backoff=0.001, scheduler=scheduler) as engine:
+                first = asyncio.create_task(engine.search("first"))
+                await asyncio.sleep(0.05)
+                await asyncio.gather(first, engine.search("second"))
+                return scheduler.metrics()
+        finally:
+            await server.close()
+
+    metrics = asyncio.run(main())
+    assert sorted(query for query, _ in sent) == ["first", "first", "second"]
+    assert all(at - sent[0][1] >= 0.29 for _, at in sent[1:])
+    assert (metrics.throttled, metrics.retries, metrics.completed) == (1, 1, 2)
+
+
+def test_engines_with_the_same_key_share_a_scheduler():
+    assert get_scheduler("key", "https://api") is get_scheduler("key", "https://api")
+    assert get_scheduler("key", "https://api") is not get_scheduler(None, "https://api")
@@ -0,0 +1,74 @@
+import asyncio
+
+from agent_starter_kit.tools.search import Author, PaperSearchResult, SearchEngine
+
+
+class PagedEngine(SearchEngine):
+    """Serves `total` numbered papers, where every page repeats the last paper of the previous one."""
+
+    PAGE_SIZE = 10
+
+    def __init__(self, total: int, delay: float = 0.05):
+        super().__init__()
+        self.total = total
+        self.delay = delay
+        self.requests: list[int] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def search(self, query, year_from=None, year_to=None, offset=None, limit=None):
+        offset = offset or 0
+        self.requests.append(offset)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        numbers = range(max(offset - 1, 0), min(offset + (limit or 10), self.total))
+        return [PaperSearchResult(title=f"Paper {i}", authors=[Author(full_name="Ada")], year=2000) for i in numbers]
+
+
+class FixedPageEngine(PagedEngine):
+    """Like `PagedEngine`, but every page holds `PAGE_SIZE` papers whatever limit is asked for."""
+
+    FIXED_PAGE_SIZE = True
+
+    async def search(self, query, year_from=None, year_to=None, offset=None, limit=None):
+        return await super().search(query, year_from, year_to, offset, self.PAGE_SIZE)
+
+
+def _collect(engine: SearchEngine, **kwargs) -> list[str]:
+    async def main():
+        return [paper.title async for paper in engine.search_iter("q", **kwargs)]
+
+    return asyncio.run(main())
+
+
+def test_streams_every_page_without_duplicates():
+    engine = PagedEngine(total=35)
+    assert _collect(engine) == [f"Paper {i}" for i in range(35)]
+
+
+def test_stops_exactly_at_limit():
+    engine = PagedEngine(total=1000)
+    assert _collect(engine, limit=25) == [f"Paper {i}" for i in range(25)]
+    assert max(engine.requests) < 40
+
+
+def test_pages_are_prefetched_with_bounded_concurrency():
+    engine = PagedEngine(total=100, delay=0.1)
+    titles = _collect(engine, prefetch=3)
+    assert len(titles) == 100
+    assert engine.max_running == 4
+
+
+def test_non_positive_limit_sends_no_request():
+    engine = PagedEngine(total=100)
+    assert _collect(engine, limit=0) == []
+    assert _collect(engine, limit=-5) == []
+    assert engine.requests == []
+
+
+def test_fixed_page_size_overrides_requested_page_size():
+    engine = FixedPageEngine(total=45)
+    assert _collect(engine, page_size=20) == [f"Paper {i}" for i in range(45)]
+    assert engine.requests[:5] == [0, 10, 20, 30, 40]
@@ -0,0 +1,178 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+from agent_starter_kit.tools.search.semantic_scholar import SemanticScholarError, SemanticScholarRateLimitError
+
+PAPER = {
+    "paperId": "p1",
+    "title": "Attention Is All You Need",
+    "authors": [{"name": "Ashish Vaswani", "externalIds": {"DBLP": ["Ashish Vaswani"]}}],
+    "year": 2017,
+    "abstract": "The dominant sequence transduction models ...",
+    "citationCount": 100000,
+    "publicationVenue": {"name": "NeurIPS"},
+    "isOpenAccess": True,
+    "openAccessPdf": {"url": "https://arxiv.org/pdf/1706.03762"},
+}
+
+
+def test_search_parses_response_and_forwards_params(semantic_scholar):
+    seen: list[dict] = []
+
+    async def handler(request: web.Request) -> web.Response:
+        seen.append(dict(request.query))
+        return web.json_response({"total": 1, "offset": 0, "data": [PAPER]})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/paper/search", handler)
+        async with semantic_scholar(app) as engine:
+            return await engine.search("attention", year_from=2015, limit=5)
+
+    results = asyncio.run(main())
+    assert [r.title for r in results] == ["Attention Is All You Need"]
+    assert results[0].year == 2017
+    assert results[0].authors[0].full_name == "Ashish Vaswani"
+    assert seen[0]["year"] == "2015-"
+    assert seen[0]["limit"] == "5"
+    assert "offset" not in seen[0]
+
+
+def test_concurrent_searches_overlap_on_one_loop(semantic_scholar):
+    async def handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(0.2)
+        return web.json_response({"total": 0, "offset": 0})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/paper/search", handler)
+        async with semantic_scholar(app) as engine:
+            begin = time.perf_counter()
+            await asyncio.gather(*(engine.search(f"q{i}") for i in range(20)))
+            return time.perf_counter() - begin
+
+    assert asyncio.run(main()) < 2.0
+
+
+def test_rate_limit_is_retried_then_raised(semantic_scholar):
+    calls = 0
+
+    async def handler(request: web.Request) -> web.Response:
+        nonlocal calls
+        calls += 1
+        return web.json_response({"message": "Too Many Requests"}, status=429)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/paper/search", handler)
+        async with semantic_scholar(app, max_retries=2, backoff=0.01) as engine:
+            await engine.search("attention")
+
+    with pytest.raises(SemanticScholarRateLimitError):
+        asyncio.run(main())
+    assert calls == 3
+
+
+def test_gateway_html_errors_are_retried_and_empty_bodies_rejected(semantic_scholar):
+    calls = 0
+
+    async def search(request: web.Request) -> web.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return web.Response(text="<html><body>502 Bad Gateway</body></html>", status=502, content_type="text/html")
+        return web.json_response({"total": 1, "offset": 0, "data": [PAPER]})
+
+    async def empty(request: web.Request) -> web.Response:
+        return web.Response(body=b"", status=200)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/paper/search", search)
+        app.router.add_get("/paper/search/match", empty)
+        async with semantic_scholar(app, backoff=0.01) as engine:
+            results = await engine.search("attention")
+            with pytest.raises(SemanticScholarError, match="Unexpected"):
+                await engine.match_title("attention")
+            return results
+
+    assert [r.title for r in asyncio.run(main())] == ["Attention Is All You Need"]
+    assert calls == 2
+
+
+def test_papers_batch_chunks_ids_and_keeps_order(monkeypatch, semantic_scholar):
+    monkeypatch.setattr("agent_starter_kit.tools.search.semantic_scholar.PAPER_BATCH_SIZE", 2)
+    bodies: list[list[str]] = []
+
+    async def handler(request: web.Request) -> web.Response:
+        ids = (await request.json())["ids"]
+        bodies.append(ids)
+        return web.json_response([None if i == "missing" else {**PAPER, "paperId": i, "title": i} for i in ids])
+
+    async def main():
+        app = web.Application()
+        app.router.add_post("/paper/batch", handler)
+        async with semantic_scholar(app) as engine:
+            return await engine.papers_batch(["a", "missing", "c", "d", "e"])
+
+    results = asyncio.run(main())
+    assert sorted(len(b) for b in bodies) == [1, 2, 2]
+    assert [r.title if r is not None else None for r in results] == ["a", None, "c", "d", "e"]
+
+
+def test_paper_citations_streams_all_pages(semantic_scholar):
+    total = 2500
+
+    async def handler(request: web.Request) -> web.Response:
+        offset, limit = int(request.query["offset"]), int(request.query["limit"])
+        end = min(offset + limit, total)
+        page: dict = {"offset": offset, "data": [{"citingPaper": {"paperId": str(i)}} for i in range(offset, end)]}
+        if end < total:
+            page["next"] = end
+        return web.json_response(page)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/paper/{paper_id}/citations", handler)
+        async with semantic_scholar(app) as engine:
+            everything = [item async for item in engine.paper_citations("p1")]
+            capped = [item async for item in engine.paper_citations("p1", offset=10, limit=1500, page_size=1000)]
+            return everything, capped
+
+    everything, capped = asyncio.run(main())
+    assert [item["citingPaper"]["paperId"] for item in everything] == [str(i) for i in range(total)]
+    assert len(capped) == 1500
+    assert capped[0]["citingPaper"]["paperId"] == "10"
+
+
+def test_search_iter_stops_at_the_last_page_and_the_result_cap(semantic_scholar):
+    requests: list[tuple[int, int]] = []
+
+    async def handler(request: web.Request) -> web.Response:
+        offset, limit = int(request.query.get("offset", 0)), int(request.query["limit"])
+        total = int(request.query["query"])
+        requests.append((offset, limit))
+        if offset + limit > 1000:
+            return web.json_response({"error": "Requested data for this limit and/or offset is not available"}, status=400)
+        end = min(offset + limit, total)
+        page: dict = {"total": total, "offset": offset, "data": [{**PAPER, "paperId": str(i), "title": f"Paper {i}"} for i in range(offset, end)]}
+        if end < total:
+            page["next"] = end
+        return web.json_response(page)
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/paper/search", handler)
+        async with semantic_scholar(app) as engine:
+            capped = [paper async for paper in engine.search_iter("5000")]
+            requests.clear()
+            exact = [paper async for paper in engine.search_iter("200", prefetch=0)]
+            return capped, exact
+
+    capped, exact = asyncio.run(main())
+    assert [paper.title for paper in capped] == [f"Paper {i}" for i in range(1000)]
+    assert len(exact) == 200
+    assert requests == [(0, 100), (100, 100)]  # The second page has no `next`, so no empty page is requested